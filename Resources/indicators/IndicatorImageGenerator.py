@@ -1,14 +1,16 @@
 # region imports
 from AlgorithmImports import *
-import matplotlib.pyplot as plt
-from matplotlib.dates import MonthLocator
+import json
+import numpy as np
 # endregion
-''' View Images in Notebook using:
-from IPython.display import Image
+''' The backtest exports the indicator series to the Object Store and the
+images are rendered locally by code-generators/indicator_image_renderer.py.
+Load the series in a notebook using:
 store = QuantBook().object_store
-name = 'delta'
-Image(filename=store.get_file_path(f"indicators/images/{name}.png")) 
+series = np.load(store.get_file_path("indicators/series.npz"))
 '''
+SERIES_KEY = "indicators/series.npz"
+
 class IndicatorInfo:
     def __init__(self, code, c_code, c_title, py_title, column_groups=[['current']]):
         self.code = code
@@ -16,30 +18,26 @@ class IndicatorInfo:
         self.py_title = py_title
         self.column_groups = column_groups
 
-    def generate(self, df, fname) -> str:
+    def export(self, df, name, arrays) -> str:
+        """Add the time and the plotted columns of the indicator history to `arrays`."""
         if df.empty:
             return 'Empty Dataframe'
-        # Create figure with subplots - one for each column group
-        num_groups = len(self.column_groups)
-        fig, axes = plt.subplots(num_groups, 1, figsize=(10, max(4, 3*num_groups)), sharex=True)
-        # Ensure axes is a list even for single subplot
-        if num_groups == 1:
-            axes = [axes]
         output = ''
-        for idx, columns in enumerate(self.column_groups):
-            if not all([c in df.columns for c in columns]):
-                output += f"Unable to plot {fname} - The indicator history is missing some columns\n"
-                continue
-            df[columns].dropna().plot(ax=axes[idx])
-            axes[idx].grid(True)
-        fig.suptitle(f"C#: {self.c_title}\nPy:  {self.py_title}", x=0.05, ha='left')
-        axes[-1].set_xlabel('Date', fontsize=12)
-        axes[-1].xaxis.set_major_locator(MonthLocator())
-        plt.tight_layout()
-        fig.savefig(fname)
-        #plt.show()
+        columns = []
+        for group in self.column_groups:
+            if not all([c in df.columns for c in group]):
+                output += f"Unable to plot {name} - The indicator history is missing some columns\n"
+            columns += [c for c in group if c in df.columns and c not in columns]
+        # The time is the last level of the index.
+        times = df.index.get_level_values(-1)
+        arrays[f'{name}:time'] = np.asarray(times, dtype='datetime64[ns]').astype('int64')
+        for column in columns:
+            arrays[f'{name}:{column}'] = df[column].to_numpy(dtype='float64')
         return output
 
+    def metadata(self) -> dict:
+        return {'c_title': self.c_title, 'py_title': self.py_title, 'column_groups': self.column_groups}
+
 class IndicatorImageGenerator(QCAlgorithm):
     def initialize(self):
         self.set_start_date(2024, 12, 31)
@@ -50,31 +48,51 @@ class IndicatorImageGenerator(QCAlgorithm):
         interest_rate_model = InterestRateProvider()
         dividend_yield_model = DividendYieldProvider(self._symbol)
 
-        indicators = self.get_indicators()
-        name = 'intraday-vwap'; info = indicators.pop(name)
-        history = self.indicator_history(info.code, self._symbol, timedelta(2), Resolution.MINUTE)
-        error = info.generate(history.data_frame, self.object_store.get_file_path(f"indicators/images/{name}.png"))
-        self.debug(f'Processed: {name}' + (f' :: {error=}' if error else ''))
+        # Comma-separated names of the images to generate; all of them by default.
+        selected = self.get_parameter('indicators')
+        self._selected = set(selected.split(',')) if selected else None
+
+        self._arrays = {}
+        self._metadata = {}
+
+        indicators = self._select(self.get_indicators())
+        name = 'intraday-vwap'
+        if name in indicators:
+            info = indicators.pop(name)
+            history = self.indicator_history(info.code, self._symbol, timedelta(2), Resolution.MINUTE)
+            self._export(name, info, history)
 
         for name, info in indicators.items():
             history = self.indicator_history(info.code, self._symbol, timedelta(365), Resolution.DAILY)
-            error = info.generate(history.data_frame, self.object_store.get_file_path(f"indicators/images/{name}.png"))
-            self.debug(f'Processed: {name}' + (f' :: {error=}' if error else ''))
+            self._export(name, info, history)
 
-        for name, info in self.get_option_indicators(interest_rate_model, dividend_yield_model).items():
+        for name, info in self._select(self.get_option_indicators(interest_rate_model, dividend_yield_model)).items():
             history = self.indicator_history(info.code, [self._symbol, self._option, self._mirror_option], timedelta(365), Resolution.DAILY)
-            error = info.generate(history.data_frame, self.object_store.get_file_path(f"indicators/images/{name}.png"))
-            self.debug(f'Processed: {name}' + (f' :: {error=}' if error else ''))
+            self._export(name, info, history)
 
         # QQQ is the Symbol
         self._reference = self._symbol
         self._symbol = self.add_equity("QQQ", Resolution.DAILY).symbol
-        for name, info in self.get_special_indicators().items():
+        for name, info in self._select(self.get_special_indicators()).items():
             if hasattr(info.code, 'add'):
                 [info.code.add(symbol) for symbol in [self._symbol, self._reference]]
             history = self.indicator_history(info.code, [self._symbol, self._reference], timedelta(365), Resolution.DAILY)
-            error = info.generate(history.data_frame, self.object_store.get_file_path(f"indicators/images/{name}.png"))
-            self.debug(f'Processed: {name}' + (f' :: {error=}' if error else ''))
+            self._export(name, info, history)
+
+        # One file with every series; the images are rendered locally.
+        self._arrays['__meta__'] = np.array(json.dumps(self._metadata))
+        np.savez_compressed(self.object_store.get_file_path(SERIES_KEY), **self._arrays)
+
+    def _export(self, name, info, history):
+        error = info.export(history.data_frame, name, self._arrays)
+        if f'{name}:time' in self._arrays:
+            self._metadata[name] = info.metadata()
+        self.debug(f'Processed: {name}' + (f' :: {error=}' if error else ''))
+
+    def _select(self, indicators: dict[str,IndicatorInfo]) -> dict[str,IndicatorInfo]:
+        if self._selected is None:
+            return indicators
+        return {name: info for name, info in indicators.items() if name in self._selected}
 
     def get_indicators(self) -> dict[str,IndicatorInfo]:
         return {
@@ -4,29 +4,89 @@ Reads QuantConnect-Platform-2.0.0.yaml (OpenAPI 3.1.0), parses all endpoint
 definitions, and generates HTML documentation files for each endpoint:
   - Introduction, Description (optional), Request, Responses, Examples
 
+Only the endpoints whose definition or referenced schemas changed since the
+last run are regenerated; --force regenerates all of them.
+
 Usage:
-    python API-Reference-Code-Generator.py
+    python API-Reference-Code-Generator.py [--force]
 """
 
+import hashlib
 import json
+import os
 import pathlib
+import pickle
+import sys
 
 import yaml
 
 RESOURCE_DIR = pathlib.Path("Resources/qc-api")
 GENERATED_COMMENT = "<!-- Code generated by API-Reference-Code-Generator.py -->\n"
 SPECS = {"Cloud Platform": "QuantConnect-Platform-2.0.0.yaml"}
+# The parsed specs and the fingerprints of the generated endpoints.
+CACHE_DIR = pathlib.Path(os.environ.get(
+    "API_REFERENCE_CACHE_DIR", pathlib.Path(__file__).parent / ".api-reference-cache"
+))
+# The C loader is much faster, but needs PyYAML built with libyaml.
+SAFE_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 # Endpoints whose tag doesn't map directly to the example filename
 EXAMPLE_OVERRIDES = {"reports": "backtest-management"}
 
 
+def load_spec(spec_path):
+    """Parse the spec, or load it from the cache if the file didn't change."""
+    data = pathlib.Path(spec_path).read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    cache = CACHE_DIR / f"{pathlib.Path(spec_path).stem}.{digest}.pickle"
+    if cache.exists():
+        with open(cache, "rb") as f:
+            return pickle.load(f)
+    doc = yaml.load(data, Loader=SAFE_LOADER)
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    for stale in CACHE_DIR.glob(f"{pathlib.Path(spec_path).stem}.*.pickle"):
+        stale.unlink()
+    with open(cache, "wb") as f:
+        pickle.dump(doc, f)
+    return doc
+
+
+class _SchemaQueue(list):
+    """BFS queue of the schema paths whose tables a page renders."""
+
+    def enqueue(self, path, once=False):
+        """Append *path*; with *once*, only if it isn't queued yet."""
+        if not (once and path in self):
+            self.append(path)
+
+
+class _Recording:
+    """Stands in for a _SchemaQueue to record what an expansion enqueues."""
+
+    def __init__(self):
+        self.paths = []
+
+    def enqueue(self, path, once=False):
+        self.paths.append((path, once))
+
+
 class APIReferenceGenerator:
     """Generates HTML API reference pages from an OpenAPI spec."""
 
     def __init__(self, spec_path):
-        with open(spec_path) as f:
-            self.doc = yaml.safe_load(f)
+        self.doc = load_spec(spec_path)
+        self._manifest_path = CACHE_DIR / f"{pathlib.Path(spec_path).stem}.manifest.json"
+        # Resolved paths, and the properties of each component expanded
+        # per (path, array indent, is_array, required) with the paths it enqueues.
+        self._resolved = {}
+        self._expansions = {}
+        # Expansions in progress, and those that aren't cached because
+        # a cycle was cut inside them.
+        self._expanding = []
+        self._cyclic = set()
+        # Transitive closure of the paths each $ref depends on.
+        self._closures = {}
+        self._resolve_refs(self.doc)
 
     # ------------------------------------------------------------------ #
     #  Schema resolution                                                   #
@@ -36,8 +96,26 @@ class APIReferenceGenerator:
         """Resolve a $ref string like '#/components/schemas/Foo'."""
         return self._navigate(ref_str.split("/")[1:])
 
+    def _resolve_refs(self, obj):
+        """Resolve every $ref of the spec once."""
+        if isinstance(obj, dict):
+            ref = obj.get("$ref")
+            if isinstance(ref, str):
+                self._navigate(self._ref_path(ref))
+            for value in obj.values():
+                self._resolve_refs(value)
+        elif isinstance(obj, list):
+            for value in obj:
+                self._resolve_refs(value)
+
     def _navigate(self, path_parts):
         """Walk the doc tree by *path_parts*, falling back to schemas."""
+        key = tuple(path_parts)
+        if key not in self._resolved:
+            self._resolved[key] = self._walk(path_parts)
+        return self._resolved[key]
+
+    def _walk(self, path_parts):
         obj = self.doc
         for part in path_parts:
             if not isinstance(obj, dict):
@@ -49,6 +127,39 @@ class APIReferenceGenerator:
                     return None
         return obj
 
+    @staticmethod
+    def _refs(obj):
+        """Yield the $ref strings in *obj*, nested ones included."""
+        if isinstance(obj, dict):
+            ref = obj.get("$ref")
+            if isinstance(ref, str):
+                yield ref
+            for value in obj.values():
+                yield from APIReferenceGenerator._refs(value)
+        elif isinstance(obj, list):
+            for value in obj:
+                yield from APIReferenceGenerator._refs(value)
+
+    def _closure(self, ref_str):
+        """Return the $ref strings *ref_str* depends on, itself included."""
+        if ref_str not in self._closures:
+            closure = {ref_str}
+            stack = [ref_str]
+            while stack:
+                for ref in self._refs(self.resolve_ref(stack.pop())):
+                    if ref not in closure:
+                        closure.add(ref)
+                        stack.append(ref)
+            self._closures[ref_str] = frozenset(closure)
+        return self._closures[ref_str]
+
+    def dependencies(self, content):
+        """Return the $ref strings an endpoint depends on, transitively."""
+        closure = set()
+        for ref in self._refs(content):
+            closure |= self._closure(ref)
+        return closure
+
     @staticmethod
     def _ref_path(ref_str):
         """'#/components/schemas/Foo' → ['components', 'schemas', 'Foo']."""
@@ -150,7 +261,7 @@ class APIReferenceGenerator:
             type_label = ref_path[-1] + " Array"
             ref_schema = self._navigate(ref_path)
             if ref_schema and "properties" in ref_schema:
-                example_val, _, _ = self._build_properties(ref_schema["properties"], [], indent=1)
+                example_val, _ = self._component_properties(ref_path, _SchemaQueue(), indent=1)
 
         if "type" in items:
             type_label = self._normalize_type(items["type"]) + " Array"
@@ -205,7 +316,7 @@ class APIReferenceGenerator:
             return ""
 
         # --- BFS over schemas ---
-        queue = [root_path]
+        queue = _SchemaQueue([root_path])
         html_parts = []
         idx = 0
 
@@ -252,9 +363,14 @@ class APIReferenceGenerator:
                 continue
 
             # Build rows and example
-            example_json, rows, queue = self._build_properties(
-                properties, queue, is_array=is_array, indent=order
-            )
+            if "properties" in schema:
+                example_json, rows = self._component_properties(
+                    queue[idx], queue, indent=order, is_array=is_array, required=True
+                )
+            else:
+                example_json, rows, queue = self._build_properties(
+                    properties, queue, is_array=is_array, indent=order
+                )
             if is_array:
                 is_array = False
                 order -= 1
@@ -278,12 +394,7 @@ class APIReferenceGenerator:
         Redirects (content, allOf) are enqueued and return None.
         """
         if "properties" in schema:
-            properties = dict(schema["properties"])  # shallow copy
-            for req in schema.get("required", []):
-                if req in properties:
-                    properties[req] = dict(properties[req])
-                    properties[req]["required"] = True
-            return properties
+            return self._required_properties(schema)
 
         if "content" in schema:
             ref = schema["content"]["application/json"]["schema"]["$ref"]
@@ -295,6 +406,16 @@ class APIReferenceGenerator:
 
         return None
 
+    @staticmethod
+    def _required_properties(schema):
+        """Return the properties of *schema* with the required ones flagged."""
+        properties = dict(schema["properties"])  # shallow copy
+        for req in schema.get("required", []):
+            if req in properties:
+                properties[req] = dict(properties[req])
+                properties[req]["required"] = True
+        return properties
+
     def _build_inline_schema_table(self, wrapper, component):
         """Build table for an inline schema without $ref."""
         html = '<table class="table qc-table">\n<thead>\n<tr>\n'
@@ -399,6 +520,46 @@ class APIReferenceGenerator:
 
         return json_str, rows, ref_queue
 
+    def _component_properties(self, ref_path, ref_queue, indent=0, is_array=False, required=False):
+        """Memoized ``_build_properties`` of the component at *ref_path*.
+
+        Returns ``(json_str, html_rows)``. A component is expanded once and
+        re-indented, and the paths the expansion enqueues are replayed on
+        *ref_queue*. A component that references itself is shown as ``{}``
+        where the cycle closes.
+        """
+        path = tuple(ref_path)
+        if path in self._expanding:
+            # The components inside the cycle are cut where it was entered.
+            self._cyclic.update(self._expanding[self._expanding.index(path) + 1:])
+            return "{}", []
+        # Arrays close their bracket at the indent of the parent.
+        base = indent if is_array else 0
+        key = (path, base, is_array, required)
+        if key not in self._expansions:
+            schema = self._navigate(ref_path)
+            properties = self._required_properties(schema) if required else schema["properties"]
+            recording = _Recording()
+            self._expanding.append(path)
+            try:
+                json_str, rows, _ = self._build_properties(properties, recording, is_array, base)
+            finally:
+                self._expanding.pop()
+            expansion = (json_str, rows, recording.paths)
+            if path in self._cyclic:
+                self._cyclic.discard(path)
+            else:
+                self._expansions[key] = expansion
+        else:
+            expansion = self._expansions[key]
+        json_str, rows, paths = expansion
+        for queued, once in paths:
+            ref_queue.enqueue(queued, once)
+        if indent == base:
+            return json_str, list(rows)
+        # Rows are only built for the top-level table.
+        return json_str.replace("\n", "\n" + "  " * (indent - base)), []
+
     def _process_property(self, name, prop, ref_queue, indent):
         """Determine type label, description, and example value for one property.
 
@@ -484,13 +645,10 @@ class APIReferenceGenerator:
         elif "$ref" in items:
             ref_path = self._ref_path(items["$ref"])
             type_label = ref_path[-1] + " Array"
-            if ref_path not in ref_queue:
-                ref_queue.append(ref_path)
+            ref_queue.enqueue(ref_path, once=True)
             ref_schema = self._navigate(ref_path)
             if ref_schema and "properties" in ref_schema:
-                inner, _, ref_queue = self._build_properties(
-                    ref_schema["properties"], ref_queue, indent=indent + 2
-                )
+                inner, _ = self._component_properties(ref_path, ref_queue, indent=indent + 2)
                 json_value += tab + "  " * 2 + inner
         else:
             type_label = "Array"
@@ -554,13 +712,10 @@ class APIReferenceGenerator:
         if "$ref" in add_prop:
             ref_path = self._ref_path(add_prop["$ref"])
             type_label = ref_path[-1] + " object"
-            if ref_path not in ref_queue:
-                ref_queue.append(ref_path)
+            ref_queue.enqueue(ref_path, once=True)
             ref_schema = self._navigate(ref_path)
             if ref_schema and "properties" in ref_schema:
-                inner, _, ref_queue = self._build_properties(
-                    ref_schema["properties"], ref_queue, indent=indent + 1
-                )
+                inner, _ = self._component_properties(ref_path, ref_queue, indent=indent + 1)
                 return inner, type_label
 
         return "", "object"
@@ -569,15 +724,12 @@ class APIReferenceGenerator:
         """Handle a property with a direct $ref."""
         ref_path = self._ref_path(prop["$ref"])
         type_label = ref_path[-1] + " object"
-        if ref_path not in ref_queue:
-            ref_queue.append(ref_path)
+        ref_queue.enqueue(ref_path, once=True)
 
         ref_schema = self._navigate(ref_path)
         if ref_schema and "properties" in ref_schema:
             desc = ref_schema.get("description", desc)
-            inner, _, ref_queue = self._build_properties(
-                ref_schema["properties"], ref_queue, indent=indent + 1
-            )
+            inner, _ = self._component_properties(ref_path, ref_queue, indent=indent + 1)
             return inner, type_label, desc, prop
         if ref_schema and "type" in ref_schema:
             return "", self._normalize_type(ref_schema["type"]), ref_schema.get("description", desc), ref_schema
@@ -609,7 +761,7 @@ class APIReferenceGenerator:
             vname = path[-1]
             if vname.startswith("_"):
                 continue
-            ref_queue.append(path)
+            ref_queue.enqueue(path)
 
             ref_schema = self._navigate(path)
             if not ref_schema:
@@ -623,12 +775,10 @@ class APIReferenceGenerator:
                     if "$ref" not in part:
                         continue
                     sub_path = self._ref_path(part["$ref"])
-                    ref_queue.append(sub_path)
+                    ref_queue.enqueue(sub_path)
                     sub = self._navigate(sub_path)
                     if sub and "properties" in sub:
-                        inner, _, ref_queue = self._build_properties(
-                            sub["properties"], ref_queue, indent=indent + 2
-                        )
+                        inner, _ = self._component_properties(sub_path, ref_queue, indent=indent + 2)
                         json_value += inner + ",\n"
                 json_value += tab + "  },\n"
 
@@ -643,8 +793,7 @@ class APIReferenceGenerator:
         for part in prop["allOf"]:
             if "$ref" in part:
                 ref_path = self._ref_path(part["$ref"])
-                if ref_path not in ref_queue:
-                    ref_queue.append(ref_path)
+                ref_queue.enqueue(ref_path, once=True)
                 ref_schema = self._navigate(ref_path)
                 if ref_schema and "properties" in ref_schema:
                     merged_properties.update(ref_schema["properties"])
@@ -678,7 +827,7 @@ class APIReferenceGenerator:
             if isinstance(x, dict)
         ]
         for ref in ref_vals:
-            ref_queue.append(ref)
+            ref_queue.enqueue(ref)
         display_vals = [x[-1] for x in ref_vals] if ref_vals else enum_values
         desc += f" Options : {display_vals}"
 
@@ -687,8 +836,8 @@ class APIReferenceGenerator:
         if ref:
             ref_schema = self.resolve_ref(ref)
             if ref_schema and "properties" in ref_schema:
-                first, _, _ = self._build_properties(
-                    ref_schema["properties"], ref_queue, indent=indent + 1
+                first, _ = self._component_properties(
+                    self._ref_path(ref), ref_queue, indent=indent + 1
                 )
         if "string" in type_label:
             json_value = f'"{first}"'
@@ -701,13 +850,43 @@ class APIReferenceGenerator:
     #  File generation                                                     #
     # ------------------------------------------------------------------ #
 
-    def generate(self):
-        """Generate documentation pages for every endpoint in the spec."""
+    def generate(self, force=False):
+        """Generate documentation pages for the endpoints that changed.
+
+        An endpoint changed if its definition, a schema in its dependency
+        closure, this generator or the example files changed, or its pages
+        are missing. Returns the number of generated endpoints.
+        """
+        manifest = {}
+        if not force and self._manifest_path.exists():
+            manifest = json.loads(self._manifest_path.read_text())
+        salt = hashlib.sha256(pathlib.Path(__file__).read_bytes())
+        for source in sorted((RESOURCE_DIR / "examples").rglob("*.php")):
+            salt.update(str(source).encode())
+
+        fingerprints = {}
+        generated = 0
         for api_call, endpoint in self.doc["paths"].items():
             method = endpoint.get("post") or endpoint.get("get")
             if not method:
                 continue
+            fingerprint = self._fingerprint(method, salt.copy())
+            fingerprints[api_call] = fingerprint
+            pages = pathlib.Path("/".join(method["tags"]))
+            if manifest.get(api_call) == fingerprint and (pages / "01 Introduction.html").exists():
+                continue
             self._generate_endpoint(api_call, method)
+            generated += 1
+
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        self._manifest_path.write_text(json.dumps(fingerprints, indent=2, sort_keys=True))
+        return generated
+
+    def _fingerprint(self, content, digest):
+        """Hash an endpoint with the definitions of its dependency closure."""
+        schemas = {ref: self.resolve_ref(ref) for ref in sorted(self.dependencies(content))}
+        digest.update(json.dumps([content, schemas], sort_keys=True, default=str).encode())
+        return digest.hexdigest()
 
     def _generate_endpoint(self, api_call, content):
         """Generate all HTML files for a single API endpoint."""
@@ -842,5 +1021,5 @@ class APIReferenceGenerator:
 
 for section, spec_path in SPECS.items():
     generator = APIReferenceGenerator(spec_path)
-    generator.generate()
-    print(f"Documentation of {section} is generated and inplace!")
+    generated = generator.generate(force="--force" in sys.argv)
+    print(f"Documentation of {section} is generated and inplace! ({generated} endpoints updated)")
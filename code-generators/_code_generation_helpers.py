@@ -1,7 +1,14 @@
-from json import dumps
+from email.utils import formatdate
+from hashlib import sha256
+from json import dumps, load, loads
+from os import environ, getpid, makedirs, replace
+from os.path import dirname, exists, join
 from re import findall, finditer
+from threading import get_ident
+from time import time
 from typing import List
-from urllib.request import urlopen
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
 
 WRITING_ALGORITHMS = '03 Writing Algorithms'
 INDICATORS = f'{WRITING_ALGORITHMS}/28 Indicators/01 Supported Indicators'
@@ -9,6 +16,13 @@ API_REFERENCE = f'{WRITING_ALGORITHMS}/98 API Reference/'
 MHDB = "https://raw.githubusercontent.com/QuantConnect/Lean/master/Data/market-hours/market-hours-database.json"
 SPDB = "https://raw.githubusercontent.com/QuantConnect/Lean/master/Data/symbol-properties/symbol-properties-database.csv"
 KNOWN_MISSING_INDICATORS = ["ValueAtRisk"]
+INSPECTOR = 'https://www.quantconnect.com/services/inspector'
+# On-disk inspector cache shared by every generator run. Entries younger than
+# INSPECTOR_CACHE_TTL seconds are served without a request; older ones are
+# revalidated with ETag/Last-Modified. INSPECTOR_OFFLINE=1 never hits the network.
+INSPECTOR_CACHE = environ.get('INSPECTOR_CACHE_DIR', join(dirname(__file__), '.inspector-cache'))
+INSPECTOR_CACHE_TTL = float(environ.get('INSPECTOR_CACHE_TTL', 24 * 60 * 60))
+INSPECTOR_OFFLINE = environ.get('INSPECTOR_OFFLINE', '').lower() in ('1', 'true', 'yes')
 
 class MARKET_HOUR:
     INTRODUCTION = "introduction"
@@ -49,9 +63,73 @@ def get_lean_cli_commands() -> dict:
     return commands
 
 def get_json_content(url: str) -> List:
-    content = get_text_content(url) \
-        .replace("null", "None").replace("true", "True").replace("false", "False")
-    return eval(content)
+    with urlopen(url) as response:
+        return load(response)
+
+def _inspector_url(_type: str, language: str = None) -> str:
+    url = f'{INSPECTOR}?type=T:{_type}'
+    if language:
+        url += f'&language={language}'
+    return url
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f'{path}.{getpid()}.{get_ident()}.tmp'
+    with open(tmp, 'wb') as fp:
+        fp.write(data)
+    replace(tmp, path)
+
+def get_cached_content(url: str) -> bytes:
+    """Fetch a URL through the on-disk inspector cache.
+    The index maps the URL hash to its validators and the hash of the body,
+    and bodies are stored once under that content hash."""
+    key = sha256(url.encode('utf-8')).hexdigest()
+    index_path = join(INSPECTOR_CACHE, 'index', f'{key}.json')
+    entry = None
+    if exists(index_path):
+        with open(index_path, encoding='utf-8') as fp:
+            entry = loads(fp.read())
+        blob_path = join(INSPECTOR_CACHE, 'blobs', entry['sha256'])
+        if not exists(blob_path):
+            entry = None
+
+    if entry and (INSPECTOR_OFFLINE or time() - entry['fetched'] < INSPECTOR_CACHE_TTL):
+        with open(blob_path, 'rb') as fp:
+            return fp.read()
+    if INSPECTOR_OFFLINE:
+        raise LookupError(f'{url} is not in the inspector cache and INSPECTOR_OFFLINE is set')
+
+    headers = {}
+    if entry:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        headers['If-Modified-Since'] = entry.get('last-modified') or formatdate(entry['fetched'], usegmt=True)
+    try:
+        with urlopen(Request(url, headers=headers)) as response:
+            body = response.read()
+            validators = response.headers
+    except HTTPError as e:
+        if e.code != 304 or not entry:
+            raise
+        entry['fetched'] = time()
+        _write_atomic(index_path, dumps(entry).encode('utf-8'))
+        with open(blob_path, 'rb') as fp:
+            return fp.read()
+
+    digest = sha256(body).hexdigest()
+    makedirs(join(INSPECTOR_CACHE, 'index'), exist_ok=True)
+    makedirs(join(INSPECTOR_CACHE, 'blobs'), exist_ok=True)
+    blob_path = join(INSPECTOR_CACHE, 'blobs', digest)
+    if not exists(blob_path):
+        _write_atomic(blob_path, body)
+    entry = {
+        'url': url,
+        'sha256': digest,
+        'fetched': time(),
+        'etag': validators.get('ETag'),
+        'last-modified': validators.get('Last-Modified')
+    }
+    _write_atomic(index_path, dumps(entry).encode('utf-8'))
+    return body
 
 _type_cache = {}
 
@@ -59,10 +137,7 @@ def get_type(_type: str, language: str = None) -> List:
     cache_key = (_type, language)
     if cache_key in _type_cache:
         return _type_cache[cache_key]
-    url = f'https://www.quantconnect.com/services/inspector?type=T:{_type}'
-    if language:
-        url += f'&language={language}'
-    result = get_json_content(url)
+    result = loads(get_cached_content(_inspector_url(_type, language)))
     _type_cache[cache_key] = result
     return result
 
@@ -73,11 +148,7 @@ def prefetch_types(type_language_pairs: list) -> None:
     if not to_fetch:
         return
     def fetch(pair):
-        _type, language = pair
-        url = f'https://www.quantconnect.com/services/inspector?type=T:{_type}'
-        if language:
-            url += f'&language={language}'
-        return pair, get_json_content(url)
+        return pair, loads(get_cached_content(_inspector_url(*pair)))
     with ThreadPoolExecutor(max_workers=16) as executor:
         futures = {executor.submit(fetch, pair): pair for pair in to_fetch}
         for future in as_completed(futures):
@@ -157,6 +228,19 @@ def title_to_dash_linked_lower_case(title):
         lower_case += char.lower()
     return lower_case
 
+def write_if_changed(path: str, content: str) -> bool:
+    """Write the file unless it already has the content, so unchanged pages keep their timestamps.
+    Returns whether the file was written."""
+    try:
+        with open(path, encoding='utf-8') as fp:
+            if fp.read() == content:
+                return False
+    except FileNotFoundError:
+        pass
+    with open(path, 'w', encoding='utf-8') as fp:
+        fp.write(content)
+    return True
+
 def generate_landing_page(start: int, stop: int, path: str, heading: str, content:str) -> None:
     landing = {
         'type' : 'landing',
@@ -166,5 +250,4 @@ def generate_landing_page(start: int, stop: int, path: str, heading: str, conten
         'alsoLinks' : [],
         'featureShortDescription': {f'{n:02}': '' for n in range(start, stop)}
     }
-    with open(f'{path}/00.json', 'w', encoding='utf-8') as fp:
-        fp.write(dumps(landing, indent=4))
\ No newline at end of file
+    write_if_changed(f'{path}/00.json', dumps(landing, indent=4))
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""Compare the old eval-based inspector decoding with json.loads.
+
+Usage: python code-generators/benchmark_json_decode.py [payload.json] [repeats]
+
+Without a payload path, the QCAlgorithm inspector response is read through
+the on-disk inspector cache (recorded on the first run, or served offline
+with INSPECTOR_OFFLINE=1).
+"""
+from json import loads
+from sys import argv
+from timeit import repeat
+from _code_generation_helpers import get_cached_content, _inspector_url
+
+def eval_decode(content: bytes):
+    text = content.decode('utf-8') \
+        .replace("null", "None").replace("true", "True").replace("false", "False")
+    return eval(text)
+
+def json_decode(content: bytes):
+    return loads(content)
+
+def main():
+    if len(argv) > 1:
+        with open(argv[1], 'rb') as fp:
+            payload = fp.read()
+    else:
+        payload = get_cached_content(_inspector_url("QuantConnect.Algorithm.QCAlgorithm", 'python'))
+    repeats = int(argv[2]) if len(argv) > 2 else 5
+
+    print(f'Payload: {len(payload) / 1024:.0f} KiB')
+    results = {}
+    for name, decode in [('eval', eval_decode), ('json', json_decode)]:
+        best = min(repeat(lambda: decode(payload), number=1, repeat=repeats))
+        results[name] = best
+        print(f'{name:>5}: {best * 1000:8.1f} ms')
+    print(f'speed-up: {results["eval"] / results["json"]:.1f}x')
+    if eval_decode(payload) != json_decode(payload):
+        print('warning: eval decoding differs from json decoding (string contents were rewritten)')
+
+if __name__ == "__main__":
+    main()
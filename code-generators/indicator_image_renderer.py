@@ -0,0 +1,134 @@
+'''Render the indicator reference images from the series the IndicatorImageGenerator backtest exports.
+
+The backtest saves every indicator series in one npz file: `<name>:time` and `<name>:<column>` arrays
+and a `__meta__` JSON string with the titles and column groups. The images are rendered from it in a
+process pool with one shared style, so re-styling every chart doesn't need a backtest:
+
+    python code-generators/indicator_image_renderer.py [--series PATH] [--workers N] [name ...]
+'''
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from json import dumps, loads
+from os import cpu_count, environ, makedirs, replace
+from os.path import dirname, join
+from pathlib import Path
+
+import numpy as np
+
+IMAGES_DIR = Path('Resources/indicators/images')
+# Series of every indicator, merged across backtests.
+SERIES_CACHE = Path(environ.get('INDICATOR_SERIES_CACHE', join(dirname(__file__), '.indicator-series', 'series.npz')))
+STYLE = {
+    'axes.grid': True,
+    'font.size': 10,
+    'legend.fontsize': 9,
+    'savefig.dpi': 100,
+}
+
+# State of each worker process: the open series file and one figure per number of subplots.
+_series = None
+_figures = {}
+
+def load_metadata(path):
+    '''Return {indicator name: {'c_title', 'py_title', 'column_groups'}} of a series file.'''
+    with np.load(path) as series:
+        return loads(str(series['__meta__']))
+
+def merge_series(path, data):
+    '''Merge the series file `data` (bytes) into the one at `path`; its indicators replace the old ones.'''
+    with np.load(BytesIO(data)) as new:
+        arrays = {key: new[key] for key in new.files}
+    metadata = loads(str(arrays.pop('__meta__')))
+    if path.exists():
+        with np.load(path) as old:
+            for key in old.files:
+                if key != '__meta__' and key.partition(':')[0] not in metadata:
+                    arrays[key] = old[key]
+            metadata = {**loads(str(old['__meta__'])), **metadata}
+    arrays['__meta__'] = np.array(dumps(metadata))
+    makedirs(path.parent, exist_ok=True)
+    temporary = path.with_name(f'{path.stem}.tmp.npz')
+    np.savez_compressed(temporary, **arrays)
+    replace(temporary, path)
+
+def _init_worker(path):
+    global _series
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    plt.rcParams.update(STYLE)
+    # Arrays are read from the file on access.
+    _series = np.load(path)
+
+def _figure(rows):
+    '''Return a cleared figure with `rows` subplots, reusing the last one with as many.'''
+    import matplotlib.pyplot as plt
+    if rows not in _figures:
+        fig, axes = plt.subplots(rows, 1, figsize=(10, max(4, 3*rows)), sharex=True, squeeze=False)
+        _figures[rows] = fig, list(axes[:, 0])
+    else:
+        for ax in _figures[rows][1]:
+            ax.cla()
+    return _figures[rows]
+
+def _render(name, metadata, images_dir):
+    '''Render the image of an indicator and return the errors, if any.'''
+    from matplotlib.dates import MonthLocator
+    times = _series[f'{name}:time'].astype('datetime64[ns]')
+    fig, axes = _figure(len(metadata['column_groups']))
+    output = ''
+    for ax, columns in zip(axes, metadata['column_groups']):
+        keys = [f'{name}:{column}' for column in columns]
+        if not all(key in _series.files for key in keys):
+            output += f'Unable to plot {name} - The indicator history is missing some columns\n'
+            continue
+        values = np.column_stack([_series[key] for key in keys])
+        # Like DataFrame.dropna: only the rows where every column has a value.
+        rows = ~np.isnan(values).any(axis=1)
+        for column, column_values in zip(columns, values.T):
+            ax.plot(times[rows], column_values[rows], label=column)
+        ax.legend()
+        ax.grid(True)
+    fig.suptitle(f"C#: {metadata['c_title']}\nPy:  {metadata['py_title']}", x=0.05, ha='left')
+    axes[-1].set_xlabel('Date', fontsize=12)
+    axes[-1].xaxis.set_major_locator(MonthLocator())
+    fig.tight_layout()
+    fig.savefig(join(images_dir, f'{name}.png'))
+    return output
+
+def render_images(series_path, names=None, images_dir=IMAGES_DIR, workers=None):
+    '''
+    Render the images of the indicators in a series file.
+
+    Returns {name: errors} of the rendered images; names that aren't in the file are skipped.
+    '''
+    metadata = load_metadata(series_path)
+    names = [name for name in (names or metadata) if name in metadata]
+    makedirs(images_dir, exist_ok=True)
+    args = (names, [metadata[name] for name in names], [str(images_dir)] * len(names))
+    workers = min(workers or cpu_count() or 1, max(1, len(names)))
+    if workers == 1:
+        _init_worker(str(series_path))
+        return dict(zip(names, map(_render, *args)))
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(str(series_path),)) as executor:
+        return dict(zip(names, executor.map(_render, *args, chunksize=max(1, len(names) // (workers * 4)))))
+
+def main():
+    parser = ArgumentParser(description='Render the indicator images from the exported series.')
+    parser.add_argument('names', nargs='*', help='Indicators to render; all of them by default.')
+    parser.add_argument('--series', type=Path, default=SERIES_CACHE)
+    parser.add_argument('--workers', type=int, default=cpu_count())
+    args = parser.parse_args()
+    if not args.series.exists():
+        print(f'{args.series} not found. Run indicator_reference_code_generator.py --images-only first.')
+        return 1
+    errors = render_images(args.series, args.names, workers=args.workers)
+    for name, error in errors.items():
+        if error:
+            print(f'{name}: {error}', end='')
+    print(f'Rendered {len(errors)} image(s) to {IMAGES_DIR}')
+    return 0
+
+if __name__ == '__main__':
+    exit(main())
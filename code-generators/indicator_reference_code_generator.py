@@ -1,18 +1,22 @@
+from concurrent.futures import ProcessPoolExecutor
+from os import walk
 from os.path import basename
-from sys import exit
+from sys import exit, path as sys_path
 from pathlib import Path
-from re import findall, sub
+from re import findall, finditer, sub
 from shutil import rmtree
 from json import dumps, loads
-from os import environ
-from base64 import b64encode
+from time import time
 from hashlib import sha256
-from time import time, sleep
 from zipfile import ZipFile
 from io import BytesIO
 from urllib.request import urlopen
-from requests import post
-from _code_generation_helpers import INDICATORS, get_type, to_key, generate_landing_page, prefetch_types
+from _code_generation_helpers import INDICATORS, get_type, to_key, generate_landing_page, prefetch_types, write_if_changed
+from indicator_image_renderer import SERIES_CACHE, merge_series, render_images
+
+# The shared API helpers (qc_api) are at the root of the repository.
+sys_path.append(str(Path(__file__).resolve().parents[1]))
+from qc_api import poll, get_policy, PollTimeout, backtest_hint, QuantConnectClient, load_credentials
 
 TAG = f'<!-- Code generated by {basename(__file__)} -->'
 OPTION_INDICATORS = ["ImpliedVolatility", "Delta", "Gamma", "Vega", "Theta", "Rho"]
@@ -20,10 +24,12 @@ REFERENCE = "https://www.lean.io/docs/v2/lean-engine/class-reference/"
 CS_REFERENCE = f"{REFERENCE}cs/classQuantConnect_1_1"
 PY_REFERENCE = f"{REFERENCE}py/QuantConnect/"
 
-QC_API = 'https://www.quantconnect.com/api/v2'
 IMAGE_GENERATOR_PATH = Path('Resources/indicators/IndicatorImageGenerator.py')
 IMAGES_DIR = Path('Resources/indicators/images')
-OBJECT_STORE_PATH = 'indicators/images'
+# Hash of the IndicatorInfo definition each image was generated from.
+IMAGE_MANIFEST_PATH = IMAGES_DIR / 'manifest.json'
+# The IndicatorImageGenerator backtest exports every indicator series to this file.
+SERIES_KEY = 'indicators/series.npz'
 
 def _format_introduction(type_name: str, text: str) -> str:
     if 'CandlestickPatterns' in type_name:
@@ -148,6 +154,9 @@ class IndicatorProcessor:
             if key.startswith(f"{start} "):
                 key = f'{start}{key[3:]}' 
         print(f'Processing {key}...')
+        # The files the processor generates and how many of them changed.
+        self.files = []
+        self.changed = 0
         info.update(self._get_type_info(_type))
         self._info = info
    
@@ -166,12 +175,16 @@ class IndicatorProcessor:
             if 'description' in info else \
             f"Create a new {key} candlestick pattern to indicate the pattern's presence."
         
-        with open(self._path / "01 Introduction.html", 'w', encoding='utf-8') as f:
-            f.write(self._get_introduction(description))
+        self._write("01 Introduction.html", self._get_introduction(description))
 
         self._generate_visualization_section(image)
         self._generate_metadata(key, description, image)
 
+    def _write(self, name, content):
+        path = self._path / name
+        self.files.append(path)
+        self.changed += write_if_changed(path, content)
+
     def _method_class(self):
         return 'QCAlgorithm'
 
@@ -201,8 +214,7 @@ class IndicatorProcessor:
         return get_type(f"QuantConnect.Indicators.{type_}", 'python')
 
     def _generate_visualization_section(self, src):
-        with open(self._path / "03 Visualization.html", mode='w', encoding='utf-8') as f:
-            f.write(f"""{TAG}
+        self._write("03 Visualization.html", f"""{TAG}
 <p>The following plot shows values for some of the <code>{self._info["type-name"]}</code> indicator properties:</p>
 <img class='docs-image' style="width: 100%" alt='{self._info["type-name"]} line plot.' src='{src}'>""")
 
@@ -213,19 +225,18 @@ class IndicatorProcessor:
         description = sub(r'<sup>(.*?)</sup>', "", description)
         if len(description) > 127:
             description = description[:127] + '...'
-        with open(self._path / "metadata.json", mode='w', encoding='utf-8') as f:
-            f.write(dumps({
-                'type': 'metadata',
-                'values': {
-                    'description': description,
-                    'keywords': key.lower(),
-                    'og:type': 'website',
-                    'og:description': description,
-                    'og:title': f'{key} - Using Indicators on QuantConnect.com',
-                    'og:site_name': f'{key} - Using Indicators on QuantConnect.com',
-                    'og:image': image
-                }
-            }, indent=4))
+        self._write("metadata.json", dumps({
+            'type': 'metadata',
+            'values': {
+                'description': description,
+                'keywords': key.lower(),
+                'og:type': 'website',
+                'og:description': description,
+                'og:title': f'{key} - Using Indicators on QuantConnect.com',
+                'og:site_name': f'{key} - Using Indicators on QuantConnect.com',
+                'og:image': image
+            }
+        }, indent=4))
 
     def _process_properties(self):
         self._info[f'properties-python'] = _extract_properties(self._info['properties'])
@@ -242,8 +253,7 @@ class IndicatorProcessor:
 <pre class="csharp">{self._get_csharp_universe_code()}</pre>
 <pre class="python">{self._get_python_universe_code()}</pre></div>'''
 
-        with open(self._path / f"02 Using {self._method_csharp} Indicator.html", mode='w') as f:
-            f.write(f'''<p>To create an automatic indicator for <code>{self._info["type-name"]}</code>, call the <code class='csharp'>{self._method_csharp}</code><code class='python'>{self._method_python}</code> helper method from the <code>QCAlgorithm</code> class. The <code class='csharp'>{self._method_csharp}</code><code class='python'>{self._method_python}</code> method creates a <code>{self._info["type-name"]}</code> object, hooks it up for automatic updates, and returns it so you can used it in your algorithm. In most cases, you should call the helper method in the <code class="csharp">Initialize</code><code class="python">initialize</code> method.<p>
+        self._write(f"02 Using {self._method_csharp} Indicator.html", f'''<p>To create an automatic indicator for <code>{self._info["type-name"]}</code>, call the <code class='csharp'>{self._method_csharp}</code><code class='python'>{self._method_python}</code> helper method from the <code>QCAlgorithm</code> class. The <code class='csharp'>{self._method_csharp}</code><code class='python'>{self._method_python}</code> method creates a <code>{self._info["type-name"]}</code> object, hooks it up for automatic updates, and returns it so you can used it in your algorithm. In most cases, you should call the helper method in the <code class="csharp">Initialize</code><code class="python">initialize</code> method.<p>
 <div class="section-example-container testable">
 <pre class="csharp">{self._get_csharp_code()}</pre>
 <pre class="python">{self._get_python_code()}</pre></div>{universe_code}
@@ -255,8 +265,7 @@ class IndicatorProcessor:
 <pre class="python">{self._get_python_code("ctor")}</pre></div>
 <p>For more information about this indicator, see its <a rel="nofollow" target="_blank" class='csharp' href="{links[2]}">reference</a><a rel="nofollow" target="_blank" class='python' href="{links[3]}">reference</a>.</p>''')
 
-        with open(self._path / "04 Indicator History.html", mode='w', encoding='utf-8') as f:
-            f.write(f'''<p>To get the historical data of the <code>{self._info["type-name"]}</code> indicator, call the <code class="csharp">IndicatorHistory</code><code class="python">self.indicator_history</code> method. This method resets your indicator, makes a <a href='/docs/v2/writing-algorithms/historical-data/history-requests'>history request</a>, and updates the indicator with the historical data. Just like with regular history requests, the <code class="csharp">IndicatorHistory</code><code class="python">indicator_history</code> method supports time periods based on a trailing number of bars, a trailing period of time, or a defined period of time. If you don't provide a <code>resolution</code> argument, it defaults to match the resolution of the security subscription.
+        self._write("04 Indicator History.html", f'''<p>To get the historical data of the <code>{self._info["type-name"]}</code> indicator, call the <code class="csharp">IndicatorHistory</code><code class="python">self.indicator_history</code> method. This method resets your indicator, makes a <a href='/docs/v2/writing-algorithms/historical-data/history-requests'>history request</a>, and updates the indicator with the historical data. Just like with regular history requests, the <code class="csharp">IndicatorHistory</code><code class="python">indicator_history</code> method supports time periods based on a trailing number of bars, a trailing period of time, or a defined period of time. If you don't provide a <code>resolution</code> argument, it defaults to match the resolution of the security subscription.
 </p>
 <div class="section-example-container testable">
 <pre class="csharp">{self._get_csharp_history()}</pre>
@@ -705,27 +714,40 @@ class CandlestickProcessor(IndicatorProcessor):
         timedelta_indicator_history = self.indicator_history(self._{variable}, self._symbol, timedelta(days=10), Resolution.MINUTE)
         time_period_indicator_history = self.indicator_history(self._{variable}, self._symbol, datetime(2024, 7, 1), datetime(2024, 7, 5), Resolution.MINUTE)""")
 
-def _get_api_credentials():
-    user_id = environ.get('QUANTCONNECT_USER_ID')
-    api_token = environ.get('QUANTCONNECT_API_TOKEN')
-    if user_id and api_token:
-        return str(user_id), api_token
-    creds = loads((Path.home() / '.lean' / 'credentials').read_text())
-    return str(creds['user-id']), creds['api-token']
-
-def _get_api_headers():
-    user_id, api_token = _get_api_credentials()
-    timestamp = str(int(time()))
-    hashed_token = sha256(f'{api_token}:{timestamp}'.encode('utf-8')).hexdigest()
-    auth = b64encode(f'{user_id}:{hashed_token}'.encode('utf-8')).decode('ascii')
-    return {'Authorization': f'Basic {auth}', 'Timestamp': timestamp}
+_api_client = None
 
 def _api_post(endpoint, payload=None):
-    return post(f'{QC_API}/{endpoint}', headers=_get_api_headers(), json=payload or {}).json()
-
-def _extract_image_names():
+    global _api_client
+    if _api_client is None:
+        user_id, api_token = load_credentials('QUANTCONNECT_USER_ID', 'QUANTCONNECT_API_TOKEN')
+        if not user_id:
+            raise RuntimeError('Set QUANTCONNECT_USER_ID and QUANTCONNECT_API_TOKEN or log in with the LEAN CLI.')
+        _api_client = QuantConnectClient(user_id, api_token)
+    return _api_client.post(endpoint, payload)
+
+def _extract_image_definitions():
+    """Return {image name: hash of its IndicatorInfo(...) definition}."""
     content = IMAGE_GENERATOR_PATH.read_text(encoding='utf-8')
-    return set(findall(r"'([a-z0-9_\-]+)':\s*IndicatorInfo\(", content))
+    definitions = {}
+    for match in finditer(r"'([a-z0-9_\-]+)':\s*IndicatorInfo\(", content):
+        # Find the closing parenthesis of IndicatorInfo(...).
+        depth, end = 1, match.end()
+        while depth and end < len(content):
+            depth += {'(': 1, ')': -1}.get(content[end], 0)
+            end += 1
+        # Ignore formatting changes.
+        definition = ' '.join(content[match.start():end].split())
+        definitions[match.group(1)] = sha256(definition.encode('utf-8')).hexdigest()
+    return definitions
+
+def _read_image_manifest():
+    """Return {image name: definition hash} of the images in IMAGES_DIR."""
+    if not IMAGE_MANIFEST_PATH.exists():
+        return None
+    return loads(IMAGE_MANIFEST_PATH.read_text(encoding='utf-8'))
+
+def _write_image_manifest(manifest):
+    IMAGE_MANIFEST_PATH.write_text(dumps(manifest, indent=2, sort_keys=True) + '\n', encoding='utf-8')
 
 def _wait_for_compile(project_id):
     response = _api_post('compile/create', {'projectId': project_id})
@@ -733,63 +755,88 @@ def _wait_for_compile(project_id):
         print(f'compile/create failed: {response}')
         return None
     compile_id = response['compileId']
-    for _ in range(60):  # 60 * 10s = 10 minutes
-        response = _api_post('compile/read', {'projectId': project_id, 'compileId': compile_id})
-        state = response.get('state')
-        if state == 'BuildSuccess':
-            return compile_id
-        if state == 'BuildError':
-            print(f'compile error: {response}')
-            return None
-        sleep(10)
-    print('compile timed out after 10 minutes')
-    return None
+    try:
+        response = poll(
+            lambda: _api_post('compile/read', {'projectId': project_id, 'compileId': compile_id}),
+            lambda response: response.get('state') in ('BuildSuccess', 'BuildError'),
+            'compile/read'
+        )
+    except PollTimeout:
+        print('compile timed out after 10 minutes')
+        return None
+    if response.get('state') == 'BuildError':
+        print(f'compile error: {response}')
+        return None
+    return compile_id
 
-def _run_backtest(project_id, compile_id, name):
+def _run_backtest(project_id, compile_id, name, parameters=None):
     response = _api_post('backtests/create', {
-        'projectId': project_id, 'compileId': compile_id, 'backtestName': name
+        'projectId': project_id, 'compileId': compile_id, 'backtestName': name,
+        'parameters': parameters or {}
     })
     if not response.get('success'):
         print(f'backtests/create failed: {response}')
         return None
     backtest_id = response['backtest']['backtestId']
-    for _ in range(60):  # 60 * 10s = 10 minutes
+
+    def read_backtest():
         response = _api_post('backtests/read', {'projectId': project_id, 'backtestId': backtest_id})
-        if response.get('success'):
-            backtest = response['backtest']
-            if isinstance(backtest, list):
-                backtest = backtest[0]
-            if backtest.get('completed'):
-                if backtest.get('error'):
-                    print(f'backtest error: {backtest["error"]}')
-                    return None
-                return backtest_id
-        sleep(10)
-    print('backtest timed out after 10 minutes')
-    return None
-
-def _download_object_store_zip(organization_id, names):
-    keys = [f'{OBJECT_STORE_PATH}/{name}.png' for name in names]
-    last_response = None
-    for _ in range(60):  # 60 * 10s = 10 minutes
-        last_response = _api_post('object/get', {'organizationId': organization_id, 'keys': keys})
-        if last_response.get('success') and last_response.get('url'):
-            try:
-                return urlopen(last_response['url']).read()
-            except Exception as e:
-                print(f'Failed to download object store zip: {e}')
-                return None
-        sleep(10)
-    print(f'object/get URL not available after 10 minutes: {last_response}')
-    return None
+        if not response.get('success'):
+            return None
+        backtest = response['backtest']
+        return backtest[0] if isinstance(backtest, list) else backtest
+
+    try:
+        backtest = poll(
+            read_backtest, lambda backtest: backtest.get('completed'), 'backtests/read',
+            policy=get_policy('backtests/read', timeout=600), hint=backtest_hint
+        )
+    except PollTimeout:
+        print('backtest timed out after 10 minutes')
+        return None
+    if backtest.get('error'):
+        print(f'backtest error: {backtest["error"]}')
+        return None
+    return backtest_id
+
+def _download_object_store_zip(organization_id, keys):
+    # Create a download job, then poll the job for its URL.
+    response = _api_post('object/get', {'organizationId': organization_id, 'keys': keys})
+    if not response.get('success') or not response.get('jobId'):
+        print(f'object/get failed: {response}')
+        return None
+    job_id = response['jobId']
+    try:
+        response = poll(
+            lambda: _api_post('object/get', {'organizationId': organization_id, 'jobId': job_id}),
+            lambda response: response.get('success') and response.get('url'),
+            'object/get'
+        )
+    except PollTimeout as e:
+        print(f'object/get URL not available after 10 minutes: {e.last_result}')
+        return None
+    try:
+        return urlopen(response['url']).read()
+    except Exception as e:
+        print(f'Failed to download object store zip: {e}')
+        return None
 
 def _generate_missing_images():
-    expected = _extract_image_names()
-    missing = sorted(name for name in expected if not (IMAGES_DIR / f'{name}.png').exists())
+    definitions = _extract_image_definitions()
+    manifest = _read_image_manifest()
+    if manifest is None:
+        # Without a manifest, trust the images that exist.
+        manifest = {name: definitions[name] for name in definitions if (IMAGES_DIR / f'{name}.png').exists()}
+        IMAGES_DIR.mkdir(parents=True, exist_ok=True)
+        _write_image_manifest(manifest)
+    missing = sorted(
+        name for name, digest in definitions.items()
+        if manifest.get(name) != digest or not (IMAGES_DIR / f'{name}.png').exists()
+    )
     if not missing:
-        print('All indicator images are present.')
+        print('All indicator images are up to date.')
         return
-    print(f'{len(missing)} image(s) missing: {", ".join(missing)}')
+    print(f'{len(missing)} image(s) missing or out of date: {", ".join(missing)}')
     print('Creating QuantConnect project to regenerate images...')
 
     timestamp = int(time())
@@ -819,27 +866,61 @@ def _generate_missing_images():
             return
 
         print('Running backtest...')
-        if not _run_backtest(project_id, compile_id, f'GenerateImages_{timestamp}'):
+        # Only compute and render the images that need it.
+        if not _run_backtest(project_id, compile_id, f'GenerateImages_{timestamp}', {'indicators': ','.join(missing)}):
             return
 
-        print(f'Downloading {len(missing)} image(s) from object store...')
-        zip_bytes = _download_object_store_zip(organization_id, missing)
+        print('Downloading the indicator series from object store...')
+        zip_bytes = _download_object_store_zip(organization_id, [SERIES_KEY])
         if not zip_bytes:
-            print('Skipping image extraction because the download failed.')
-        else:
-            IMAGES_DIR.mkdir(parents=True, exist_ok=True)
-            saved = 0
-            with ZipFile(BytesIO(zip_bytes)) as z:
-                for info in z.infolist():
-                    if info.filename.endswith('.png'):
-                        name = basename(info.filename)
-                        (IMAGES_DIR / name).write_bytes(z.read(info))
-                        print(f'  {name}')
-                        saved += 1
-            print(f'Saved {saved} image(s) to {IMAGES_DIR}')
+            print('Skipping image rendering because the download failed.')
+            return
+        with ZipFile(BytesIO(zip_bytes)) as z:
+            entries = [info for info in z.infolist() if info.filename.endswith(basename(SERIES_KEY))]
+            if not entries:
+                print(f'Skipping image rendering because {SERIES_KEY} is missing from the download.')
+                return
+            merge_series(SERIES_CACHE, z.read(entries[0]))
     finally:
         _api_post('projects/delete', {'projectId': project_id})
 
+    print(f'Rendering {len(missing)} image(s)...')
+    errors = render_images(SERIES_CACHE, missing)
+    failed = [name for name in missing if errors.get(name, 'Missing from the series')]
+    for name in missing:
+        error = errors.get(name, 'Missing from the series')
+        print(f'  {name}.png' + (f' :: {error.strip()}' if error else ''))
+        # Failed images are retried on the next run.
+        if not error:
+            manifest[name] = definitions[name]
+    _write_image_manifest({name: digest for name, digest in manifest.items() if name in definitions})
+    print(f'Saved {len(missing) - len(failed)} image(s) to {IMAGES_DIR}' + (f', {len(failed)} failed' if failed else ''))
+
+def _generate_page(job):
+    processor, i, type_, info = job
+    page = processor(i, type_, info)
+    page.run()
+    return page.files, page.changed
+
+def _remove_orphans(root, files):
+    '''Delete the directories and files under `root` that aren't in `files`; return their paths.'''
+    files = set(files)
+    directories = {parent for file in files for parent in file.parents}
+    removed = []
+    for directory, subdirectories, names in walk(root):
+        for name in list(subdirectories):
+            path = Path(directory, name)
+            if path not in directories:
+                rmtree(path)
+                subdirectories.remove(name)
+                removed.append(str(path))
+        for name in names:
+            path = Path(directory, name)
+            if path not in files:
+                path.unlink()
+                removed.append(str(path))
+    return removed
+
 def main():
     helpers, undocumented = _get_helpers()
 
@@ -852,30 +933,36 @@ def main():
     print(f'Pre-fetching {len(pairs)} type definitions...')
     prefetch_types(pairs)
 
-    for i, (type_, info) in enumerate(helpers.items()):
-        if type_ in OPTION_INDICATORS:
-            OptionIndicatorProcessor(i, type_, info).run()
-        else:
-            IndicatorProcessor(i, type_, info).run()
+    jobs = [(OptionIndicatorProcessor if type_ in OPTION_INDICATORS else IndicatorProcessor, i, type_, info)
+        for i, (type_, info) in enumerate(helpers.items())]
+    candlestick_methods = get_type(f"QuantConnect.Algorithm.CandlestickPatterns", 'csharp')['methods']
+    jobs += [(CandlestickProcessor, i, type_, {})
+        for i, type_ in enumerate(sorted([x['method-name'] for x in candlestick_methods]))]
+
+    # The workers read the types from the inspector cache the prefetch filled.
+    files, changed = [], 0
+    with ProcessPoolExecutor() as executor:
+        for page_files, page_changed in executor.map(_generate_page, jobs, chunksize=8):
+            files += page_files
+            changed += page_changed
 
     count = len(helpers)
-    with open('Resources/indicators/indicator_count.html', 'w', encoding='utf-8') as fp:
-        fp.write(f'There are {count} indicators.')
+    write_if_changed('Resources/indicators/indicator_count.html', f'There are {count} indicators.')
 
     generate_landing_page(0, count, INDICATORS, 'Supported Indicators',
         '<p>Indicators translate a stream of data points into a numerical value you can use to detect trading opportunities. LEAN provides more than 100 pre-built technical indicators and candlestick patterns you can use in your algorithms. You can use any of the following indicators. Click one to learn more.</p>')
 
-    candlestick_methods = get_type(f"QuantConnect.Algorithm.CandlestickPatterns", 'csharp')['methods']
-    for i, type_ in enumerate(sorted([x['method-name'] for x in candlestick_methods])):
-        CandlestickProcessor(i, type_).run()
-
     candles = len(candlestick_methods)
-    with open('Resources/indicators/candlestick_pattern_count.html', 'w', encoding='utf-8') as fp:
-        fp.write(f'There are {candles} candlestick pattern indicators.')
+    write_if_changed('Resources/indicators/candlestick_pattern_count.html', f'There are {candles} candlestick pattern indicators.')
 
     generate_landing_page(1, 1+candles, f'{INDICATORS}/00 Candlestick Patterns', 'Candlestick Patterns',
         '<p>You can use any of the following candlestick patterns. Click one to learn more.</p>')
 
+    print(f'Updated {changed} of {len(files)} indicator page files')
+    files += [Path(INDICATORS) / '00.json', Path(INDICATORS) / '00 Candlestick Patterns' / '00.json']
+    for path in _remove_orphans(INDICATORS, files):
+        print(f'Removed {path}')
+
     if undocumented:
         print('Undocumented indicators:' + ', '.join([f'{k}: {v[0]}' for k,v in undocumented.items()]))
 
@@ -892,6 +979,7 @@ if __name__ == "__main__":
             rmtree(IMAGES_DIR, ignore_errors=True)
         _generate_missing_images()
         exit(0)
-    # DELETE ALL FILES
-    rmtree(INDICATORS, ignore_errors=True)
+    if '--clean' in argv:
+        # Regenerate every file from scratch instead of only the changed ones.
+        rmtree(INDICATORS, ignore_errors=True)
     exit(main())
\ No newline at end of file
@@ -1,14 +1,14 @@
-from urllib.request import urlopen
 from pathlib import Path
+from _code_generation_helpers import get_type
 
 OUTPUT_DIR = Path("Resources/securities")
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-links = {
-    "Security": "https://www.quantconnect.com/services/inspector?type=T:QuantConnect.Securities.Security",
-    "SecurityPortfolioManager": "https://www.quantconnect.com/services/inspector?type=T:QuantConnect.Securities.SecurityPortfolioManager",
-    "SecurityHolding": "https://www.quantconnect.com/services/inspector?type=T:QuantConnect.Securities.SecurityHolding",
-    "SymbolProperties": "https://www.quantconnect.com/services/inspector?type=T:QuantConnect.Securities.SymbolProperties"
+types = {
+    "Security": "QuantConnect.Securities.Security",
+    "SecurityPortfolioManager": "QuantConnect.Securities.SecurityPortfolioManager",
+    "SecurityHolding": "QuantConnect.Securities.SecurityHolding",
+    "SymbolProperties": "QuantConnect.Securities.SymbolProperties"
 }
 
 filenames = {
@@ -24,16 +24,15 @@ cs2py = {
     "TimeSpan": "timedelta",
 }
 
-for item, url in links.items():
-    json = urlopen(url).read().decode("utf-8") \
-            .replace("true", "True") \
-            .replace("false", "False") \
-            .replace("null", "None") \
-            .replace("<", "&lt;") \
+def to_html(text):
+    """Escape the text and turn its property references into code tags."""
+    return (text or '').replace("<", "&lt;") \
             .replace(">", "&gt;") \
-            .replace('&lt;see cref=\\"P:', '<code>') \
-            .replace('\\" /&gt;', '</code>')
-    json_dict = eval(json)
+            .replace('&lt;see cref="P:', '<code>') \
+            .replace('" /&gt;', '</code>')
+
+for item, full_name in types.items():
+    json_dict = get_type(full_name)
 
     html_code = f"""<p>The following table describes the properties of the <code>{item}</code> class:</p>
 
@@ -45,9 +44,9 @@ for item, url in links.items():
         if type_name in cs2py:
             type_name = f'<code class="csharp">{type_name}</code><code class="python">{cs2py[type_name]}</code>'
         else:
-            type_name = f'<code>{type_name}</code>'
+            type_name = f'<code>{to_html(type_name)}</code>'
 
-        html_code += f"""<tr><td><code>{attr['property-name']}</code></td><td>{type_name}</td><td>{attr['property-description']}</td></tr>
+        html_code += f"""<tr><td><code>{to_html(attr['property-name'])}</code></td><td>{type_name}</td><td>{to_html(attr['property-description'])}</td></tr>
 """
     html_code += "</table>"
     
@@ -1,9 +1,5 @@
 """API client for QuantConnect API interactions."""
-import base64
-import hashlib
-import time
-import requests
-from ratelimit import limits, sleep_and_retry
+from qc_api import poll, PollTimeout, backtest_hint, QuantConnectClient
 
 from config import Config
 
@@ -11,39 +7,22 @@ from config import Config
 class APIClient:
     """Handles authentication and API calls to QuantConnect."""
 
-    def __init__(self):
-        self._user_id = Config.USER_ID
-        self._user_token = Config.USER_TOKEN
-        self._base_api = Config.BASE_API
-
-    def _get_headers(self):
-        """Generate authentication headers for API requests."""
-        # Get the timestamp.
-        timestamp = str(int(time.time()))
-        time_stamped_token = f"{self._user_token}:{timestamp}"
-        # Get the hashed API token.
-        hashed_token = hashlib.sha256(
-            time_stamped_token.encode('utf-8')
-        ).hexdigest()
-        authentication = f"{self._user_id}:{hashed_token}"
-        api_token = base64.b64encode(
-            authentication.encode('utf-8')
-        ).decode('ascii')
-        # Create the headers dictionary.
-        return {
-            'Authorization': f'Basic {api_token}',
-            'Timestamp': timestamp
-        }
-
-    @sleep_and_retry
-    @limits(calls=Config.CALLS, period=Config.RATE_LIMIT)
+    def __init__(self, rate_limiter=None):
+        """
+        Args:
+            rate_limiter: TokenBucket to use instead of the one the
+                qc_api clients of the process share
+        """
+        # One pooled connection per API thread. The client retries failed
+        # requests, except the ones that could create something twice.
+        self._client = QuantConnectClient(
+            Config.USER_ID, Config.USER_TOKEN, Config.BASE_API,
+            rate_limiter=rate_limiter, pool_size=Config.API_THREADS
+        )
+
     def _post(self, endpoint, payload={}):
         """Make a rate-limited POST request to the API."""
-        return requests.post(
-            f"{self._base_api}/{endpoint}",
-            headers=self._get_headers(),
-            json=payload
-        ).json()
+        return self._client.post(endpoint, payload)
 
     def authenticate(self):
         """Authenticate with QuantConnect API."""
@@ -54,74 +33,124 @@ class APIClient:
         print("API Authentication Failed.")
         return False
 
+    def read_lean_version(self):
+        """Return the latest LEAN version Id, or None if it can't be read."""
+        response = self._post("lean/versions/read")
+        versions = response.get("versions") if response.get("success") else None
+        if not versions:
+            return None
+        return max(version["id"] for version in versions)
+
     def create_project(self, name, language):
         """Create a new project and return the project Id."""
         return self._post(
             'projects/create', {'name': name, 'language': language}
         )['projects'][0]['projectId']
 
+    def list_projects(self):
+        """Return the projects of the user."""
+        response = self._post("projects/read")
+        return response.get("projects", []) if response.get("success") else []
+
+    def update_project(self, project_id, name=None, description=None):
+        """Rename a project or change its description."""
+        payload = {"projectId": project_id}
+        if name is not None:
+            payload["name"] = name
+        if description is not None:
+            payload["description"] = description
+        return self._post("projects/update", payload).get("success", False)
+
+    def delete_project(self, project_id):
+        """Delete a project."""
+        return self._post(
+            "projects/delete", {"projectId": project_id}
+        ).get("success", False)
+
+    def read_file_names(self, project_id):
+        """Return the names of the files in the project."""
+        response = self._post("files/read", {"projectId": project_id})
+        if not response.get("success"):
+            return []
+        return [file["name"] for file in response.get("files", [])]
+
+    def delete_file(self, project_id, file_name):
+        """Delete a file from the project."""
+        return self._post(
+            "files/delete", {"projectId": project_id, "name": file_name}
+        ).get("success", False)
+
     def update_file(self, project_id, file_name, content):
         """Update a file in the project."""
-        for _ in range(Config.MAX_RETRY_ATTEMPTS):
-            response = self._post(
-                "files/update", 
-                {"projectId": project_id, "name": file_name, "content": content}
+        # Updates are idempotent, so a rejected update is tried again.
+        try:
+            poll(
+                lambda: self._post(
+                    "files/update",
+                    {"projectId": project_id, "name": file_name, "content": content}
+                ),
+                lambda r: r.get("success"),
+                "files/update"
             )
-            if response.get("success"):
-                return True
-            time.sleep(3)
-        return False
+        except PollTimeout:
+            return False
+        return True
 
     def compile_project(self, project_id):
         """Compile a project and return the compile ID."""
         response = self._post("compile/create", {"projectId": project_id})
-        for _ in range(Config.MAX_RETRY_ATTEMPTS):
-            if response.get("state") == "BuildError":
-                return None
-            response = self._post(
-                "compile/read", 
-                {"projectId": project_id, "compileId": response["compileId"]}
+        if response.get("state") == "BuildError" or not response.get("compileId"):
+            return None
+        compile_id = response["compileId"]
+        try:
+            response = poll(
+                lambda: self._post(
+                    "compile/read",
+                    {"projectId": project_id, "compileId": compile_id}
+                ),
+                lambda r: r.get("state") in ("BuildSuccess", "BuildError"),
+                "compile/read"
             )
-            if response.get("success") and response.get("state") == "BuildSuccess":
-                return response["compileId"]
-            time.sleep(1)
+        except PollTimeout:
+            return None
+        if response.get("success") and response.get("state") == "BuildSuccess":
+            return compile_id
         return None
 
     def create_backtest(self, project_id, compile_id, backtest_name):
-        """Create a backtest and return the backtest Id."""
-        for _ in range(Config.MAX_RETRY_ATTEMPTS):
-            response = self._post(
-                "backtests/create", 
-                {
-                    "projectId": project_id,
-                    "compileId": compile_id,
-                    "backtestName": backtest_name
-                }
-            )
-            if response.get("success"):
-                break
-            time.sleep(3)
-        return response
+        """Create a backtest and return the response."""
+        return self._post(
+            "backtests/create",
+            {
+                "projectId": project_id,
+                "compileId": compile_id,
+                "backtestName": backtest_name
+            }
+        )
 
     def read_backtest(self, project_id, backtest_id):
         """Read backtest results, waiting for completion."""
-        errors = 0
-        while True:
-            response = self._post(
-                "backtests/read", 
-                {"projectId": project_id, "backtestId": backtest_id}
+        try:
+            return poll(
+                lambda: self.read_backtest_once(project_id, backtest_id),
+                lambda backtest: backtest.get("completed"),
+                "backtests/read",
+                hint=backtest_hint
             )
-            if not response.get("success"):
-                errors += 1
-                if errors >= Config.MAX_RETRY_ATTEMPTS:
-                    return None
-                continue
-            backtest = response["backtest"]
-            if isinstance(backtest, list):
-                backtest = backtest[0]
-            if backtest.get("completed"):
-                break
-            time.sleep(10)
+        except PollTimeout:
+            return None
+
+    def read_backtest_once(self, project_id, backtest_id):
+        """Read the current backtest state without waiting, or None on failure."""
+        response = self._post(
+            "backtests/read", 
+            {"projectId": project_id, "backtestId": backtest_id}
+        )
+        if not response.get("success"):
+            return None
+        backtest = response["backtest"]
+        if isinstance(backtest, list):
+            backtest = backtest[0]
         return backtest
 
     def read_backtest_logs(
@@ -1,6 +1,10 @@
 """Backtest execution and validation."""
+import math
+import re
 import time
 
+from qc_api import poll, get_policy, PollTimeout
+
 from config import Config
 from utils import Language
 
@@ -8,10 +12,29 @@ from utils import Language
 class BacktestResult:
     """Result of a backtest execution."""
 
-    def __init__(self, success, error_message, statistics={}):
+    def __init__(self, success, error_message, statistics={}, timings=None):
         self.success = success
         self.error_message = error_message
         self.statistics = statistics
+        # Seconds spent in each phase (update, compile, queue, run, log_scan).
+        self.timings = timings if timings is not None else {}
+
+
+class PhaseTimer:
+    """Records the time between laps into a timings dictionary."""
+
+    def __init__(self, timings):
+        self._timings = timings
+        self._start = time.perf_counter()
+
+    def lap(self, phase):
+        """Add the time since the previous lap to `phase`."""
+        now = time.perf_counter()
+        if self._timings is not None:
+            self._timings[phase] = (
+                self._timings.get(phase, 0) + now - self._start
+            )
+        self._start = now
 
 
 class BacktestRunner:
@@ -23,7 +46,8 @@ class BacktestRunner:
     }
 
     def __init__(
-            self, api_client, compiler_by_langugage, project_id_by_language):
+            self, api_client, compiler_by_langugage,
+            project_id_by_language=None):
         """Initialize backtest runner."""
         self._api_client = api_client
         self._compiler_by_langugage = compiler_by_langugage
@@ -33,25 +57,58 @@ class BacktestRunner:
         """Execute a backtest and return results."""
         # Get the project Id.
         project_id = self._project_id_by_language[code_block.language]
-        # Clean and prepare code.
+
+        compile_id, error = self.compile_code_block(code_block, project_id)
+        if error:
+            return error
+
+        backtest_id, error = self.create_backtest(
+            code_block, project_id, compile_id
+        )
+        if error:
+            return error
+
+        # Read the backtest results.
+        backtest = self._api_client.read_backtest(project_id, backtest_id)
+        return self.check_backtest(backtest, project_id, backtest_id)
+
+    def prepare_code(self, code_block):
+        """Clean the code block and prepare it to run as a backtest."""
         compiler = self._compiler_by_langugage[code_block.language]
-        code = compiler.prepare_for_backtest(
+        return compiler.prepare_for_backtest(
             compiler.clean_code(code_block.code)
         )
 
+    def compile_code_block(self, code_block, project_id, timings=None):
+        """
+        Put the code block in the project and compile it.
+
+        Args:
+            code_block: CodeBlock to compile
+            project_id: Id of the project to compile it in
+            timings: Optional dictionary to record phase durations in
+
+        Returns:
+            Tuple of (compile Id, None) or (None, failed BacktestResult).
+        """
+        code = self.prepare_code(code_block)
+
         #print(f'{datetime.now()} -- Starting test for {code_block}')
 
         # Update the project code.
+        timer = PhaseTimer(timings)
         success = self._api_client.update_file(
             project_id, self._file_name[code_block.language], code
         )
         if not success:
-            return BacktestResult(False, "Update project content failed")
+            return None, BacktestResult(False, "Update project content failed")
+        timer.lap("update")
 
         # Compile the project.
         compile_id = self._api_client.compile_project(project_id)
+        timer.lap("compile")
         if not compile_id:
-            return BacktestResult(False, "Compile project failed")
+            return None, BacktestResult(False, "Compile project failed")
 
         ## Check the syntax.
         #if language == Language.PYTHON:
@@ -59,25 +116,35 @@ class BacktestRunner:
         #    if syntax_error:
         #        return BacktestResult(False, f"Syntax error: {syntax_error}")
 
-        # Create a backtest.
+        return compile_id, None
+
+    def create_backtest(self, code_block, project_id, compile_id):
+        """
+        Start a backtest of a compiled project.
+
+        Returns:
+            Tuple of (backtest Id, None) or (None, failed BacktestResult).
+        """
         response = self._api_client.create_backtest(
             project_id, compile_id, code_block.get_backtest_name()
         )
         if not response.get("success"):
-            return BacktestResult(
+            return None, BacktestResult(
                 False, f"Create backtest failed. Reponse={response}"
             )
-        backtest_id = response["backtest"]["backtestId"]
-        
-        # Read the backtest results.
-        backtest = self._api_client.read_backtest(project_id, backtest_id)
+        return response["backtest"]["backtestId"], None
+
+    def check_backtest(self, backtest, project_id, backtest_id, timings=None):
+        """Validate a completed backtest and collect its statistics."""
         if not backtest:
             return BacktestResult(False, "Read backtest failed")
 
         # Ensure the backtest finished without error.
+        timer = PhaseTimer(timings)
         is_valid, error_msg = self._validate_backtest(
             backtest, project_id, backtest_id
         )
+        timer.lap("log_scan")
         if not is_valid:
             return BacktestResult(False, error_msg)
 
@@ -99,48 +166,116 @@ class BacktestRunner:
             return False, f'Backtest stacktrace: {backtest["stacktrace"]}'
 
         # Check logs
-        if not self._logs_are_available(project_id, backtest_id):
+        log_length = self._read_log_length(project_id, backtest_id)
+        if log_length is None:
             return False, "Logs didn't load in time"
-        failed_queries = self._scan_logs(project_id, backtest_id)
+        failed_queries = self._scan_logs(project_id, backtest_id, log_length)
         if failed_queries:
             return False, f'Failed queries: {failed_queries}'
 
         return True, ""
 
-    def _logs_are_available(self, project_id, backtest_id):
-        """Check if logs are available."""
-        for _ in range(Config.MAX_LOG_ATTEMPTS):
+    def _read_log_length(self, project_id, backtest_id):
+        """Wait for the logs and return their number of lines, or None."""
+        try:
+            response = poll(
+                lambda: self._api_client.read_backtest_logs(
+                    project_id, backtest_id, start=0, end=1
+                ),
+                lambda r: r.get("success") and r.get('length'),
+                "backtests/read/log"
+            )
+        except PollTimeout:
+            return None
+        return response['length']
+
+    def _scan_logs(self, project_id, backtest_id, log_length):
+        """
+        Scan logs for error patterns.
+
+        Downloads the log and matches every query locally when that takes
+        fewer requests than one server-side query per pattern (see
+        Config.LOG_SCAN).
+        """
+        queries = [query for query in Config.ERROR_LOG_QUERIES if query]
+        pages = math.ceil(log_length / Config.LOG_PAGE_SIZE)
+        lines = None
+        if (Config.LOG_SCAN == "local" or
+                Config.LOG_SCAN == "auto" and pages <= len(queries)):
+            lines = self._read_log(project_id, backtest_id, log_length)
+        if lines is not None:
+            matched = _match_log_queries(lines)
+        else:
+            matched = {
+                query for query in queries
+                if self._api_client.read_backtest_logs(
+                    project_id, backtest_id, query
+                ).get('length', 0)
+            }
+        # Check if query matched or if too many log lines
+        return [
+            query for query in Config.ERROR_LOG_QUERIES
+            if query in matched or
+            not query and log_length > Config.MAX_LOG_LINES
+        ]
+
+    def _read_log(self, project_id, backtest_id, log_length):
+        """Read all the log lines in pages, or None if a page fails."""
+        lines = []
+        for start in range(0, log_length, Config.LOG_PAGE_SIZE):
             response = self._api_client.read_backtest_logs(
-                project_id, backtest_id, start=0, end=1
+                project_id, backtest_id, start=start,
+                end=min(log_length, start + Config.LOG_PAGE_SIZE)
             )
-            if response.get("success") and response.get('length'):
-                return True
-            time.sleep(5)
-        return False
-
-    def _scan_logs(self, project_id, backtest_id):
-        """Scan logs for error patterns."""
-        failed_queries = []
-        for query in Config.ERROR_LOG_QUERIES:
-            log_lines = self._api_client.read_backtest_logs(
-                project_id, backtest_id, query
-            ).get('length', 0)
-            # Check if query matched or if too many log lines
-            if (query and log_lines or 
-                not query and log_lines > Config.MAX_LOG_LINES):
-                failed_queries.append(query)
-        return failed_queries
+            if not response.get("success"):
+                return None
+            lines.extend(response.get("logs", []))
+        return lines
 
     def _get_statistics(self, backtest, project_id, backtest_id):
         """Get backtest statistics."""
-        for _ in range(Config.MAX_RETRY_ATTEMPTS):
-            statistics = backtest.get("statistics")
-            if isinstance(statistics, list) and statistics:
-                statistics = statistics[0]
-            if statistics:
-                return statistics
-            time.sleep(5)
-            backtest = self._api_client.read_backtest(project_id, backtest_id)
-            if not backtest:
-                break
-        return None
+        statistics = _statistics_of(backtest)
+        if statistics:
+            return statistics
+        # Statistics can arrive shortly after the backtest completes.
+        try:
+            backtest = poll(
+                lambda: self._api_client.read_backtest_once(
+                    project_id, backtest_id
+                ),
+                _statistics_of,
+                "backtests/read",
+                policy=get_policy(
+                    "backtests/read", first_delay=2, maximum=10, timeout=30
+                )
+            )
+        except PollTimeout:
+            return None
+        return _statistics_of(backtest)
+
+
+# One pass over the log finds the lines that contain any query.
+_LOG_QUERY_PATTERN = re.compile(
+    "|".join(re.escape(query) for query in Config.ERROR_LOG_QUERIES if query)
+)
+
+
+def _match_log_queries(lines):
+    """Return the error log queries found in the log lines."""
+    matched = set()
+    for line in lines:
+        if _LOG_QUERY_PATTERN.search(line):
+            # Queries can overlap, so check each one on the few hits.
+            matched.update(
+                query for query in Config.ERROR_LOG_QUERIES
+                if query and query in line
+            )
+    return matched
+
+
+def _statistics_of(backtest):
+    """Return the statistics of a backtests/read response, if any."""
+    statistics = backtest.get("statistics")
+    if isinstance(statistics, list) and statistics:
+        statistics = statistics[0]
+    return statistics
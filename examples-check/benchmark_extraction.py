@@ -0,0 +1,65 @@
+"""Benchmark code-block extraction on the full docs tree.
+
+Usage (from the root of the repo, with the regression test environment
+variables set):
+    python examples-check/benchmark_extraction.py [--workers N] [--repeat N]
+
+Reports files/sec for:
+- php + html.parser: the `php` binary and BeautifulSoup, one file at a
+  time, as extraction used to run (only when `php` is installed),
+- html.parser: the in-process PHP renderer and BeautifulSoup,
+- lxml: the in-process PHP renderer and lxml, in one process,
+- lxml pool: the same in a pool of --workers processes.
+"""
+import argparse
+import shutil
+import time
+
+import file_processor
+from config import Config
+from file_processor import FileProcessor
+
+
+def _extract_with_php(file_paths):
+    for file_path in file_paths:
+        if file_path.endswith('.php'):
+            content = file_processor._run_php_script(file_path)
+        else:
+            with open(file_path, 'r', encoding='utf-8') as file:
+                content = file.read()
+        file_processor.find_example_containers(content, 'html.parser')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', type=int, default=Config.EXTRACTION_WORKERS)
+    parser.add_argument('--repeat', type=int, default=1)
+    args = parser.parse_args()
+
+    processor = FileProcessor({})
+    file_paths = processor.find_files(Config.ROOT_DIR)
+    print(f'{len(file_paths)} files, {args.workers} workers')
+
+    runs = {}
+    if shutil.which('php'):
+        runs['php + html.parser'] = lambda: _extract_with_php(file_paths)
+    runs['html.parser'] = lambda: processor.extract(file_paths, 1, 'html.parser')
+    if file_processor.lxml_html:
+        runs['lxml'] = lambda: processor.extract(file_paths, 1, 'lxml')
+        runs['lxml pool'] = lambda: processor.extract(
+            file_paths, args.workers, 'lxml'
+        )
+
+    for name, run in runs.items():
+        best = float('inf')
+        for _ in range(args.repeat):
+            # Start each run with a cold PHP parse cache.
+            file_processor._php_renderer = None
+            start = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - start)
+        print(f'{name:>18}: {best:7.2f}s {len(file_paths) / best:8.0f} files/s')
+
+
+if __name__ == "__main__":
+    main()
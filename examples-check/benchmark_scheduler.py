@@ -0,0 +1,110 @@
+"""Load-test the backtest scheduler against a local fake QuantConnect API.
+
+Usage (from the root of the repo, with the regression test environment
+variables set; the fake API accepts their credentials):
+    python examples-check/benchmark_scheduler.py [--examples N] [--nodes N]
+        [--backtest-time S] [--latency S] [--failure-rate F]
+        [--rate-limit CALLS SECONDS]
+
+Runs --examples trivial Python algorithms through BacktestScheduler, with
+--nodes backtest nodes, and reports the node utilization (time the nodes
+spent running backtests over the time they were available), the poll and
+request metrics and the failed responses the client had to retry.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+# The shared API helpers (qc_api) are at the root of the repository.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from qc_api import METRICS, REQUEST_METRICS, TokenBucket
+from qc_api.fake_server import FakeQuantConnectAPI
+
+from config import Config
+from api_client import APIClient
+from compilers import Compiler, PythonCompiler
+from scheduler import BacktestScheduler
+from utils import CodeBlock, Language
+
+
+ALGORITHM = """
+class BenchmarkAlgorithm(QCAlgorithm):
+    def initialize(self):
+        self.set_start_date(2024, 1, 1)
+        self.set_end_date(2024, 1, {day})
+"""
+
+
+class _BacktestOnlyCompiler(Compiler):
+    """Prepares Python code for backtests without the local type checker."""
+
+    IMPORTS = PythonCompiler.IMPORTS
+
+    def compile_fragment(self, code):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--examples', type=int, default=40)
+    parser.add_argument('--nodes', type=int, default=Config.WORKERS)
+    parser.add_argument('--backtest-time', type=float, default=5.0)
+    parser.add_argument('--compile-time', type=float, default=1.0)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, nargs=2, metavar=('CALLS', 'SECONDS'),
+                        help='Client rate limit; the shared qc_api limit by default.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    fake_api = FakeQuantConnectAPI(
+        Config.USER_ID, Config.USER_TOKEN, latency=args.latency,
+        jitter=args.latency / 2, failure_rate=args.failure_rate,
+        nodes=args.nodes, compile_time=args.compile_time,
+        backtest_time=args.backtest_time, seed=args.seed
+    )
+    with fake_api:
+        Config.BASE_API = fake_api.url
+        Config.WORKERS = args.nodes
+        client = APIClient(
+            TokenBucket(*args.rate_limit) if args.rate_limit else None
+        )
+        language = Language.PYTHON
+        # Failed creates aren't retried, so set up the projects without
+        # failures.
+        fake_api.failure_rate = 0.0
+        project_ids = [
+            client.create_project(f'Benchmark {i}', 'Py')
+            for i in range(args.nodes)
+        ]
+        fake_api.failure_rate = args.failure_rate
+        code_blocks = [
+            CodeBlock(f'./Benchmark/{i:03} Example.html', 0, 0, language,
+                      ALGORITHM.format(day=2 + i % 20))
+            for i in range(args.examples)
+        ]
+        scheduler = BacktestScheduler(
+            client, {language: _BacktestOnlyCompiler()}, {language: project_ids}
+        )
+
+        start = time.perf_counter()
+        results = asyncio.run(scheduler.run(code_blocks))
+        elapsed = time.perf_counter() - start
+
+    passed = sum(result.success for result in results)
+    busy = args.examples * args.backtest_time
+    print(f'{args.examples} backtests ({passed} passed) on {args.nodes} nodes '
+          f'in {elapsed:.1f}s')
+    print(f'Node utilization: {busy / (args.nodes * elapsed):.0%} '
+          f'(at least {busy / args.nodes:.1f}s)')
+    print(f'Failed responses: {sum(fake_api.failures.values())}, '
+          f'peak running backtests: {fake_api.peak_running}')
+    print(f'\nPolling:\n{METRICS.report()}')
+    print(f'\nAPI requests:\n{REQUEST_METRICS.report()}')
+
+
+if __name__ == "__main__":
+    main()
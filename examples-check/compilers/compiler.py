@@ -25,6 +25,17 @@ class Compiler(ABC):
         """
         pass
 
+    def compile_fragments(self, codes):
+        """
+        Compile many code fragments.
+
+        Subclasses can override this to share work across fragments.
+
+        Returns:
+            List with the error message (or None) of each fragment.
+        """
+        return [self.compile_fragment(code) for code in codes]
+
     def has_date_range(self, code):
         """Check if code has start and end dates."""
         return all(pattern in code for pattern in self.DATE_RANGE_PATTERNS)
@@ -1,5 +1,7 @@
 """C# code compilation and validation."""
 import os
+import re
+import shutil
 import subprocess
 
 from compilers.compiler import Compiler
@@ -95,10 +97,19 @@ using Calendar = QuantConnect.Data.Consolidators.Calendar;
 </Project>
 """
 
+    # Max fragments compiled by one `dotnet build`.
+    BATCH_SIZE = 100
+    # Fragments that declare their own namespace can't be wrapped in one.
+    NAMESPACE_PATTERN = re.compile(r'^\s*namespace\s', re.MULTILINE)
+    # Diagnostic lines look like `/path/File.cs(12,5): error CS0103: ...`.
+    DIAGNOSTIC_PATTERN = re.compile(r'^(?P<path>.+?\.cs)\((?P<line>\d+),(?P<column>\d+)\): (?P<message>.*)$')
+
     def __init__(self):
         """Initialize the compiler and write the csproj file once."""
         with open(f"{self._ramdisk_path}/project.csproj", "w") as f:
             f.write(self.PROJECT_FILE)
+        # All the C# files of a build live here; the csproj compiles them all.
+        self._source_dir = f"{self._ramdisk_path}/src"
 
     def compile_fragment(self, code):
         """
@@ -107,9 +118,115 @@ using Calendar = QuantConnect.Data.Consolidators.Calendar;
         Returns:
             Error message if compilation fails, None if successful.
         """
-        # Write the algorithm file.
-        with open(f"{self._ramdisk_path}/test.cs", "w") as f:
-            f.write(self.prepare_for_backtest(code))
+        returncode, output = self._build(
+            {"test.cs": self.prepare_for_backtest(code)}
+        )
+        if not returncode:
+            return None
+        # Report the errors like a batched build does.
+        offset = (self.IMPORTS + "\n").count('\n')
+        lines_by_index, unattributed = self._attribute(
+            output, {"test.cs": (0, offset)}
+        )
+        if unattributed or not lines_by_index:
+            return output
+        return '\n'.join(lines_by_index[0])
+
+    def compile_fragments(self, codes):
+        """
+        Compile many C# code fragments with as few builds as possible.
+
+        Each fragment is wrapped in its own namespace and file, and up to
+        BATCH_SIZE of them are built together. Errors are attributed to
+        fragments by file and line. When a build fails with errors that
+        can't be attributed, the batch is bisected.
+
+        Returns:
+            List with the error message (or None) of each fragment.
+        """
+        errors = [None] * len(codes)
+        batched = []
+        for i, code in enumerate(codes):
+            if self.NAMESPACE_PATTERN.search(code):
+                errors[i] = self.compile_fragment(code)
+            else:
+                batched.append(i)
+        for start in range(0, len(batched), self.BATCH_SIZE):
+            self._compile_batch(
+                codes, batched[start:start + self.BATCH_SIZE], errors
+            )
+        return errors
+
+    def _compile_batch(self, codes, indices, errors):
+        """Build the fragments at `indices` together and fill in `errors`."""
+        if len(indices) == 1:
+            errors[indices[0]] = self.compile_fragment(codes[indices[0]])
+            return
+        headers = {}
+        files = {}
+        for i in indices:
+            header = self.IMPORTS + f"namespace DocsFragment{i}\n{{\n"
+            headers[f"Fragment{i}.cs"] = (i, header.count('\n'))
+            files[f"Fragment{i}.cs"] = header + codes[i] + "\n}\n"
+        returncode, output = self._build(files)
+        if not returncode:
+            return
+
+        lines_by_index, unattributed = self._attribute(output, headers)
+        if unattributed or not lines_by_index:
+            middle = len(indices) // 2
+            self._compile_batch(codes, indices[:middle], errors)
+            self._compile_batch(codes, indices[middle:], errors)
+            return
+        for i, lines in lines_by_index.items():
+            errors[i] = '\n'.join(lines)
+
+    def _attribute(self, output, headers):
+        """
+        Map the diagnostics of a build to the fragments.
+
+        Args:
+            output: Build output
+            headers: Dictionary mapping file name to (fragment index,
+                number of lines before the fragment's code)
+
+        Returns:
+            Tuple of ({fragment index: error lines}, whether a line of the
+            output can't be attributed to a fragment).
+        """
+        lines_by_index = {}
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            match = self.DIAGNOSTIC_PATTERN.match(line)
+            file_name = os.path.basename(match.group('path')) if match else None
+            if file_name not in headers:
+                return lines_by_index, True
+            i, offset = headers[file_name]
+            # Report the line within the fragment itself.
+            lines_by_index.setdefault(i, []).append(
+                f"fragment.cs({int(match.group('line')) - offset},"
+                f"{match.group('column')}): {match.group('message')}"
+            )
+        return lines_by_index, False
+
+    def _build(self, files):
+        """
+        Build the project with the given C# files.
+
+        Args:
+            files: Dictionary mapping file name to content
+
+        Returns:
+            Tuple of (return code, build output).
+        """
+        # Replace the sources of the previous build.
+        if os.path.isdir(self._source_dir):
+            shutil.rmtree(self._source_dir)
+        os.makedirs(self._source_dir)
+        for name, content in files.items():
+            with open(f"{self._source_dir}/{name}", "w") as f:
+                f.write(content)
         # Compile it.
         proc = subprocess.run(
             [
@@ -131,7 +248,4 @@ using Calendar = QuantConnect.Data.Consolidators.Calendar;
                 "TERM": "dumb",
             }
         )
-        # Return the errors if there are any.
-        if proc.returncode:
-            return proc.stdout
-        return None
+        return proc.returncode, proc.stdout
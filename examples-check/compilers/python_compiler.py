@@ -1,8 +1,12 @@
 """Python code validation using mypy."""
+import hashlib
+import os
 import subprocess
+from importlib import metadata
 
 from compilers.compiler import Compiler
 from config import Config
+from result_cache import ResultCache
 
 
 class PythonCompiler(Compiler):
@@ -10,6 +14,10 @@ class PythonCompiler(Compiler):
 
     # Configuration
     _mypy_config_path = Config.MYPY_CONFIG
+    # Max fragments type-checked by one dmypy invocation.
+    BATCH_SIZE = 200
+    # Packages whose versions can change mypy's verdict.
+    CACHE_PACKAGES = ['mypy', 'quantconnect-stubs', 'pandas-stubs']
 
     # Class attributes for base class pattern matching
     IMPORTS = "from AlgorithmImports import *"
@@ -38,8 +46,23 @@ class PythonCompiler(Compiler):
             ['dmypy', 'start', '--', '--config-file', self._mypy_config_path],
             capture_output=True
         )
-        # Define the path.
-        self._path = f"{self._ramdisk_path}/test.py"  
+        # Define the directory for fragment modules.
+        self._batch_dir = f"{self._ramdisk_path}/fragments"
+        # Results are cached by fragment and everything else mypy depends on.
+        self._cache = ResultCache(os.path.join(Config.CACHE_DIR, 'mypy'))
+        self._cache_salt = self._get_cache_salt()
+
+    def _get_cache_salt(self):
+        """Get the inputs besides the fragment that determine the result."""
+        with open(self._mypy_config_path, 'rb') as f:
+            config_hash = hashlib.sha256(f.read()).hexdigest()
+        versions = {}
+        for package in self.CACHE_PACKAGES:
+            try:
+                versions[package] = metadata.version(package)
+            except metadata.PackageNotFoundError:
+                versions[package] = None
+        return [self.FRAGMENT_IMPORTS, config_hash, versions]
 
     def compile_fragment(self, code):
         """
@@ -48,20 +71,99 @@ class PythonCompiler(Compiler):
         Returns:
             Error message if type checking fails, None if successful.
         """
-        # Write the algorithm file.
-        with open(self._path, "w") as f:
-            f.write('\n'.join(self.FRAGMENT_IMPORTS) + '\n' + code)
-        # Compile it.
+        return self.compile_fragments([code])[0]
+
+    def compile_fragments(self, codes):
+        """
+        Compile many Python code fragments with mypy.
+
+        Fragments with a cached result skip mypy. The rest are deduplicated
+        and checked as separate modules, BATCH_SIZE per dmypy invocation.
+
+        Returns:
+            List with the error message (or None) of each fragment.
+        """
+        outputs = [None] * len(codes)
+        pending = {}  # cache key -> indices of the fragments with that key
+        for i, code in enumerate(codes):
+            key = ResultCache.make_key(code, *self._cache_salt)
+            entry = self._cache.get(key)
+            if entry is None:
+                pending.setdefault(key, []).append(i)
+            else:
+                outputs[i] = entry['output']
+
+        keys = list(pending)
+        for start in range(0, len(keys), self.BATCH_SIZE):
+            batch = {key: codes[pending[key][0]] for key in keys[start:start + self.BATCH_SIZE]}
+            for key, (output, cacheable) in self._check_batch(batch).items():
+                if cacheable:
+                    self._cache.set(key, {'output': output})
+                for i in pending[key]:
+                    outputs[i] = output
+
+        # Filter out specific known false positive errors.
+        return [self._filter_errors(output) if output else None for output in outputs]
+
+    def _check_batch(self, fragments):
+        """
+        Type check fragments in one dmypy call, checking them again in
+        smaller batches when mypy stops before checking all of them.
+
+        Args:
+            fragments: Dictionary mapping cache key to fragment code
+
+        Returns:
+            Dictionary mapping cache key to (mypy output for the fragment or
+            None, whether the output can be cached).
+        """
+        # Write each fragment to its own module.
+        os.makedirs(self._batch_dir, exist_ok=True)
+        for name in os.listdir(self._batch_dir):
+            os.remove(os.path.join(self._batch_dir, name))
+        key_by_path = {}
+        for i, (key, code) in enumerate(fragments.items()):
+            path = f"{self._batch_dir}/fragment_{i}.py"
+            with open(path, "w") as f:
+                f.write('\n'.join(self.FRAGMENT_IMPORTS) + '\n' + code)
+            key_by_path[path] = key
+        # Compile them.
         result = subprocess.run(
-            ['dmypy', 'check', self._path],
+            ['dmypy', 'check', *key_by_path],
             capture_output=True,
             text=True
         )
-        # Return the errors if there are any.
-        if result.returncode:
-            # Filter out specific known false positive errors.
-            return self._filter_errors(result.stdout)
-        return None
+        # Map each error line back to the fragment it came from.
+        lines_by_key = {key: [] for key in fragments}
+        for line in result.stdout.split('\n'):
+            key = key_by_path.get(line.split(':', 1)[0])
+            if key:
+                lines_by_key[key].append(line)
+        # Exit code 1 means type errors. Anything else means mypy stopped:
+        # a blocking error (like a syntax error) in some fragments hides the
+        # errors of the others, so those are checked again.
+        if result.returncode not in (0, 1):
+            blocked = {key: lines for key, lines in lines_by_key.items() if lines}
+            if blocked:
+                results = {key: ('\n'.join(lines), True) for key, lines in blocked.items()}
+                rest = {key: code for key, code in fragments.items() if key not in blocked}
+                if rest:
+                    results.update(self._check_batch(rest))
+                return results
+            # Nothing to attribute the failure to: bisect the batch, and
+            # report it without caching for a single fragment.
+            if len(fragments) == 1:
+                output = (result.stdout + result.stderr).strip()
+                return {key: (output, False) for key in fragments}
+            keys = list(fragments)
+            middle = len(keys) // 2
+            results = self._check_batch({key: fragments[key] for key in keys[:middle]})
+            results.update(self._check_batch({key: fragments[key] for key in keys[middle:]}))
+            return results
+        return {
+            key: ('\n'.join(lines) if lines else None, True)
+            for key, lines in lines_by_key.items()
+        }
 
     def _filter_errors(self, output):
         """Filter out known false positive errors from mypy output."""
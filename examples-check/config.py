@@ -9,25 +9,55 @@ class Config:
     RAMDISK = "/mnt/ramdisk"
     ROOT_DIR = "."
     MYPY_CONFIG = "/app/Documentation/examples-check/mypy.ini"
-    TEMP_PHP_FILE = "temp_script.php"
+    # Render PHP the in-process renderer doesn't support with the `php`
+    # binary instead of skipping the file.
+    PHP_FALLBACK = os.environ.get("DOCS_REGRESSION_PHP_FALLBACK") == "1"
+    # Persistent cache for compile and backtest results. Mount a volume here
+    # to keep it between container runs.
+    CACHE_DIR = os.environ.get(
+        "DOCS_REGRESSION_CACHE_DIR", "/app/Documentation/examples-check/.cache"
+    )
+    # Results and phase timings of every run, for the slowest-examples report.
+    RESULTS_DB = os.environ.get(
+        "DOCS_REGRESSION_RESULTS_DB", os.path.join(CACHE_DIR, "results.sqlite3")
+    )
 
     # Test settings
+    EXTRACTION_WORKERS = os.cpu_count() or 1  # Processes that parse the docs.
     WORKERS = 10  # Limited by number of backtest nodes in the organization.
+    # Cloud projects that code blocks compile in are reused by every run.
+    # Runs lease them until they finish, renewing the PROJECT_LEASE seconds
+    # lease as they go. A claimed lease is only kept if it's still there after
+    # PROJECT_LEASE_SETTLE seconds, longer than a concurrent run takes to
+    # write its own.
+    PROJECT_POOL = os.environ.get(
+        "DOCS_REGRESSION_PROJECT_POOL", "Example Tests/Pool"
+    )
+    PROJECT_LEASE = 12 * 3600
+    PROJECT_LEASE_SETTLE = 5
+    # Threads for blocking API calls; most of them wait on polls or the rate limiter.
+    API_THREADS = 4 * WORKERS
 
     # API settings
-    BASE_API = "https://www.quantconnect.com/api/v2"
+    # Point this at a qc_api.fake_server to run the tests offline.
+    BASE_API = os.environ.get(
+        "DOCS_REGRESSION_API_URL", "https://www.quantconnect.com/api/v2"
+    )
     USER_ID = os.environ["DOCS_REGRESSION_TEST_USER_ID"]
     USER_TOKEN = os.environ["DOCS_REGRESSION_TEST_USER_TOKEN"]
 
-    # Rate limiting
-    CALLS = 100
-    RATE_LIMIT = 60  # seconds
+    # Cached passing backtests are keyed on the LEAN version. Set this to
+    # pin it instead of reading the latest version from the API.
+    LEAN_VERSION = os.environ.get("DOCS_REGRESSION_LEAN_VERSION")
 
     # Thresholds
     MIN_LINES_FOR_BACKTEST = 50
     MAX_LOG_LINES = 500
-    MAX_LOG_ATTEMPTS = 12
-    MAX_RETRY_ATTEMPTS = 5
+    # How backtest logs are checked for ERROR_LOG_QUERIES: "local" reads
+    # the whole log and matches the queries locally, "query" sends one
+    # request per query and "auto" picks whichever needs fewer requests.
+    LOG_SCAN = os.environ.get("DOCS_REGRESSION_LOG_SCAN", "auto")
+    LOG_PAGE_SIZE = 250  # Most log lines per backtests/read/log request.
 
     # Directories to skip
     SKIP_DIRECTORIES = [
@@ -1,10 +1,146 @@
 """File processing for HTML/PHP documentation files."""
 import os
 import subprocess
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from bs4 import BeautifulSoup
 
 from config import Config
 from utils import Language, CodeBlock
+from php_renderer import PhpRenderer, PhpRenderError
+
+try:
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
+
+
+# `div.section-example-container`, as XPath so lxml doesn't need cssselect.
+_EXAMPLE_CONTAINER_XPATH = (
+    "//div[contains(concat(' ', normalize-space(@class), ' '), "
+    "' section-example-container ')]"
+)
+
+# Renderer of the current (worker) process; its parse cache lives as long
+# as the process.
+_php_renderer = None
+
+
+def find_example_containers(content, parser=None):
+    """
+    Find the code snippets in the example containers of an HTML page.
+
+    Args:
+        content: HTML of the page
+        parser: 'lxml' or 'html.parser' (BeautifulSoup); defaults to lxml
+            when it's installed
+
+    Returns:
+        List of (div classes, [(pre classes, code), ...]) tuples, one per
+        `div.section-example-container`, in document order.
+    """
+    parser = parser or ('lxml' if lxml_html else 'html.parser')
+    if parser == 'lxml':
+        if not content.strip():
+            return []
+        document = lxml_html.document_fromstring(content)
+        return [
+            (
+                div.get('class', '').split(),
+                [
+                    (pre.get('class', '').split(), pre.text_content())
+                    for pre in div.iterfind('.//pre')
+                ]
+            )
+            for div in document.xpath(_EXAMPLE_CONTAINER_XPATH)
+        ]
+
+    soup = BeautifulSoup(content, 'html.parser')
+    divs = soup.find_all(
+        lambda tag: (
+            tag.name == 'div' and
+            'class' in tag.attrs and
+            'section-example-container' in tag['class']
+        )
+    )
+    return [
+        (
+            div.attrs.get('class', []),
+            [(pre.get('class', []), pre.get_text()) for pre in div.find_all('pre')]
+        )
+        for div in divs
+    ]
+
+
+def extract_file(file_path, parser=None):
+    """
+    Render a documentation file and find its example containers.
+
+    Runs in the extraction worker processes.
+
+    Returns:
+        Tuple of (example containers, message). The containers are None
+        if the file was skipped, in which case the message says why.
+    """
+    global _php_renderer
+    if file_path.endswith(".php"):
+        if _php_renderer is None:
+            _php_renderer = PhpRenderer(Config.ROOT_DIR)
+        try:
+            content = _render_php(_php_renderer, file_path)
+        except PhpRenderError as e:
+            return None, f'-> Skipped. Unsupported PHP: {e}'
+    else:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            content = file.read()
+    return find_example_containers(content, parser), None
+
+
+def _render_php(renderer, php_path):
+    """Render a PHP file to HTML, falling back to `php` if enabled."""
+    try:
+        output = renderer.render(php_path)
+    except PhpRenderError:
+        if not Config.PHP_FALLBACK:
+            raise
+        output = _run_php_script(php_path)
+
+    # Mark testable containers.
+    return output.strip().replace(
+        '<div class="section-example-container to-be-tested">',
+        '<div class="section-example-container testable">'
+    )
+
+
+def _run_php_script(php_path):
+    """Render a PHP file by executing it with the `php` binary."""
+    # Read the PHP script
+    with open(php_path, 'r', encoding="utf-8") as f:
+        content = f.read()
+
+    # Replace DOCS_RESOURCES with actual path
+    content = (
+        content
+        .replace('DOCS_RESOURCES."', '"./Resources')
+        .replace("DOCS_RESOURCES.'", "'./Resources")
+    )
+
+    # Write a temporary PHP file. Includes resolve against the working
+    # directory, so it can live anywhere.
+    with tempfile.NamedTemporaryFile(
+            'w', suffix='.php', encoding='utf-8', delete=False) as f:
+        f.write(content)
+    try:
+        # Execute PHP script
+        result = subprocess.run(
+            ['php', '-d', 'short_open_tag=1', f.name],
+            capture_output=True,
+            text=True,
+            encoding='utf-8'
+        )
+    finally:
+        os.remove(f.name)
+    return result.stdout
 
 
 class FileProcessor:
@@ -18,175 +154,163 @@ class FileProcessor:
             compilers: Dictionary mapping Language to compiler instances
         """
         self._compilers = compilers
-    
+
+    def find_files(self, directory):
+        """Return the HTML/PHP documentation files to check, in order."""
+        file_paths = []
+        for root, _, filenames in sorted(os.walk(directory)):
+            for f in sorted(filenames):
+                file_path = os.path.join(root, f)
+                # Skip directories in the skip list.
+                if (f.lower().endswith(('.html', '.php')) and
+                    not any(p in file_path for p in Config.SKIP_DIRECTORIES)):
+                    file_paths.append(file_path)
+        return file_paths
+
+    def extract(self, file_paths, workers=None, parser=None):
+        """
+        Render the files and find their example containers in a process pool.
+
+        Args:
+            file_paths: Documentation files to extract
+            workers: Number of processes; defaults to Config.EXTRACTION_WORKERS
+            parser: HTML parser, see find_example_containers
+
+        Returns:
+            List of (file path, example containers, message) tuples, in the
+            order of `file_paths`.
+        """
+        workers = workers or Config.EXTRACTION_WORKERS
+        parsers = [parser] * len(file_paths)
+        if workers == 1:
+            results = map(extract_file, file_paths, parsers)
+            return [(p, *result) for p, result in zip(file_paths, results)]
+        with ProcessPoolExecutor(workers) as executor:
+            results = executor.map(
+                extract_file, file_paths, parsers,
+                chunksize=max(1, len(file_paths) // (workers * 8))
+            )
+            return [(p, *result) for p, result in zip(file_paths, results)]
+
     def process_code_blocks(self, directory):
         """
-        Process all code blocks in documentation files and extract 
+        Process all code blocks in documentation files and extract
         testable algorithms.
 
-        Walks through all HTML/PHP files in the directory, extracts 
-        code snippets from section-example-container divs, 
-        validates them (syntax, QCAlgorithm class, date ranges),
-        and returns a list of CodeBlocks objects ready for backtesting.
+        Walks through all HTML/PHP files in the directory and extracts
+        code snippets from section-example-container divs in a process
+        pool. Then validates them (syntax, QCAlgorithm class, date ranges),
+        compiling fragments in batches, and returns a list of CodeBlocks
+        objects ready for backtesting.
 
         Args:
             directory: Root directory to search for documentation files
 
         Returns:
-            List of CodeBlocks objects containing validated, testable 
+            List of CodeBlocks objects containing validated, testable
             algorithm code.
         """
-        self._remove_temp_php_file()
         print('Gathering code blocks...')
+        extracted = self.extract(self.find_files(directory))
         algorithms = []
-        for root, _, filenames in sorted(os.walk(directory)):
-            file_paths = sorted([
-                os.path.join(root, f)
-                for f in filenames
-                if f.lower().endswith(('.html', '.php'))
-            ])
-            
-            for file_path in file_paths:
-                # Skip directories in the skip list.
-                if any(p in file_path for p in Config.SKIP_DIRECTORIES):
-                    continue
-                #print(f'Processing file {file_path}')
-
-                indicator_ref_page = '/01 Supported Indicators' in file_path
-
-                # Drop the extension and the file number.
-                h3_title = file_path.split('/')[-1].split('.')[0][3:].lower()
-                should_backtest_h3 = h3_title in Config.BACKTEST_H3_TITLES
-
-                # Convert PHP to HTML if needed
-                original_file_path = file_path
-                if file_path.endswith(".php"):
-                    self._run_php_script(file_path)
-                    file_path = Config.TEMP_PHP_FILE
-
-                # Read the HTML file.
-                with open(file_path, 'r', encoding='utf-8') as file:
-                    soup = BeautifulSoup(file, 'html.parser')
-
-                    # Get all div elements with the `section-example-container`
-                    # class.
-                    divs = soup.find_all(
-                        lambda tag: (
-                            tag.name == 'div' and
-                            'class' in tag.attrs and
-                            'section-example-container' in tag['class']
-                        )
-                    )
-                    # Iterate through each div.
-                    for div_idx, div in enumerate(divs):
-                        classes = div.attrs.get('class', [])
-                        # Skip <div> blocks with the skip-test class.
-                        if 'skip-test' in classes:
-                            continue
-                        # Check for the `testable` class.
-                        testable_div = 'testable' in classes
-                        # Iterate through each <pre> snippet.
-                        for pre_idx, pre in enumerate(div.find_all('pre')):
-                            code = pre.get_text()
-                            classes = pre.get('class', [])
-
-                            # Determine the language.
-                            if 'csharp' in classes:
-                                language = Language.CSHARP
-                            elif 'python' in classes:
-                                language = Language.PYTHON
-                            else:
-                                continue
-
-                            compiler = self._compilers[language]
-                            # If this code block doesn't subclass 
-                            # QCAlgorithm, just continue.
-                            if not compiler.is_algorithm_class(code):
-                                continue
-                            # Create a CodeBlock object for this snippet
-                            # to make logging and backtesting easier.
-                            code_block = CodeBlock(
-                                original_file_path, div_idx, pre_idx, language, 
-                                code
-                            )
-                            # If this code block doesn't have `testable`...
-                            if not testable_div:
-                                # If the algorithm has >=50 lines or we're in a
-                                # "should_backtest_h3", we should add `testable`
-                                # to it.
-                                if (len(code.split('\n')) >= Config.MIN_LINES_FOR_BACKTEST or
-                                    should_backtest_h3):
-                                    print(
-                                        f'{code_block}\n',
-                                        '-> Missing `testable` class.\n'
-                                    )
-
-                                # If this code block is not in Examples h3...
-                                elif not should_backtest_h3:
-                                    # Test if we can build it without error.
-                                    error = compiler.compile_fragment(code)
-                                    if error:
-                                        print(
-                                            f'{code_block}\n',
-                                            f'-> Compile failed. Errors:\n{error}\n'
-                                        )
-
-                                continue
-                            # Check if the algorithm has a date range.
-                            if (not indicator_ref_page and 
-                                not compiler.has_date_range(code)):
-                                print(
-                                    f'{code_block}\n',
-                                    f'-> Missing date range.\n',
-                                )
-                                continue
-
-                            #print(
-                            #    f'{code_block}\n', 
-                            #    '-> Selected for backtesting.\n'
-                            #)
-                            algorithms.append(code_block)
-        self._remove_temp_php_file()
+        # Fragments to compile, batched per language after the walk.
+        fragments = {language: [] for language in self._compilers}
+        for file_path, divs, message in extracted:
+            if divs is None:
+                print(f'{file_path}\n', f'{message}\n')
+                continue
+            algorithms.extend(self._select_code_blocks(file_path, divs, fragments))
+        self._compile_fragments(fragments)
         return algorithms
-    
-    def _run_php_script(self, php_path):
-        """Convert PHP to HTML by executing it."""
-        # Read the PHP script
-        with open(php_path, 'r', encoding="utf-8") as f:
-            content = f.read()
-
-        # Replace DOCS_RESOURCES with actual path
-        content = (
-            content
-            .replace('DOCS_RESOURCES."', '"./Resources')
-            .replace("DOCS_RESOURCES.'", "'./Resources")
-        )
 
-        # Write temporary PHP file
-        with open(Config.TEMP_PHP_FILE, 'w', encoding='utf-8') as f:
-            f.write(content)
+    def _select_code_blocks(self, file_path, divs, fragments):
+        """
+        Validate the snippets of a file.
 
-        # Execute PHP script
-        result = subprocess.run(
-            ['php', '-d', 'short_open_tag=1', Config.TEMP_PHP_FILE],
-            capture_output=True,
-            text=True,
-            encoding='utf-8'
-        )
+        Collects the fragments to compile into `fragments` and returns
+        the CodeBlocks to backtest.
+        """
+        algorithms = []
+        indicator_ref_page = '/01 Supported Indicators' in file_path
 
-        # Update output to mark testable containers
-        output = result.stdout.strip().replace(
-            '<div class="section-example-container to-be-tested">',
-            '<div class="section-example-container testable">'
-        )
+        # Drop the extension and the file number.
+        h3_title = file_path.split('/')[-1].split('.')[0][3:].lower()
+        should_backtest_h3 = h3_title in Config.BACKTEST_H3_TITLES
 
-        # Write processed output
-        with open(Config.TEMP_PHP_FILE, 'w', encoding='utf-8') as f:
-            f.write(output)
+        # Iterate through each div.
+        for div_idx, (classes, pres) in enumerate(divs):
+            # Skip <div> blocks with the skip-test class.
+            if 'skip-test' in classes:
+                continue
+            # Check for the `testable` class.
+            testable_div = 'testable' in classes
+            # Iterate through each <pre> snippet.
+            for pre_idx, (classes, code) in enumerate(pres):
+                # Determine the language.
+                if 'csharp' in classes:
+                    language = Language.CSHARP
+                elif 'python' in classes:
+                    language = Language.PYTHON
+                else:
+                    continue
 
-    def _remove_temp_php_file(self):
-        """Remove the temporary PHP file, if it exists."""
-        try:
-            os.remove(Config.TEMP_PHP_FILE)
-        except FileNotFoundError:
-            pass
+                compiler = self._compilers[language]
+                # If this code block doesn't subclass
+                # QCAlgorithm, just continue.
+                if not compiler.is_algorithm_class(code):
+                    continue
+                # Create a CodeBlock object for this snippet
+                # to make logging and backtesting easier.
+                code_block = CodeBlock(
+                    file_path, div_idx, pre_idx, language,
+                    code
+                )
+                # If this code block doesn't have `testable`...
+                if not testable_div:
+                    # If the algorithm has >=50 lines or we're in a
+                    # "should_backtest_h3", we should add `testable`
+                    # to it.
+                    if (len(code.split('\n')) >= Config.MIN_LINES_FOR_BACKTEST or
+                        should_backtest_h3):
+                        print(
+                            f'{code_block}\n',
+                            '-> Missing `testable` class.\n'
+                        )
+
+                    # If this code block is not in Examples h3...
+                    elif not should_backtest_h3:
+                        # Test if we can build it without error.
+                        fragments[language].append(code_block)
+
+                    continue
+                # Check if the algorithm has a date range.
+                if (not indicator_ref_page and
+                    not compiler.has_date_range(code)):
+                    print(
+                        f'{code_block}\n',
+                        f'-> Missing date range.\n',
+                    )
+                    continue
+
+                #print(
+                #    f'{code_block}\n',
+                #    '-> Selected for backtesting.\n'
+                #)
+                algorithms.append(code_block)
+        return algorithms
+
+    def _compile_fragments(self, fragments):
+        """Compile the collected fragments and print their errors."""
+        for language, code_blocks in fragments.items():
+            if not code_blocks:
+                continue
+            print(f'Compiling {len(code_blocks)} {language.value} fragments...')
+            errors = self._compilers[language].compile_fragments(
+                [code_block.code for code_block in code_blocks]
+            )
+            for code_block, error in zip(code_blocks, errors):
+                if error:
+                    print(
+                        f'{code_block}\n',
+                        f'-> Compile failed. Errors:\n{error}\n'
+                    )
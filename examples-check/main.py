@@ -1,4 +1,23 @@
+import argparse
+import os
+import sys
+
+# The shared API helpers (qc_api) are at the root of the repository.
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
 from manager import RegressionTestManager
 
 if __name__ == "__main__":
-    RegressionTestManager().run()
+    parser = argparse.ArgumentParser(
+        description="Backtest the example code blocks in the documentation."
+    )
+    parser.add_argument(
+        "--changed-only", metavar="REF",
+        help="Only backtest examples on pages changed since the git ref."
+    )
+    parser.add_argument(
+        "--full", action="store_true",
+        help="Backtest every example, ignoring previously passing results."
+    )
+    args = parser.parse_args()
+    RegressionTestManager().run(args.changed_only, args.full)
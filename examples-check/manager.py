@@ -1,44 +1,32 @@
 """Main orchestration for regression testing."""
 import os
 import time
-import multiprocessing as mp
-from datetime import datetime
+import asyncio
+import subprocess
+from functools import partial
 
 from config import Config
 from utils import Language, log_with_time
 from api_client import APIClient
 from file_processor import FileProcessor
 from backtest_runner import BacktestRunner
+from scheduler import BacktestScheduler
+from project_pool import ProjectPool
+from results_store import ResultsStore
+from result_cache import ResultCache
 from compilers import PythonCompiler, CSharpCompiler
+from qc_api import METRICS, REQUEST_METRICS
 
 
-# Module-level worker runner (one per worker process)
-_worker_runner = None
-
-def _init_worker(api_client, compiler_by_language, timestamp):
-    """Initialize each worker with its own projects and runner."""
-    global _worker_runner
-    worker_id = mp.current_process()._identity[0]
-    _worker_runner = BacktestRunner(
-        api_client,
-        compiler_by_language,
-        # Create projects for this worker
-        {
-            Language.PYTHON: api_client.create_project(
-                f'Example Tests/{timestamp}_Worker{worker_id}_Py', 'Py'
-            ),
-            Language.CSHARP: api_client.create_project(
-                f'Example Tests/{timestamp}_Worker{worker_id}_C', 'C#'
-            )
-        }
-    )
-
-def _backtest_code_block(code_block):
-    """Process a single code block (called by each worker)."""
-    global _worker_runner
-    result = _worker_runner.run_backtest(code_block)
+def _report_result(results_store, backtest_cache, cache_keys, code_block, result):
+    """Store the result, then keep the statistics or print the failure."""
+    results_store.record(code_block, result)
     if result.success:
         code_block.statistics = result.statistics
+        if code_block in cache_keys:
+            backtest_cache.set(
+                cache_keys[code_block], {'statistics': result.statistics}
+            )
     else:
         print(
             f'{code_block}\n',
@@ -46,11 +34,69 @@ def _backtest_code_block(code_block):
         )
 
 
+def _changed_files(ref):
+    """Return the normalized paths of the files changed since the git ref."""
+    commands = [
+        ['git', 'diff', '--name-only', '-z', ref, '--'],
+        ['git', 'ls-files', '--others', '--exclude-standard', '-z'],
+    ]
+    paths = set()
+    for command in commands:
+        output = subprocess.run(
+            command, cwd=Config.ROOT_DIR, capture_output=True, text=True,
+            encoding='utf-8', check=True
+        ).stdout
+        paths.update(os.path.normpath(p) for p in output.split('\0') if p)
+    return paths
+
+
+def _filter_changed(code_blocks, changed_paths):
+    """
+    Keep the code blocks whose page, or a resource the page includes,
+    changed.
+
+    Args:
+        code_blocks: CodeBlocks to filter
+        changed_paths: Normalized paths of the changed files
+
+    Returns:
+        List of the CodeBlocks to backtest.
+    """
+    # Pages include resources as DOCS_RESOURCES."/path/to/file.php".
+    resources = [
+        p[len('Resources'):] for p in changed_paths
+        if p.startswith('Resources' + os.sep)
+    ]
+    includes_changed_resource = {}
+    selected = []
+    for code_block in code_blocks:
+        path = os.path.normpath(code_block.path)
+        if path not in includes_changed_resource:
+            includes_changed_resource[path] = False
+            if resources:
+                with open(code_block.path, encoding='utf-8') as f:
+                    content = f.read()
+                includes_changed_resource[path] = any(
+                    resource in content for resource in resources
+                )
+        if path in changed_paths or includes_changed_resource[path]:
+            selected.append(code_block)
+    return selected
+
+
 class RegressionTestManager:
     """Orchestrates the entire regression testing process."""
 
-    def run(self):
-        """Run the complete regression test suite."""
+    def run(self, changed_since=None, full=False):
+        """
+        Run the complete regression test suite.
+
+        Args:
+            changed_since: Optional git ref; only backtest the examples on
+                pages changed since it
+            full: Backtest every example, even if it passed before with
+                the same code and LEAN version
+        """
         start_time = time.time()
         log_with_time(start_time, "Start regression testing.")
 
@@ -69,15 +115,76 @@ class RegressionTestManager:
         # Parse the docs for all algorithms that we need to backtest.
         algorithms = FileProcessor(compiler_by_language).process_code_blocks(Config.ROOT_DIR)
         log_with_time(start_time, f"Found {len(algorithms)} algorithms to test")
+        if changed_since:
+            algorithms = _filter_changed(
+                algorithms, _changed_files(changed_since)
+            )
+            log_with_time(
+                start_time,
+                f"{len(algorithms)} algorithms changed since {changed_since}"
+            )
 
-        # Set up with multiprocessing.
+        # Reuse the results of code that already passed on this LEAN
+        # version.
+        backtest_cache = ResultCache(os.path.join(Config.CACHE_DIR, 'backtests'))
+        cache_keys = {}
+        lean_version = Config.LEAN_VERSION or api_client.read_lean_version()
+        if lean_version is None:
+            print("Failed to read the LEAN version. Backtesting everything.")
+        else:
+            runner = BacktestRunner(api_client, compiler_by_language)
+            pending = []
+            for code_block in algorithms:
+                key = ResultCache.make_key(
+                    runner.prepare_code(code_block),
+                    code_block.language.value,
+                    lean_version
+                )
+                entry = None if full else backtest_cache.get(key)
+                if entry:
+                    code_block.statistics = entry['statistics']
+                    continue
+                cache_keys[code_block] = key
+                pending.append(code_block)
+            log_with_time(
+                start_time,
+                f"Reusing {len(algorithms) - len(pending)} passing results "
+                f"from LEAN {lean_version}"
+            )
+            algorithms = pending
+        if not algorithms:
+            log_with_time(start_time, "Nothing to test")
+            return
+
+        # Lease the projects that code blocks are compiled in. Each
+        # project is reused as soon as its backtest has started.
         workers = Config.WORKERS
         log_with_time(start_time, f"Start testing with {workers} workers")
-        # Process code blocks in parallel with n workers.
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
-        worker_args = (api_client, compiler_by_language, timestamp)
-        with mp.Pool(workers, _init_worker, worker_args) as pool:
-            pool.map(_backtest_code_block, algorithms)
+        project_pool = ProjectPool(api_client)
+        deleted = project_pool.collect_garbage(workers)
+        if deleted:
+            log_with_time(start_time, f"Deleted {deleted} orphaned projects")
+        project_ids_by_language = project_pool.lease(workers)
+        log_with_time(start_time, "Leased the project pool")
+
+        # Pipeline the code blocks through compile, backtest and checks.
+        scheduler = BacktestScheduler(
+            api_client, compiler_by_language, project_ids_by_language
+        )
+        results_store = ResultsStore(Config.RESULTS_DB)
+        results_store.start_run()
+        try:
+            asyncio.run(scheduler.run(
+                algorithms,
+                partial(_report_result, results_store, backtest_cache, cache_keys)
+            ))
+            results_store.finish_run()
+            results_store.print_report()
+        finally:
+            results_store.close()
+            project_pool.release()
 
+        print(f"\nPolling:\n{METRICS.report()}")
+        print(f"\nAPI requests:\n{REQUEST_METRICS.report()}")
         log_with_time(start_time, "Finished all testing")
         log_with_time(start_time, "Done!")
@@ -0,0 +1,1128 @@
+"""In-process renderer for the subset of PHP the documentation uses.
+
+Pages are plain HTML with PHP blocks that set variables, include files
+from Resources, echo values and branch on simple conditions. This module
+renders them without the `php` binary:
+
+- inline HTML, `<?php`, `<?` and `<?=` tags,
+- `include`/`require` (and `_once`), `echo`, `print`, `return`,
+- assignments (`=`, `.=`, `+=`, `-=`, `??=`), including `$a[...]`,
+- `if`/`elseif`/`else` and `foreach`, with braces or `:`/`endif`,
+- strings (with interpolation), heredocs, nowdocs, numbers and arrays,
+- the usual operators and a few string and array functions.
+
+Anything else (classes, user functions, objects, ...) raises
+PhpRenderError, so callers can fall back to the `php` binary.
+Parsed files are cached, so each Resources fragment is only read and
+parsed once per process.
+"""
+import os
+import re
+
+
+DOCS_RESOURCES = "./Resources"
+
+
+class PhpRenderError(Exception):
+    """The file uses PHP that this renderer doesn't support, or failed."""
+
+
+# -- Lexer -------------------------------------------------------------------
+
+_OPEN_TAG = re.compile(r'<\?(?:php(?=\s)|=)?')
+_WHITESPACE = re.compile(r'\s+')
+_NAME = re.compile(r'[A-Za-z_\x80-\uffff][\w\x80-\uffff]*')
+_NUMBER = re.compile(r'\d+\.\d*|\.\d+|\d+')
+_HEREDOC = re.compile(r'<<<[ \t]*(["\']?)([A-Za-z_]\w*)\1\r?\n')
+_OPERATORS = sorted([
+    '===', '!==', '??=', '<=>', '**',
+    '==', '!=', '<>', '<=', '>=', '&&', '||', '??', '.=', '+=', '-=', '*=',
+    '/=', '=>', '->', '::', '++', '--',
+    '=', '<', '>', '!', '?', ':', '.', '+', '-', '*', '/', '%', '(', ')',
+    '[', ']', '{', '}', ',', ';', '&', '|', '@', '$', '\\',
+], key=len, reverse=True)
+_DOUBLE_QUOTED_ESCAPES = {
+    'n': '\n', 't': '\t', 'r': '\r', 'v': '\v', 'e': '\x1b', 'f': '\f',
+    '\\': '\\', '$': '$', '"': '"',
+}
+_INTERPOLATION = re.compile(
+    r'\$([A-Za-z_]\w*)(?:\[(-?\d+|[A-Za-z_]\w*|\$[A-Za-z_]\w*)\]|(->)[A-Za-z_])?'
+)
+
+
+class _Token:
+    __slots__ = ('kind', 'value', 'line')
+
+    def __init__(self, kind, value, line):
+        # kind: 'html', 'var', 'name', 'number', 'string', 'interpolated',
+        # 'op' or 'end'.
+        self.kind = kind
+        self.value = value
+        self.line = line
+
+    def is_op(self, *values):
+        return self.kind == 'op' and self.value in values
+
+    def is_name(self, *values):
+        return self.kind == 'name' and self.value.lower() in values
+
+
+def _tokenize(source, code_only=False):
+    """Split a PHP file (or, with code_only, a PHP expression) into tokens."""
+    tokens = []
+    position = 0
+    line = 1
+    in_code = code_only
+
+    def add(kind, value):
+        tokens.append(_Token(kind, value, line))
+
+    while position < len(source):
+        if not in_code:
+            match = _OPEN_TAG.search(source, position)
+            end = match.start() if match else len(source)
+            if end > position:
+                add('html', source[position:end])
+                line += source.count('\n', position, end)
+            if not match:
+                break
+            position = match.end()
+            in_code = True
+            if match.group() == '<?=':
+                add('name', 'echo')
+            continue
+
+        char = source[position]
+        if source.startswith('?>', position) and not code_only:
+            # A closing tag ends the statement and eats one newline.
+            add('op', ';')
+            position += 2
+            if source.startswith('\r\n', position):
+                position += 2
+            elif source.startswith('\n', position):
+                position += 1
+            line += 1
+            in_code = False
+            continue
+        if char.isspace():
+            match = _WHITESPACE.match(source, position)
+            line += match.group().count('\n')
+            position = match.end()
+            continue
+        if char == '#' or source.startswith('//', position):
+            # Line comments stop at the end of the line or a closing tag.
+            end = position
+            while end < len(source) and source[end] != '\n':
+                if source.startswith('?>', end):
+                    break
+                end += 1
+            position = end
+            continue
+        if source.startswith('/*', position):
+            end = source.find('*/', position + 2)
+            if end < 0:
+                raise PhpRenderError(f"Unterminated comment on line {line}")
+            line += source.count('\n', position, end)
+            position = end + 2
+            continue
+        if char == '$' and _NAME.match(source, position + 1):
+            match = _NAME.match(source, position + 1)
+            add('var', match.group())
+            position = match.end()
+            continue
+        match = _NAME.match(source, position)
+        if match:
+            add('name', match.group())
+            position = match.end()
+            continue
+        match = _NUMBER.match(source, position)
+        if match:
+            text = match.group()
+            add('number', float(text) if '.' in text else int(text))
+            position = match.end()
+            continue
+        if char == "'":
+            position = _single_quoted(source, position + 1, add)
+            line = tokens[-1].line + tokens[-1].value.count('\n')
+            continue
+        if char == '"':
+            end = _find_closing_quote(source, position + 1)
+            raw = source[position + 1:end]
+            add('interpolated', _interpolate(raw, '"', line))
+            line += raw.count('\n')
+            position = end + 1
+            continue
+        match = _HEREDOC.match(source, position)
+        if match:
+            position, raw = _heredoc_body(source, match, line)
+            if match.group(1) == "'":
+                add('string', raw)
+            else:
+                add('interpolated', _interpolate(raw, None, line))
+            line += source.count('\n', match.start(), position)
+            continue
+        for operator in _OPERATORS:
+            if source.startswith(operator, position):
+                add('op', operator)
+                position += len(operator)
+                break
+        else:
+            raise PhpRenderError(f"Unexpected {char!r} on line {line}")
+    add('end', None)
+    return tokens
+
+
+def _single_quoted(source, position, add):
+    """Read a single-quoted string that starts at `position`."""
+    parts = []
+    start = position
+    while True:
+        if position >= len(source):
+            raise PhpRenderError("Unterminated string")
+        char = source[position]
+        if char == "'":
+            break
+        if char == '\\' and source[position + 1:position + 2] in ("'", '\\'):
+            parts.append(source[start:position])
+            start = position + 1
+            position += 2
+            continue
+        position += 1
+    parts.append(source[start:position])
+    add('string', ''.join(parts))
+    return position + 1
+
+
+def _find_closing_quote(source, position):
+    while True:
+        if position >= len(source):
+            raise PhpRenderError("Unterminated string")
+        char = source[position]
+        if char == '\\':
+            position += 2
+            continue
+        if char == '"':
+            return position
+        position += 1
+
+
+def _heredoc_body(source, match, line):
+    """Return the end position and the (dedented) body of a heredoc."""
+    label = match.group(2)
+    closing = re.compile(
+        r'^([ \t]*)' + label + r'\b', re.MULTILINE
+    ).search(source, match.end())
+    if not closing:
+        raise PhpRenderError(f"Unterminated heredoc on line {line}")
+    body = source[match.end():closing.start()]
+    # The newline before the closing label isn't part of the string.
+    if body.endswith('\r\n'):
+        body = body[:-2]
+    elif body.endswith('\n'):
+        body = body[:-1]
+    indent = closing.group(1)
+    if indent:
+        body = '\n'.join(
+            l[len(indent):] if l.startswith(indent) else l.lstrip(' \t')
+            for l in body.split('\n')
+        )
+    return closing.end(), body
+
+
+def _interpolate(raw, quote, line):
+    """
+    Split the raw text of a double-quoted string or heredoc into literal
+    text and the source code of the interpolated expressions.
+
+    Returns:
+        List of ('text', str) and ('code', str) parts.
+    """
+    parts = []
+    text = []
+    position = 0
+    while position < len(raw):
+        char = raw[position]
+        if char == '\\' and position + 1 < len(raw):
+            next_char = raw[position + 1]
+            if next_char in _DOUBLE_QUOTED_ESCAPES and (
+                    next_char != '"' or quote == '"'):
+                text.append(_DOUBLE_QUOTED_ESCAPES[next_char])
+                position += 2
+                continue
+            octal = re.match(r'[0-7]{1,3}', raw[position + 1:])
+            if octal:
+                text.append(chr(int(octal.group(), 8) & 0xFF))
+                position += 1 + len(octal.group())
+                continue
+            hexadecimal = re.match(r'x([0-9A-Fa-f]{1,2})', raw[position + 1:])
+            if hexadecimal:
+                text.append(chr(int(hexadecimal.group(1), 16)))
+                position += 1 + len(hexadecimal.group())
+                continue
+            text.append(char)
+            position += 1
+            continue
+        if char == '{' and raw.startswith('{$', position):
+            end = _matching_brace(raw, position, line)
+            code = raw[position + 1:end]
+            position = end + 1
+        elif char == '$' and raw.startswith('${', position):
+            end = _matching_brace(raw, position + 1, line)
+            code = '$' + raw[position + 2:end]
+            position = end + 1
+        elif char == '$' and _INTERPOLATION.match(raw, position):
+            match = _INTERPOLATION.match(raw, position)
+            name, key, arrow = match.groups()
+            if arrow:
+                raise PhpRenderError(
+                    f"Property interpolation on line {line} is not supported"
+                )
+            if key is None:
+                code = f'${name}'
+            elif key[0] in '-$' or key.isdigit():
+                code = f'${name}[{key}]'
+            else:
+                code = f"${name}['{key}']"
+            position = match.end()
+        else:
+            text.append(char)
+            position += 1
+            continue
+        if text:
+            parts.append(('text', ''.join(text)))
+            text = []
+        parts.append(('code', code))
+    if text:
+        parts.append(('text', ''.join(text)))
+    return parts
+
+
+def _matching_brace(raw, position, line):
+    depth = 0
+    for index in range(position, len(raw)):
+        if raw[index] == '{':
+            depth += 1
+        elif raw[index] == '}':
+            depth -= 1
+            if depth == 0:
+                return index
+    raise PhpRenderError(f"Unterminated interpolation on line {line}")
+
+
+# -- Parser ------------------------------------------------------------------
+#
+# Statements and expressions are tuples whose first item names the node,
+# e.g. ('echo', [expr, ...]) or ('binary', '.', left, right).
+
+_ASSIGNMENT_OPERATORS = ('=', '.=', '+=', '-=', '*=', '/=', '??=')
+_BINARY_PRECEDENCE = [
+    ('||',), ('&&',),
+    ('==', '!=', '===', '!==', '<>', '<=>'),
+    ('<', '<=', '>', '>='),
+    ('.',), ('+', '-'), ('*', '/', '%'),
+]
+_UNSUPPORTED_KEYWORDS = (
+    'class', 'function', 'fn', 'new', 'while', 'do', 'for', 'switch',
+    'match', 'try', 'throw', 'global', 'static', 'abstract', 'final',
+    'interface', 'trait', 'goto', 'declare', 'namespace', 'use', 'list',
+    'unset', 'exit', 'die', 'eval', 'clone', 'yield', 'break', 'continue',
+)
+
+
+class _Parser:
+
+    def __init__(self, tokens, path):
+        self._tokens = tokens
+        self._index = 0
+        self._path = path
+
+    @property
+    def _token(self):
+        return self._tokens[self._index]
+
+    def _next(self):
+        token = self._tokens[self._index]
+        self._index += 1
+        return token
+
+    def _error(self, message):
+        return PhpRenderError(
+            f"{message} on line {self._token.line} of {self._path}"
+        )
+
+    def _expect_op(self, value):
+        if not self._token.is_op(value):
+            raise self._error(f"Expected {value!r}")
+        return self._next()
+
+    def _end_statement(self):
+        if self._token.is_op(';'):
+            self._next()
+        elif self._token.kind not in ('end', 'html'):
+            raise self._error(f"Unsupported syntax {self._token.value!r}")
+
+    def parse_file(self):
+        statements = self._statements(())
+        if self._token.kind != 'end':
+            raise self._error(f"Unexpected {self._token.value!r}")
+        return statements
+
+    def _statements(self, terminators):
+        """Parse statements until the end or a terminating keyword/brace."""
+        statements = []
+        while True:
+            token = self._token
+            if token.kind == 'end' or token.is_op('}'):
+                return statements
+            if token.kind == 'name' and token.value.lower() in terminators:
+                return statements
+            statements.append(self._statement())
+
+    def _block(self):
+        """Parse a `{ ... }` block or a single statement."""
+        if self._token.is_op('{'):
+            self._next()
+            statements = self._statements(())
+            self._expect_op('}')
+            return statements
+        return [self._statement()]
+
+    def _statement(self):
+        token = self._token
+        if token.kind == 'html':
+            self._next()
+            return ('html', token.value)
+        if token.is_op(';'):
+            self._next()
+            return ('block', [])
+        if token.is_op('{'):
+            return ('block', self._block())
+        if token.kind == 'name':
+            keyword = token.value.lower()
+            if keyword in ('echo', 'print'):
+                self._next()
+                values = [self._expression()]
+                while keyword == 'echo' and self._token.is_op(','):
+                    self._next()
+                    values.append(self._expression())
+                self._end_statement()
+                return ('echo', values)
+            if keyword in ('include', 'include_once', 'require', 'require_once'):
+                self._next()
+                path = self._expression()
+                self._end_statement()
+                return ('include', keyword, path)
+            if keyword == 'if':
+                return self._if()
+            if keyword == 'foreach':
+                return self._foreach()
+            if keyword == 'return':
+                self._next()
+                if not (self._token.is_op(';') or self._token.kind in ('end', 'html')):
+                    self._expression()
+                self._end_statement()
+                return ('return',)
+            if keyword in _UNSUPPORTED_KEYWORDS:
+                raise self._error(f"Unsupported statement {token.value!r}")
+        expression = self._expression()
+        self._end_statement()
+        return ('expression', expression)
+
+    def _condition(self):
+        self._expect_op('(')
+        condition = self._expression()
+        self._expect_op(')')
+        return condition
+
+    def _if(self):
+        self._next()
+        condition = self._condition()
+        if self._token.is_op(':'):
+            # Alternative syntax: if (...): ... elseif (...): ... else: ... endif;
+            self._next()
+            branches = [(condition, self._statements(('elseif', 'else', 'endif')))]
+            otherwise = []
+            while True:
+                keyword = self._next()
+                if keyword.is_name('elseif'):
+                    condition = self._condition()
+                    self._expect_op(':')
+                    branches.append(
+                        (condition, self._statements(('elseif', 'else', 'endif')))
+                    )
+                elif keyword.is_name('else'):
+                    self._expect_op(':')
+                    otherwise = self._statements(('endif',))
+                elif keyword.is_name('endif'):
+                    self._end_statement()
+                    return ('if', branches, otherwise)
+                else:
+                    raise self._error("Expected 'endif'")
+
+        branches = [(condition, self._block())]
+        otherwise = []
+        while True:
+            if self._token.is_name('elseif'):
+                self._next()
+                condition = self._condition()
+                branches.append((condition, self._block()))
+            elif self._token.is_name('else'):
+                self._next()
+                otherwise = self._block()
+                return ('if', branches, otherwise)
+            else:
+                return ('if', branches, otherwise)
+
+    def _foreach(self):
+        self._next()
+        self._expect_op('(')
+        iterable = self._expression()
+        if not self._next().is_name('as'):
+            raise self._error("Expected 'as'")
+        key = None
+        value = self._lvalue()
+        if self._token.is_op('=>'):
+            self._next()
+            key, value = value, self._lvalue()
+        self._expect_op(')')
+        if self._token.is_op(':'):
+            self._next()
+            body = self._statements(('endforeach',))
+            self._next()
+            self._end_statement()
+        else:
+            body = self._block()
+        return ('foreach', iterable, key, value, body)
+
+    def _lvalue(self):
+        token = self._next()
+        if token.kind != 'var':
+            raise self._error("Expected a variable")
+        target = ('var', token.value)
+        while self._token.is_op('['):
+            self._next()
+            if self._token.is_op(']'):
+                self._next()
+                target = ('index', target, None)
+                continue
+            index = self._expression()
+            self._expect_op(']')
+            target = ('index', target, index)
+        return target
+
+    # Expressions, lowest precedence first.
+
+    def _expression(self):
+        left = self._low_and()
+        while self._token.is_name('or', 'xor'):
+            operator = self._next().value.lower()
+            left = ('binary', operator, left, self._low_and())
+        return left
+
+    def _low_and(self):
+        left = self._assignment()
+        while self._token.is_name('and'):
+            self._next()
+            left = ('binary', '&&', left, self._assignment())
+        return left
+
+    def _assignment(self):
+        if self._token.kind == 'var':
+            start = self._index
+            target = self._lvalue()
+            if (self._token.kind == 'op'
+                    and self._token.value in _ASSIGNMENT_OPERATORS):
+                operator = self._next().value
+                return ('assign', operator, target, self._assignment())
+            self._index = start
+        return self._ternary()
+
+    def _ternary(self):
+        condition = self._coalesce()
+        while self._token.is_op('?'):
+            self._next()
+            if self._token.is_op(':'):
+                self._next()
+                condition = ('ternary', condition, None, self._coalesce())
+                continue
+            then = self._assignment()
+            self._expect_op(':')
+            condition = ('ternary', condition, then, self._coalesce())
+        return condition
+
+    def _coalesce(self):
+        left = self._binary(0)
+        if self._token.is_op('??'):
+            self._next()
+            return ('coalesce', left, self._coalesce())
+        return left
+
+    def _binary(self, level):
+        if level == len(_BINARY_PRECEDENCE):
+            return self._unary()
+        left = self._binary(level + 1)
+        while (self._token.kind == 'op'
+               and self._token.value in _BINARY_PRECEDENCE[level]):
+            operator = self._next().value
+            left = ('binary', operator, left, self._binary(level + 1))
+        return left
+
+    def _unary(self):
+        token = self._token
+        if token.is_op('!'):
+            self._next()
+            return ('not', self._unary())
+        if token.is_op('-', '+'):
+            self._next()
+            return ('negate' if token.value == '-' else 'plus', self._unary())
+        if token.is_op('@'):
+            self._next()
+            return self._unary()
+        return self._postfix(self._primary())
+
+    def _postfix(self, expression):
+        while True:
+            token = self._token
+            if token.is_op('['):
+                self._next()
+                index = self._expression()
+                self._expect_op(']')
+                expression = ('index', expression, index)
+            elif token.is_op('->', '::', '++', '--'):
+                raise self._error(f"Unsupported operator {token.value!r}")
+            else:
+                return expression
+
+    def _primary(self):
+        token = self._next()
+        if token.kind == 'var':
+            return ('var', token.value)
+        if token.kind in ('number', 'string'):
+            return ('literal', token.value)
+        if token.kind == 'interpolated':
+            return ('interpolated', [
+                ('literal', value) if kind == 'text'
+                else _Parser(_tokenize(value, code_only=True), self._path)
+                .expression_only()
+                for kind, value in token.value
+            ])
+        if token.is_op('('):
+            expression = self._expression()
+            self._expect_op(')')
+            return expression
+        if token.is_op('['):
+            return self._array(']')
+        if token.kind == 'name':
+            name = token.value
+            lower = name.lower()
+            if lower == 'array' and self._token.is_op('('):
+                self._next()
+                return self._array(')')
+            if lower in ('isset', 'empty') and self._token.is_op('('):
+                self._next()
+                arguments = self._arguments()
+                return (lower, arguments)
+            if self._token.is_op('('):
+                self._next()
+                return ('call', name, self._arguments())
+            if lower in _UNSUPPORTED_KEYWORDS:
+                raise self._error(f"Unsupported expression {name!r}")
+            return ('constant', name)
+        self._index -= 1
+        raise self._error(f"Unexpected {token.value!r}")
+
+    def _arguments(self):
+        arguments = []
+        while not self._token.is_op(')'):
+            arguments.append(self._expression())
+            if not self._token.is_op(')'):
+                self._expect_op(',')
+        self._next()
+        return arguments
+
+    def _array(self, closing):
+        items = []
+        while not self._token.is_op(closing):
+            value = self._expression()
+            key = None
+            if self._token.is_op('=>'):
+                self._next()
+                key, value = value, self._expression()
+            items.append((key, value))
+            if not self._token.is_op(closing):
+                self._expect_op(',')
+        self._next()
+        return ('array', items)
+
+    def expression_only(self):
+        expression = self._expression()
+        if self._token.kind != 'end':
+            raise self._error(f"Unexpected {self._token.value!r}")
+        return expression
+
+
+# -- Values ------------------------------------------------------------------
+#
+# PHP values map to None, bool, int, float, str and dict (arrays).
+
+def _to_string(value):
+    if value is None or value is False:
+        return ''
+    if value is True:
+        return '1'
+    if isinstance(value, float):
+        if value.is_integer() and abs(value) < 1e15:
+            return str(int(value))
+        return repr(value)
+    if isinstance(value, dict):
+        return 'Array'
+    return str(value)
+
+
+def _to_bool(value):
+    if isinstance(value, str):
+        return value not in ('', '0')
+    return bool(value)
+
+
+def _to_number(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        match = re.match(r'\s*[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?', value)
+        if not match:
+            return 0
+        text = match.group()
+        return float(text) if re.search(r'[.eE]', text) else int(text)
+    if isinstance(value, dict):
+        raise PhpRenderError("Unsupported operand types: array")
+    return int(bool(value))
+
+
+def _is_numeric(value):
+    return isinstance(value, str) and bool(
+        re.fullmatch(r'\s*[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?\s*', value)
+    )
+
+
+def _loose_equal(left, right):
+    """PHP 8 `==`."""
+    if isinstance(left, bool) or isinstance(right, bool) or left is None or right is None:
+        if left is None and isinstance(right, str):
+            return right == ''
+        if right is None and isinstance(left, str):
+            return left == ''
+        return _to_bool(left) == _to_bool(right)
+    if isinstance(left, str) and isinstance(right, str):
+        if _is_numeric(left) and _is_numeric(right):
+            return _to_number(left) == _to_number(right)
+        return left == right
+    if isinstance(left, str) or isinstance(right, str):
+        text, number = (left, right) if isinstance(left, str) else (right, left)
+        if isinstance(number, dict):
+            return False
+        if _is_numeric(text):
+            return _to_number(text) == number
+        return text == _to_string(number)
+    return left == right
+
+
+def _strict_equal(left, right):
+    """PHP `===`."""
+    return type(left) is type(right) and left == right
+
+
+def _compare(left, right):
+    if isinstance(left, str) and isinstance(right, str) and not (
+            _is_numeric(left) and _is_numeric(right)):
+        return (left > right) - (left < right)
+    left, right = _to_number(left), _to_number(right)
+    return (left > right) - (left < right)
+
+
+def _next_index(array):
+    indices = [key for key in array if isinstance(key, int)]
+    return max(indices) + 1 if indices else 0
+
+
+def _array_key(key):
+    if isinstance(key, bool):
+        return int(key)
+    if isinstance(key, float):
+        return int(key)
+    if key is None:
+        return ''
+    if isinstance(key, str) and re.fullmatch(r'-?[1-9]\d*|0', key):
+        return int(key)
+    return key
+
+
+def _str_replace(search, replace, subject):
+    searches = list(search.values()) if isinstance(search, dict) else [search]
+    if isinstance(replace, dict):
+        replaces = list(replace.values())
+        replaces += [''] * (len(searches) - len(replaces))
+    else:
+        replaces = [replace] * len(searches)
+
+    def replace_all(text):
+        text = _to_string(text)
+        for old, new in zip(searches, replaces):
+            old = _to_string(old)
+            if old:
+                text = text.replace(old, _to_string(new))
+        return text
+
+    if isinstance(subject, dict):
+        return {key: replace_all(value) for key, value in subject.items()}
+    return replace_all(subject)
+
+
+def _in_array(needle, haystack, strict=False):
+    equal = _strict_equal if strict else _loose_equal
+    return any(equal(needle, value) for value in haystack.values())
+
+
+def _substr(text, start, length):
+    if start < 0:
+        start = max(len(text) + start, 0)
+    if length is None:
+        return text[start:]
+    end = start + length if length >= 0 else len(text) + length
+    return text[start:end]
+
+
+def _ucwords(text):
+    return re.sub(r'(^|[ \t\r\n\f\v])(\S)', lambda m: m.group(1) + m.group(2).upper(), text)
+
+
+_FUNCTIONS = {
+    'strtolower': lambda s: _to_string(s).lower(),
+    'strtoupper': lambda s: _to_string(s).upper(),
+    'ucfirst': lambda s: _to_string(s)[:1].upper() + _to_string(s)[1:],
+    'lcfirst': lambda s: _to_string(s)[:1].lower() + _to_string(s)[1:],
+    'ucwords': lambda s: _ucwords(_to_string(s)),
+    'trim': lambda s, chars=' \t\n\r\0\x0B': _to_string(s).strip(chars),
+    'rtrim': lambda s, chars=' \t\n\r\0\x0B': _to_string(s).rstrip(chars),
+    'ltrim': lambda s, chars=' \t\n\r\0\x0B': _to_string(s).lstrip(chars),
+    'strlen': lambda s: len(_to_string(s).encode('utf-8')),
+    'str_replace': _str_replace,
+    'str_contains': lambda s, n: _to_string(n) in _to_string(s),
+    'str_starts_with': lambda s, n: _to_string(s).startswith(_to_string(n)),
+    'str_ends_with': lambda s, n: _to_string(s).endswith(_to_string(n)),
+    'implode': lambda glue, pieces: _to_string(glue).join(
+        _to_string(v) for v in pieces.values()
+    ),
+    'explode': lambda separator, s: dict(
+        enumerate(_to_string(s).split(_to_string(separator)))
+    ),
+    'count': lambda array: len(array),
+    'in_array': _in_array,
+    'array_search': lambda needle, haystack, strict=False: next(
+        (key for key, value in haystack.items()
+         if (_strict_equal if strict else _loose_equal)(needle, value)),
+        False
+    ),
+    'strcmp': lambda a, b: _compare(_to_string(a), _to_string(b)),
+    'substr': lambda s, start, length=None: _substr(_to_string(s), start, length),
+    'array_key_exists': lambda key, array: _array_key(key) in array,
+    'array_keys': lambda array: dict(enumerate(array.keys())),
+    'array_values': lambda array: dict(enumerate(array.values())),
+    'is_array': lambda value: isinstance(value, dict),
+    'is_null': lambda value: value is None,
+    'is_string': lambda value: isinstance(value, str),
+    'htmlspecialchars': lambda s, *_: (
+        _to_string(s).replace('&', '&amp;').replace('<', '&lt;')
+        .replace('>', '&gt;').replace('"', '&quot;').replace("'", '&#039;')
+    ),
+}
+_FUNCTIONS['join'] = _FUNCTIONS['implode']
+_FUNCTIONS['sizeof'] = _FUNCTIONS['count']
+
+# Helpers that the documentation site defines to embed media and links.
+# They don't affect the examples, so they render nothing.
+_SITE_FUNCTIONS = ('DOCS_VIMEO', 'DOCS_URL', 'getGlossaryDefinition')
+
+
+class _Return(Exception):
+    """Raised by `return` to stop rendering the current file."""
+
+
+# -- Renderer ----------------------------------------------------------------
+
+class PhpRenderer:
+    """Renders documentation PHP files to HTML."""
+
+    def __init__(self, root_dir='.'):
+        """
+        Initialize the renderer.
+
+        Args:
+            root_dir: Directory that relative include paths resolve against
+        """
+        self._root_dir = root_dir
+        self._constants = {'DOCS_RESOURCES': DOCS_RESOURCES, 'PHP_EOL': '\n'}
+        # Parsed statements and raw contents by path, shared across renders.
+        self._parsed = {}
+        self._contents = {}
+
+    def render(self, path):
+        """
+        Render a PHP file.
+
+        Returns:
+            The HTML the file outputs.
+
+        Raises:
+            PhpRenderError: the file uses unsupported PHP or fails.
+        """
+        self._variables = {}
+        self._output = []
+        self._included = set()
+        self._run_file(path)
+        return ''.join(self._output)
+
+    def _parse(self, path):
+        statements = self._parsed.get(path)
+        if statements is None:
+            with open(path, 'r', encoding='utf-8') as f:
+                source = f.read()
+            try:
+                statements = _Parser(_tokenize(source), path).parse_file()
+            except PhpRenderError as e:
+                # Remember the failure so the file isn't parsed again.
+                statements = e
+            self._parsed[path] = statements
+        if isinstance(statements, PhpRenderError):
+            raise statements
+        return statements
+
+    def _resolve(self, path, including_file):
+        if os.path.isabs(path):
+            return path
+        candidate = os.path.normpath(os.path.join(self._root_dir, path))
+        if os.path.isfile(candidate) or path.startswith(('./', '../')):
+            return candidate
+        # PHP also looks next to the including file.
+        return os.path.normpath(
+            os.path.join(os.path.dirname(including_file), path)
+        )
+
+    def _run_file(self, path):
+        self._included.add(os.path.realpath(path))
+        statements = self._parse(path)
+        try:
+            self._run(statements, path)
+        except _Return:
+            pass
+
+    def _run(self, statements, path):
+        for statement in statements:
+            kind = statement[0]
+            if kind == 'html':
+                self._output.append(statement[1])
+            elif kind == 'echo':
+                for value in statement[1]:
+                    self._output.append(_to_string(self._evaluate(value, path)))
+            elif kind == 'expression':
+                self._evaluate(statement[1], path)
+            elif kind == 'include':
+                self._include(statement[1], self._evaluate(statement[2], path), path)
+            elif kind == 'if':
+                _, branches, otherwise = statement
+                for condition, body in branches:
+                    if _to_bool(self._evaluate(condition, path)):
+                        self._run(body, path)
+                        break
+                else:
+                    self._run(otherwise, path)
+            elif kind == 'foreach':
+                _, iterable, key_target, value_target, body = statement
+                iterable = self._evaluate(iterable, path)
+                if not isinstance(iterable, dict):
+                    raise PhpRenderError(f"foreach over a non-array in {path}")
+                for key, value in list(iterable.items()):
+                    if key_target:
+                        self._assign(key_target, key, path)
+                    self._assign(value_target, value, path)
+                    self._run(body, path)
+            elif kind == 'block':
+                self._run(statement[1], path)
+            elif kind == 'return':
+                raise _Return()
+
+    def _include(self, keyword, include_path, path):
+        include_path = self._resolve(_to_string(include_path), path)
+        if keyword.endswith('_once') and os.path.realpath(include_path) in self._included:
+            return
+        if not os.path.isfile(include_path):
+            if keyword.startswith('require'):
+                raise PhpRenderError(f"Failed to require {include_path} in {path}")
+            # Like PHP, a missing include is only a warning.
+            return
+        self._run_file(include_path)
+
+    def _read_file(self, path):
+        if path not in self._contents:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._contents[path] = f.read()
+        return self._contents[path]
+
+    def _assign(self, target, value, path):
+        if target[0] == 'var':
+            self._variables[target[1]] = value
+            return
+        # ('index', container, key): create the arrays on the way down.
+        _, container, key = target
+        array = self._evaluate(container, path, create=True)
+        if array is None or array == '':
+            array = {}
+            self._assign(container, array, path)
+        if not isinstance(array, dict):
+            raise PhpRenderError(f"Cannot use a scalar as an array in {path}")
+        key = _next_index(array) if key is None else _array_key(self._evaluate(key, path))
+        array[key] = value
+
+    def _evaluate(self, node, path, create=False):
+        kind = node[0]
+        if kind == 'literal':
+            return node[1]
+        if kind == 'var':
+            if node[1] == 'this':
+                raise PhpRenderError(f"Unsupported $this in {path}")
+            return self._variables.get(node[1])
+        if kind == 'interpolated':
+            return ''.join(_to_string(self._evaluate(part, path)) for part in node[1])
+        if kind == 'constant':
+            name = node[1]
+            lower = name.lower()
+            if lower in ('true', 'false', 'null'):
+                return {'true': True, 'false': False, 'null': None}[lower]
+            if name in self._constants:
+                return self._constants[name]
+            raise PhpRenderError(f"Undefined constant {name} in {path}")
+        if kind == 'index':
+            container = self._evaluate(node[1], path, create)
+            key = self._evaluate(node[2], path)
+            if isinstance(container, dict):
+                return container.get(_array_key(key))
+            if isinstance(container, str):
+                index = _to_number(key)
+                return container[index] if -len(container) <= index < len(container) else ''
+            return None
+        if kind == 'array':
+            array = {}
+            for key, value in node[1]:
+                key = _next_index(array) if key is None else _array_key(self._evaluate(key, path))
+                array[key] = self._evaluate(value, path)
+            return array
+        if kind == 'assign':
+            _, operator, target, value = node
+            if operator == '??=':
+                current = self._evaluate(target, path)
+                if current is not None:
+                    return current
+                operator = '='
+            value = self._evaluate(value, path)
+            if operator != '=':
+                value = self._binary(
+                    operator[:-1], self._evaluate(target, path), value
+                )
+            if isinstance(value, dict):
+                # PHP arrays are values; assignment copies them.
+                value = dict(value)
+            self._assign(target, value, path)
+            return value
+        if kind == 'ternary':
+            _, condition, then, otherwise = node
+            condition_value = self._evaluate(condition, path)
+            if _to_bool(condition_value):
+                return condition_value if then is None else self._evaluate(then, path)
+            return self._evaluate(otherwise, path)
+        if kind == 'coalesce':
+            value = self._evaluate(node[1], path)
+            return self._evaluate(node[2], path) if value is None else value
+        if kind == 'binary':
+            _, operator, left, right = node
+            if operator in ('&&', '||', 'xor', 'or'):
+                left = _to_bool(self._evaluate(left, path))
+                if operator == '&&':
+                    return left and _to_bool(self._evaluate(right, path))
+                if operator in ('||', 'or'):
+                    return left or _to_bool(self._evaluate(right, path))
+                return left != _to_bool(self._evaluate(right, path))
+            return self._binary(
+                operator, self._evaluate(left, path), self._evaluate(right, path)
+            )
+        if kind == 'not':
+            return not _to_bool(self._evaluate(node[1], path))
+        if kind == 'negate':
+            return -_to_number(self._evaluate(node[1], path))
+        if kind == 'plus':
+            return _to_number(self._evaluate(node[1], path))
+        if kind == 'isset':
+            return all(self._evaluate(argument, path) is not None for argument in node[1])
+        if kind == 'empty':
+            return not _to_bool(self._evaluate(node[1][0], path))
+        if kind == 'call':
+            return self._call(node[1], [self._evaluate(a, path) for a in node[2]], path)
+        raise PhpRenderError(f"Unsupported expression {kind} in {path}")
+
+    def _binary(self, operator, left, right):
+        if operator == '.':
+            return _to_string(left) + _to_string(right)
+        if operator == '==':
+            return _loose_equal(left, right)
+        if operator in ('!=', '<>'):
+            return not _loose_equal(left, right)
+        if operator == '===':
+            return _strict_equal(left, right)
+        if operator == '!==':
+            return not _strict_equal(left, right)
+        if operator == '<=>':
+            return _compare(left, right)
+        if operator == '<':
+            return _compare(left, right) < 0
+        if operator == '<=':
+            return _compare(left, right) <= 0
+        if operator == '>':
+            return _compare(left, right) > 0
+        if operator == '>=':
+            return _compare(left, right) >= 0
+        if operator == '+' and isinstance(left, dict) and isinstance(right, dict):
+            return {**right, **left}
+        left, right = _to_number(left), _to_number(right)
+        if operator == '+':
+            return left + right
+        if operator == '-':
+            return left - right
+        if operator == '*':
+            return left * right
+        if operator == '/':
+            if right == 0:
+                raise PhpRenderError("Division by zero")
+            result = left / right
+            return int(result) if result.is_integer() and isinstance(left, int) and isinstance(right, int) else result
+        if operator == '%':
+            if int(right) == 0:
+                raise PhpRenderError("Modulo by zero")
+            return int(left) % int(right) if int(left) >= 0 else -(-int(left) % int(right))
+        raise PhpRenderError(f"Unsupported operator {operator}")
+
+    def _call(self, name, arguments, path):
+        if name in _SITE_FUNCTIONS:
+            return None
+        lower = name.lower()
+        if lower == 'file_get_contents':
+            file_path = self._resolve(_to_string(arguments[0]), path)
+            try:
+                return self._read_file(file_path)
+            except FileNotFoundError:
+                return False
+        function = _FUNCTIONS.get(lower)
+        if function is None:
+            raise PhpRenderError(f"Unsupported function {name}() in {path}")
+        try:
+            return function(*arguments)
+        except (TypeError, AttributeError) as e:
+            raise PhpRenderError(f"{name}() failed in {path}: {e}")
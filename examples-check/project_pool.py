@@ -0,0 +1,245 @@
+"""Persistent pool of the cloud projects that code blocks are compiled in."""
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from config import Config
+from utils import Language
+
+
+# API language, project name suffix and the files a project keeps.
+_LANGUAGES = {
+    Language.PYTHON: ('Py', 'Py', {'main.py', 'research.ipynb'}),
+    Language.CSHARP: ('C#', 'C', {'Main.cs', 'Research.ipynb'}),
+}
+_LEASE = re.compile(r'^lease:(?P<run>[0-9a-f]+):(?P<expires>\d+)$')
+# Projects of the runs before the pool, named with a timestamp.
+_TIMESTAMPED = re.compile(
+    r'^Example Tests/(?P<timestamp>\d{8}_\d{6}_\d{6})_Worker\d+_(Py|C)$'
+)
+
+
+class ProjectPool:
+    """
+    Leases the same projects to every run instead of creating new ones.
+
+    Projects are named `<Config.PROJECT_POOL>/Worker<id>_<Py|C>`. A run
+    leases worker Ids by writing `lease:<run Id>:<expiry>` in the project
+    descriptions. It keeps a worker only if, after Config.PROJECT_LEASE_SETTLE
+    seconds, the descriptions still hold its own lease, so concurrent runs
+    that claimed the same worker don't both use it. The lease is renewed
+    while the run lasts, and a crashed run's lease expires after
+    Config.PROJECT_LEASE seconds. Reused projects only have their files
+    reset when they hold more than the main file.
+    """
+
+    def __init__(self, api_client):
+        """
+        Args:
+            api_client: APIClient instance
+        """
+        self._api_client = api_client
+        self._run_id = uuid.uuid4().hex
+        self._leased = []
+        self._renewal = None
+        self._released = threading.Event()
+
+    def lease(self, workers):
+        """
+        Lease the projects of `workers` worker Ids, creating missing ones.
+
+        Returns:
+            Dictionary mapping Language to the list of project Ids.
+        """
+        leased = {}  # worker Id -> {Language: project Id}
+        lost = set()
+        while len(leased) < workers:
+            projects = self._projects_by_worker(self._api_client.list_projects())
+            now = time.time()
+            claims = []
+            worker_id = 0
+            while len(leased) + len(claims) < workers:
+                worker_id += 1
+                if worker_id in leased or worker_id in lost:
+                    continue
+                leased_by_others = any(
+                    self._lease_of(project, now) not in (None, self._run_id)
+                    for project in projects.get(worker_id, {}).values()
+                )
+                if not leased_by_others:
+                    claims.append(worker_id)
+            for worker_id, project_ids in self._claim(claims, projects).items():
+                if project_ids:
+                    leased[worker_id] = project_ids
+                else:
+                    lost.add(worker_id)
+
+        self._leased = [
+            project_id for worker_id in sorted(leased)
+            for project_id in leased[worker_id].values()
+        ]
+        self._reset_files(self._leased)
+        self._renewal = threading.Thread(target=self._renew, daemon=True)
+        self._renewal.start()
+
+        project_ids_by_language = {language: [] for language in _LANGUAGES}
+        for worker_id in sorted(leased):
+            for language, project_id in leased[worker_id].items():
+                project_ids_by_language[language].append(project_id)
+        return project_ids_by_language
+
+    def release(self):
+        """End the lease of the run's projects."""
+        self._released.set()
+        if self._renewal:
+            self._renewal.join()
+        with ThreadPoolExecutor(Config.API_THREADS) as executor:
+            list(executor.map(
+                lambda project_id: self._api_client.update_project(
+                    project_id, description=''
+                ),
+                self._leased
+            ))
+        self._leased = []
+
+    def collect_garbage(self, workers):
+        """
+        Delete the projects of the runs before the pool that started more
+        than Config.PROJECT_LEASE seconds ago and the pool projects of
+        worker Ids above `workers` that aren't leased.
+
+        Returns:
+            Number of deleted projects.
+        """
+        now = time.time()
+        # Runs before the pool named their projects with their local start time.
+        cutoff = datetime.now() - timedelta(seconds=Config.PROJECT_LEASE)
+        orphans = []
+        for project in self._api_client.list_projects():
+            name = project.get('name', '')
+            match = _TIMESTAMPED.match(name)
+            if match:
+                started = datetime.strptime(match['timestamp'], '%Y%m%d_%H%M%S_%f')
+                if started < cutoff:
+                    orphans.append(project['projectId'])
+                continue
+            worker = self._worker_of(name)
+            if (worker and worker[0] > workers and
+                    self._lease_of(project, now) is None):
+                orphans.append(project['projectId'])
+        with ThreadPoolExecutor(Config.API_THREADS) as executor:
+            list(executor.map(self._api_client.delete_project, orphans))
+        return len(orphans)
+
+    def _claim(self, worker_ids, projects):
+        """
+        Write the run's lease on the projects of `worker_ids` and check
+        which ones it kept once concurrent runs had time to write theirs.
+
+        Returns:
+            Dictionary mapping each worker Id to {Language: project Id},
+            or to None if another run leased the worker.
+        """
+        description = self._description()
+        jobs = [
+            (worker_id, language, projects.get(worker_id, {}).get(language))
+            for worker_id in worker_ids
+            for language in _LANGUAGES
+        ]
+        with ThreadPoolExecutor(Config.API_THREADS) as executor:
+            project_ids = list(executor.map(
+                lambda job: self._claim_project(*job, description), jobs
+            ))
+        if not jobs:
+            return {}
+
+        time.sleep(Config.PROJECT_LEASE_SETTLE)
+        leases = {
+            project['projectId']: self._lease_of(project, time.time())
+            for project in self._api_client.list_projects()
+        }
+        claims = {}
+        for (worker_id, language, _), project_id in zip(jobs, project_ids):
+            claims.setdefault(worker_id, {})[language] = project_id
+        won = {}
+        for worker_id, claim in claims.items():
+            if all(leases.get(project_id) == self._run_id
+                   for project_id in claim.values()):
+                won[worker_id] = claim
+                continue
+            won[worker_id] = None
+            # Give up the projects of the worker this run still holds.
+            for project_id in claim.values():
+                if leases.get(project_id) == self._run_id:
+                    self._api_client.update_project(project_id, description='')
+        return won
+
+    def _claim_project(self, worker_id, language, project, description):
+        """Write the lease on (or create) a worker's project and return its Id."""
+        api_language, suffix, _ = _LANGUAGES[language]
+        if project is None:
+            project_id = self._api_client.create_project(
+                f'{Config.PROJECT_POOL}/Worker{worker_id}_{suffix}',
+                api_language
+            )
+        else:
+            project_id = project['projectId']
+        self._api_client.update_project(project_id, description=description)
+        return project_id
+
+    def _reset_files(self, project_ids):
+        """
+        Remove files left in the projects by hand or by other tools; the
+        main file is overwritten before every compile.
+        """
+        keep_files = set().union(*(files for _, _, files in _LANGUAGES.values()))
+
+        def reset(project_id):
+            for name in self._api_client.read_file_names(project_id):
+                if name not in keep_files:
+                    self._api_client.delete_file(project_id, name)
+
+        with ThreadPoolExecutor(Config.API_THREADS) as executor:
+            list(executor.map(reset, project_ids))
+
+    def _renew(self):
+        """Extend the lease of the run's projects until they're released."""
+        while not self._released.wait(Config.PROJECT_LEASE / 4):
+            description = self._description()
+            for project_id in self._leased:
+                self._api_client.update_project(project_id, description=description)
+
+    def _description(self):
+        """Return the project description that leases it to the run."""
+        return f'lease:{self._run_id}:{int(time.time() + Config.PROJECT_LEASE)}'
+
+    def _projects_by_worker(self, projects):
+        """Return {worker Id: {Language: project}} of the pool projects."""
+        by_worker = {}
+        for project in projects:
+            worker = self._worker_of(project.get('name', ''))
+            if worker:
+                worker_id, language = worker
+                by_worker.setdefault(worker_id, {})[language] = project
+        return by_worker
+
+    def _worker_of(self, name):
+        """Return the (worker Id, Language) of a pool project name, or None."""
+        prefix = f'{Config.PROJECT_POOL}/Worker'
+        if not name.startswith(prefix):
+            return None
+        worker_id, _, suffix = name[len(prefix):].partition('_')
+        for language, (_, language_suffix, _) in _LANGUAGES.items():
+            if suffix == language_suffix and worker_id.isdigit():
+                return int(worker_id), language
+        return None
+
+    def _lease_of(self, project, now):
+        """Return the run Id of a project's unexpired lease, or None."""
+        match = _LEASE.match(project.get('description') or '')
+        if not match or int(match['expires']) < now:
+            return None
+        return match['run']
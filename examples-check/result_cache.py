@@ -0,0 +1,49 @@
+"""Persistent, content-addressed cache for expensive check results."""
+import hashlib
+import json
+import os
+
+
+class ResultCache:
+    """Stores JSON values on disk, one file per key.
+
+    Keys are derived from everything that can change a result, so stale
+    entries are never read; they are just left behind.
+    """
+
+    def __init__(self, directory):
+        self._directory = directory
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        """Hash the given JSON-serializable parts into a cache key."""
+        return hashlib.sha256(
+            json.dumps(parts, sort_keys=True, default=str).encode('utf-8')
+        ).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self._directory, key[:2], f"{key}.json")
+
+    def get(self, key):
+        """Return the cached entry for the key, or None on a miss."""
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def set(self, key, entry):
+        """Store a JSON-serializable entry under the key."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename so concurrent readers never see partial files.
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
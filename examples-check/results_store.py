@@ -0,0 +1,188 @@
+"""Persistent store of regression results with per-phase timings.
+
+Every run of the regression tests appends its results to a SQLite
+database, so slow examples and duration trends can be reported across
+runs:
+
+    python examples-check/results_store.py [--db PATH] [--slowest N] [--runs N]
+"""
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime
+
+
+PHASES = ["update", "compile", "queue", "run", "log_scan"]
+_PHASE_COLUMNS = [f"{phase}_seconds" for phase in PHASES]
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started TEXT NOT NULL,
+    finished TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    example TEXT NOT NULL,
+    language TEXT NOT NULL,
+    url TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    error TEXT,
+    statistics TEXT,
+    {", ".join(f"{column} REAL" for column in _PHASE_COLUMNS)},
+    total REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_example ON results(example, run_id);
+"""
+
+
+class ResultsStore:
+    """Records the results of regression runs in a SQLite database."""
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._connection = sqlite3.connect(path)
+        self._connection.executescript(_SCHEMA)
+        self.run_id = None
+
+    def start_run(self):
+        """Begin a new run; results are recorded against it."""
+        cursor = self._connection.execute(
+            "INSERT INTO runs (started) VALUES (?)",
+            (datetime.now().isoformat(timespec='seconds'),)
+        )
+        self._connection.commit()
+        self.run_id = cursor.lastrowid
+        return self.run_id
+
+    def record(self, code_block, result):
+        """Store the BacktestResult of a code block in the current run."""
+        timings = [result.timings.get(phase) for phase in PHASES]
+        self._connection.execute(
+            f"INSERT INTO results VALUES ({', '.join('?' * (8 + len(PHASES)))})",
+            (
+                self.run_id,
+                code_block.get_backtest_name(),
+                code_block.language.value,
+                code_block.url,
+                int(result.success),
+                result.error_message or None,
+                json.dumps(result.statistics) if result.success else None,
+                *timings,
+                sum(t for t in timings if t)
+            )
+        )
+        # Commit as we go so an interrupted run keeps its results.
+        self._connection.commit()
+
+    def finish_run(self):
+        """Mark the current run as finished."""
+        self._connection.execute(
+            "UPDATE runs SET finished = ? WHERE id = ?",
+            (datetime.now().isoformat(timespec='seconds'), self.run_id)
+        )
+        self._connection.commit()
+
+    def slowest(self, limit=20, run_id=None):
+        """
+        Get the slowest examples of a run.
+
+        Args:
+            limit: Number of examples to return
+            run_id: Run to report on; defaults to the latest run
+
+        Returns:
+            List of (example, url, success, total, {phase: seconds}) tuples.
+        """
+        run_id = run_id or self._latest_run_id()
+        rows = self._connection.execute(
+            f"""SELECT example, url, success, total, {", ".join(_PHASE_COLUMNS)}
+                FROM results WHERE run_id = ?
+                ORDER BY total DESC LIMIT ?""",
+            (run_id, limit)
+        ).fetchall()
+        return [
+            (example, url, bool(success), total,
+             dict(zip(PHASES, phases)))
+            for example, url, success, total, *phases in rows
+        ]
+
+    def run_summaries(self, limit=10):
+        """
+        Get the total time of each phase for the latest runs.
+
+        Returns:
+            List of (run Id, started, examples, failures, {phase: seconds})
+            tuples, newest first.
+        """
+        rows = self._connection.execute(
+            f"""SELECT runs.id, runs.started, COUNT(results.run_id),
+                       SUM(1 - results.success),
+                       {", ".join(f"SUM(results.{column})" for column in _PHASE_COLUMNS)}
+                FROM runs LEFT JOIN results ON results.run_id = runs.id
+                GROUP BY runs.id ORDER BY runs.id DESC LIMIT ?""",
+            (limit,)
+        ).fetchall()
+        return [
+            (run_id, started, examples, failures or 0,
+             {phase: seconds or 0 for phase, seconds in zip(PHASES, phases)})
+            for run_id, started, examples, failures, *phases in rows
+        ]
+
+    def history(self, example, limit=10):
+        """Get the (run Id, total seconds) of an example's latest runs."""
+        return self._connection.execute(
+            """SELECT run_id, total FROM results WHERE example = ?
+               ORDER BY run_id DESC LIMIT ?""",
+            (example, limit)
+        ).fetchall()
+
+    def _latest_run_id(self):
+        row = self._connection.execute("SELECT MAX(id) FROM runs").fetchone()
+        return row[0]
+
+    def print_report(self, slowest=20, runs=10):
+        """Print the slowest examples of the latest run and their trends."""
+        print(f"\nPhase totals (seconds) of the last {runs} runs:")
+        print(f"{'run':>5} {'started':<20} {'examples':>8} {'failed':>6} "
+              + " ".join(f"{phase:>9}" for phase in PHASES))
+        for run_id, started, examples, failures, phases in self.run_summaries(runs):
+            print(f"{run_id:>5} {started:<20} {examples:>8} {failures:>6} "
+                  + " ".join(f"{phases[phase]:>9.0f}" for phase in PHASES))
+
+        print(f"\nSlowest {slowest} examples of the latest run "
+              "(total, then the previous runs, newest first):")
+        for example, url, success, total, phases in self.slowest(slowest):
+            previous = [t for _, t in self.history(example, runs)[1:]]
+            trend = ", ".join(f"{t:.0f}" for t in previous) or "-"
+            status = "" if success else " [failed]"
+            print(f"{total:>7.0f}s {url}{status}\n"
+                  f"         {example}\n"
+                  f"         "
+                  + ", ".join(f"{phase}={phases[phase] or 0:.0f}" for phase in PHASES)
+                  + f" | previous: {trend}")
+
+    def close(self):
+        self._connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Report the slowest examples of the regression tests."
+    )
+    parser.add_argument("--db", help="Defaults to Config.RESULTS_DB.")
+    parser.add_argument("--slowest", type=int, default=20)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+    if not args.db:
+        # Config needs the API credentials, so only load it when required.
+        from config import Config
+        args.db = Config.RESULTS_DB
+    store = ResultsStore(args.db)
+    store.print_report(args.slowest, args.runs)
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
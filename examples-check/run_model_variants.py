@@ -8,18 +8,22 @@ Credentials (checked in order):
     2. LEAN CLI credentials file: ~/.lean/credentials
 """
 import sys
-import os
 import json
 import time
-import base64
-import hashlib
 from pathlib import Path
 
 try:
-    import requests
+    import requests  # used by qc_api
 except ImportError:
     sys.exit("Missing dependency: pip install requests")
 
+# The shared API helpers (qc_api) are at the root of the repository.
+sys.path.append(str(Path(__file__).resolve().parents[1]))
+from qc_api import (
+    poll, get_policy, PollTimeout, backtest_hint, METRICS, REQUEST_METRICS,
+    QuantConnectClient, load_credentials
+)
+
 try:
     from bs4 import BeautifulSoup
 except ImportError:
@@ -30,29 +34,12 @@ except ImportError:
 # Credentials & API helpers
 # ---------------------------------------------------------------------------
 
-def _load_credentials():
-    user_id = os.environ.get("DOCS_REGRESSION_TEST_USER_ID", "")
-    user_token = os.environ.get("DOCS_REGRESSION_TEST_USER_TOKEN", "")
-    if user_id and user_token:
-        return user_id, user_token
-    lean_creds = Path.home() / ".lean" / "credentials"
-    if lean_creds.exists():
-        try:
-            creds = json.loads(lean_creds.read_text())
-            user_id = str(creds.get("user-id", ""))
-            user_token = creds.get("api-token", "")
-            if user_id and user_token:
-                return user_id, user_token
-        except (json.JSONDecodeError, KeyError):
-            pass
-    return "", ""
-
-
-BASE_API = "https://www.quantconnect.com/api/v2"
-USER_ID, USER_TOKEN = _load_credentials()
+USER_ID, USER_TOKEN = load_credentials(
+    "DOCS_REGRESSION_TEST_USER_ID", "DOCS_REGRESSION_TEST_USER_TOKEN"
+)
+CLIENT = QuantConnectClient(USER_ID, USER_TOKEN)
 PYTHON_IMPORTS = "from AlgorithmImports import *\n"
 MAX_RETRIES = 5
-POLL_INTERVAL = 10  # seconds between status polls
 BACKTEST_TIMEOUT = 1800  # seconds
 SLOW_THRESHOLD = 300  # seconds; placeholder backtests over this become skip-test
 # Set to a list of category names to skip (e.g. already tested ones)
@@ -62,19 +49,8 @@ SKIP_CATEGORIES = ["Sentiment Analysis"]
 REUSE_PROJECT_ID = 29125823
 
 
-def _headers():
-    ts = str(int(time.time()))
-    hashed = hashlib.sha256(f"{USER_TOKEN}:{ts}".encode()).hexdigest()
-    auth = base64.b64encode(f"{USER_ID}:{hashed}".encode()).decode()
-    return {"Authorization": f"Basic {auth}", "Timestamp": ts}
-
-
 def api_post(endpoint, payload=None):
-    return requests.post(
-        f"{BASE_API}/{endpoint}",
-        headers=_headers(),
-        json=payload or {}
-    ).json()
+    return CLIENT.post(endpoint, payload)
 
 
 def clean_code(code):
@@ -159,17 +135,22 @@ def compile_project(project_id):
     if not compile_id:
         raise RuntimeError(f"no compileId in response: {resp}")
 
-    deadline = time.time() + 300
-    while time.time() < deadline:
-        time.sleep(POLL_INTERVAL)
-        r = api_post("compile/read", {"projectId": project_id, "compileId": compile_id})
-        state = r.get("state") or r.get("compile", {}).get("state", "")
-        if state == "BuildSuccess":
-            return compile_id
-        if state == "BuildError":
-            logs = r.get("logs") or r.get("compile", {}).get("logs", [])
-            raise RuntimeError(f"compile error: {logs[-3:] if logs else r}")
-    raise RuntimeError("compile timed out")
+    def state(r):
+        return r.get("state") or r.get("compile", {}).get("state", "")
+
+    try:
+        r = poll(
+            lambda: api_post("compile/read", {"projectId": project_id, "compileId": compile_id}),
+            lambda r: state(r) in ("BuildSuccess", "BuildError"),
+            "compile/read",
+            policy=get_policy("compile/read", timeout=300)
+        )
+    except PollTimeout:
+        raise RuntimeError("compile timed out")
+    if state(r) == "BuildError":
+        logs = r.get("logs") or r.get("compile", {}).get("logs", [])
+        raise RuntimeError(f"compile error: {logs[-3:] if logs else r}")
+    return compile_id
 
 
 def run_backtest(project_id, compile_id, label):
@@ -182,19 +163,25 @@ def run_backtest(project_id, compile_id, label):
         raise RuntimeError(f"backtest create failed: {resp}")
     bt_id = resp["backtest"]["backtestId"]
 
-    deadline = time.time() + BACKTEST_TIMEOUT
-    while time.time() < deadline:
-        time.sleep(POLL_INTERVAL)
-        r = api_post("backtests/read", {"projectId": project_id, "backtestId": bt_id})
-        bt = r.get("backtest", {})
-        progress = bt.get("progress", 0)
-        completed = bt.get("completed", False)
-        if completed:
-            return bt
-        if bt.get("error"):
-            raise RuntimeError(f"backtest error: {bt['error']}")
-        print(f"    ... {int(progress*100)}% complete")
-    raise RuntimeError("backtest timed out")
+    def read():
+        bt = api_post("backtests/read", {"projectId": project_id, "backtestId": bt_id}).get("backtest", {})
+        if not bt.get("completed") and not bt.get("error"):
+            print(f"    ... {int(bt.get('progress', 0)*100)}% complete")
+        return bt
+
+    try:
+        bt = poll(
+            read,
+            lambda bt: bt.get("completed") or bt.get("error"),
+            "backtests/read",
+            policy=get_policy("backtests/read", timeout=BACKTEST_TIMEOUT),
+            hint=backtest_hint
+        )
+    except PollTimeout:
+        raise RuntimeError("backtest timed out")
+    if not bt.get("completed"):
+        raise RuntimeError(f"backtest error: {bt['error']}")
+    return bt
 
 
 def extract_stats(bt):
@@ -370,6 +357,8 @@ def main():
     with open(output_path, "w") as f:
         json.dump(results, f, indent=2, default=str)
     print(f"Raw results saved to {output_path}")
+    print(f"\nPolling:\n{METRICS.report()}")
+    print(f"\nAPI requests:\n{REQUEST_METRICS.report()}")
 
 
 if __name__ == "__main__":
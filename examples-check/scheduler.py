@@ -0,0 +1,151 @@
+"""Pipelined backtest scheduling across the organization's backtest nodes."""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from qc_api import poll_async, PollTimeout, backtest_hint
+
+from config import Config
+from backtest_runner import BacktestRunner, BacktestResult, PhaseTimer
+
+
+class BacktestScheduler:
+    """
+    Runs many code blocks through update -> compile -> backtest -> poll
+    concurrently.
+
+    A project is only held while its code is updated, compiled and the
+    backtest is created (backtests run on the compiled snapshot), and a
+    backtest node is only held from backtest creation until the backtest
+    completes. Log scans and statistics run after the node is released, so
+    compiled code blocks are always waiting for the next free node.
+    Blocking API calls run in a thread pool and share the process-wide
+    rate limiter in api_client.
+    """
+
+    def __init__(self, api_client, compiler_by_language, project_ids_by_language):
+        """
+        Initialize the scheduler.
+
+        Args:
+            api_client: APIClient instance
+            compiler_by_language: Dictionary mapping Language to compiler
+            project_ids_by_language: Dictionary mapping Language to the
+                list of project Ids that code blocks can be compiled in
+        """
+        self._api_client = api_client
+        self._runner = BacktestRunner(api_client, compiler_by_language)
+        self._project_ids_by_language = project_ids_by_language
+
+    async def run(self, code_blocks, on_result=None):
+        """
+        Backtest all the code blocks.
+
+        Args:
+            code_blocks: CodeBlocks to backtest
+            on_result: Optional callback(code_block, result) called as each
+                backtest finishes
+
+        Returns:
+            List of BacktestResult, in the order of `code_blocks`.
+        """
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(Config.API_THREADS))
+        self._projects = {}
+        for language, project_ids in self._project_ids_by_language.items():
+            self._projects[language] = asyncio.Queue()
+            for project_id in project_ids:
+                self._projects[language].put_nowait(project_id)
+        self._nodes = asyncio.Semaphore(Config.WORKERS)
+
+        async def run_one(code_block):
+            result = await self._run_one(code_block)
+            if on_result:
+                on_result(code_block, result)
+            return result
+
+        return await asyncio.gather(*(run_one(cb) for cb in code_blocks))
+
+    async def _run_one(self, code_block):
+        """Backtest a single code block."""
+        timings = {}
+        try:
+            started = await self._start_backtest(code_block, timings)
+        except Exception as e:
+            started = BacktestResult(False, f"Backtest setup failed: {e}")
+        if isinstance(started, BacktestResult):
+            started.timings = timings
+            return started
+        project_id, backtest_id = started
+
+        timer = PhaseTimer(timings)
+        try:
+            try:
+                backtest = await self._wait_for_backtest(
+                    project_id, backtest_id
+                )
+            finally:
+                self._nodes.release()
+            timer.lap("run")
+            result = await asyncio.to_thread(
+                self._runner.check_backtest,
+                backtest, project_id, backtest_id, timings
+            )
+        except Exception as e:
+            result = BacktestResult(False, f"Backtest check failed: {e}")
+        result.timings = timings
+        return result
+
+    async def _start_backtest(self, code_block, timings):
+        """
+        Compile the code block in a free project and start its backtest.
+
+        Returns:
+            Tuple of (project Id, backtest Id) while holding a node, or a
+            failed BacktestResult.
+        """
+        timer = PhaseTimer(timings)
+        projects = self._projects[code_block.language]
+        project_id = await projects.get()
+        timer.lap("queue")
+        try:
+            compile_id, error = await asyncio.to_thread(
+                self._runner.compile_code_block,
+                code_block, project_id, timings
+            )
+            if error:
+                return error
+            # Wait for a free node before starting the backtest.
+            timer = PhaseTimer(timings)
+            await self._nodes.acquire()
+            timer.lap("queue")
+            timer = PhaseTimer(timings)
+            try:
+                backtest_id, error = await asyncio.to_thread(
+                    self._runner.create_backtest,
+                    code_block, project_id, compile_id
+                )
+            except BaseException:
+                self._nodes.release()
+                raise
+            timer.lap("run")
+            if error:
+                self._nodes.release()
+                return error
+            return project_id, backtest_id
+        finally:
+            # The backtest runs on its compile, so the project is free again.
+            projects.put_nowait(project_id)
+
+    async def _wait_for_backtest(self, project_id, backtest_id):
+        """Poll until the backtest completes, without blocking a thread."""
+        try:
+            return await poll_async(
+                lambda: self._api_client.read_backtest_once(
+                    project_id, backtest_id
+                ),
+                lambda backtest: backtest.get("completed"),
+                "backtests/read",
+                hint=backtest_hint
+            )
+        except PollTimeout:
+            return None
@@ -0,0 +1,18 @@
+"""Shared helpers for scripts that call the QuantConnect API."""
+from qc_api.client import (
+    QuantConnectClient, RequestMetrics, REQUEST_METRICS, RATE_LIMITER,
+    load_credentials, authentication_headers
+)
+from qc_api.polling import (
+    poll, poll_async, PollPolicy, PollTimeout, POLICIES, METRICS,
+    get_policy, backtest_hint
+)
+from qc_api.rate_limiter import TokenBucket
+
+__all__ = [
+    'QuantConnectClient', 'RequestMetrics', 'REQUEST_METRICS', 'RATE_LIMITER',
+    'load_credentials', 'authentication_headers',
+    'poll', 'poll_async', 'PollPolicy', 'PollTimeout', 'POLICIES', 'METRICS',
+    'get_policy', 'backtest_hint',
+    'TokenBucket'
+]
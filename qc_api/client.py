@@ -0,0 +1,273 @@
+"""Pooled client of the QuantConnect REST API.
+
+One QuantConnectClient keeps a requests.Session, so calls reuse their
+TLS connections instead of opening one per request. Every client in the
+process shares a rate limiter (unless it's given its own) and retries
+connection errors, timeouts and 429/5xx responses with exponential
+backoff. Calls that create something (`*/create` endpoints) are only
+retried when the request never reached the server or was rate limited,
+so a timeout can't create a backtest, project or live deployment twice.
+The time of every request is recorded in REQUEST_METRICS.
+
+    client = QuantConnectClient(*load_credentials(
+        'QUANTCONNECT_USER_ID', 'QUANTCONNECT_API_TOKEN'
+    ))
+    client.post('authenticate')
+    await client.post_async('backtests/read', {...})
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+from qc_api.rate_limiter import TokenBucket
+
+
+BASE_URL = 'https://www.quantconnect.com/api/v2'
+# Responses worth another try: rate limited or the server is overloaded.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# Endpoints that aren't safe to repeat once the server received them.
+NON_IDEMPOTENT = re.compile(r'(^|/)create$')
+
+# Shared by every client that isn't given its own, so the organization's
+# limit of 100 calls per minute holds for the whole process.
+RATE_LIMITER = TokenBucket(100, 60)
+
+
+def load_credentials(user_id_variable, api_token_variable):
+    """
+    Read the API credentials from the environment, or else from the
+    LEAN CLI credentials file (~/.lean/credentials).
+
+    Returns:
+        Tuple of (user Id, API token); both are empty if not found.
+    """
+    user_id = os.environ.get(user_id_variable, '')
+    api_token = os.environ.get(api_token_variable, '')
+    if user_id and api_token:
+        return user_id, api_token
+    lean_credentials = Path.home() / '.lean' / 'credentials'
+    if lean_credentials.exists():
+        try:
+            credentials = json.loads(lean_credentials.read_text())
+            user_id = str(credentials.get('user-id', ''))
+            api_token = credentials.get('api-token', '')
+            if user_id and api_token:
+                return user_id, api_token
+        except ValueError:
+            pass
+    return '', ''
+
+
+def authentication_headers(user_id, api_token, timestamp=None):
+    """Return the headers that authenticate a request."""
+    timestamp = str(int(timestamp or time.time()))
+    hashed_token = hashlib.sha256(
+        f'{api_token}:{timestamp}'.encode('utf-8')
+    ).hexdigest()
+    authentication = base64.b64encode(
+        f'{user_id}:{hashed_token}'.encode('utf-8')
+    ).decode('ascii')
+    return {'Authorization': f'Basic {authentication}', 'Timestamp': timestamp}
+
+
+class RequestMetrics:
+    """Thread-safe timings of the requests per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, elapsed, waited, retries, failed):
+        """
+        Args:
+            endpoint: API endpoint
+            elapsed: Seconds of the request, retries included
+            waited: Seconds spent waiting for the rate limiter
+            retries: Number of retried attempts
+            failed: Whether the last attempt failed
+        """
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'calls': 0, 'retries': 0, 'failures': 0, 'waited': 0.0,
+                'durations': []
+            })
+            stats['calls'] += 1
+            stats['retries'] += retries
+            stats['failures'] += int(failed)
+            stats['waited'] += waited
+            stats['durations'].append(elapsed)
+
+    def summary(self):
+        """Return {endpoint: {calls, retries, failures, waited, mean, p50, p95, max}}."""
+        with self._lock:
+            summary = {}
+            for endpoint, stats in self._endpoints.items():
+                durations = sorted(stats['durations'])
+                summary[endpoint] = {
+                    'calls': stats['calls'],
+                    'retries': stats['retries'],
+                    'failures': stats['failures'],
+                    'waited': stats['waited'],
+                    'mean': sum(durations) / len(durations),
+                    'p50': durations[len(durations) // 2],
+                    'p95': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+                    'max': durations[-1],
+                }
+            return summary
+
+    def report(self):
+        """Format the summary as a table."""
+        lines = [f"{'endpoint':<24} {'calls':>6} {'retries':>7} {'failed':>6} "
+                 f"{'waited':>8} {'mean':>7} {'p50':>7} {'p95':>7} {'max':>7}"]
+        for endpoint, s in sorted(self.summary().items()):
+            lines.append(
+                f"{endpoint:<24} {s['calls']:>6} {s['retries']:>7} {s['failures']:>6} "
+                f"{s['waited']:>7.1f}s {s['mean']:>6.2f}s {s['p50']:>6.2f}s "
+                f"{s['p95']:>6.2f}s {s['max']:>6.2f}s"
+            )
+        return '\n'.join(lines)
+
+
+REQUEST_METRICS = RequestMetrics()
+
+
+class QuantConnectClient:
+    """Authenticated, pooled, rate-limited calls to the QuantConnect API."""
+
+    def __init__(self, user_id, api_token, base_url=BASE_URL, rate_limiter=None,
+                 pool_size=10, retries=3, backoff=1.0, timeout=60):
+        """
+        Args:
+            user_id: QuantConnect user Id
+            api_token: QuantConnect API token
+            base_url: Root of the API, e.g. the URL of a FakeQuantConnectAPI
+            rate_limiter: TokenBucket to use instead of the shared RATE_LIMITER
+            pool_size: Number of connections kept open; match it to the
+                number of threads that call the client
+            retries: Number of times a failed request is retried
+            backoff: Seconds before the first retry; doubles after each
+            timeout: Seconds to wait for a response
+        """
+        self._user_id = str(user_id or '')
+        self._api_token = api_token or ''
+        self._base_url = base_url.rstrip('/')
+        self._rate_limiter = rate_limiter or RATE_LIMITER
+        self._retries = retries
+        self._backoff = backoff
+        self._timeout = timeout
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def post(self, endpoint, payload=None, idempotent=None):
+        """
+        Call an endpoint and return its decoded JSON response.
+
+        Args:
+            endpoint: API endpoint, e.g. 'backtests/create'
+            payload: JSON body of the request
+            idempotent: Whether the call can be repeated safely. Defaults to
+                False for `*/create` endpoints, which are then only retried
+                on connection failures and 429 responses.
+
+        Raises:
+            requests.RequestException: the request failed on every attempt.
+            requests.HTTPError: the response isn't JSON.
+        """
+        endpoint = endpoint.strip('/')
+        url = f'{self._base_url}/{endpoint}'
+        if idempotent is None:
+            idempotent = not NON_IDEMPOTENT.search(endpoint)
+        start = time.monotonic()
+        waited = 0.0
+        attempt = 0
+        try:
+            while True:
+                wait_start = time.monotonic()
+                self._rate_limiter.acquire()
+                waited += time.monotonic() - wait_start
+                try:
+                    response = self._session.post(
+                        url,
+                        headers=authentication_headers(self._user_id, self._api_token),
+                        json=payload or {},
+                        timeout=self._timeout
+                    )
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    if attempt >= self._retries or not (idempotent or _not_sent(e)):
+                        raise
+                    delay = None
+                else:
+                    retry = response.status_code in RETRY_STATUSES and (
+                        idempotent or response.status_code == 429
+                    )
+                    if not retry or attempt >= self._retries:
+                        result = _decode(endpoint, response)
+                        REQUEST_METRICS.record(
+                            endpoint, time.monotonic() - start, waited, attempt,
+                            not response.ok
+                        )
+                        return result
+                    delay = _retry_after(response)
+                attempt += 1
+                time.sleep(delay or self._backoff * 2 ** (attempt - 1))
+        except Exception:
+            REQUEST_METRICS.record(
+                endpoint, time.monotonic() - start, waited, attempt, True
+            )
+            raise
+
+    async def post_async(self, endpoint, payload=None, idempotent=None):
+        """
+        Asynchronous `post`. The request runs in the default executor, on
+        the same connection pool and rate limiter as the blocking calls.
+        """
+        return await asyncio.to_thread(self.post, endpoint, payload, idempotent)
+
+    def close(self):
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _not_sent(error):
+    """Whether a request failed before it reached the server."""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(reason, NewConnectionError)
+
+
+def _decode(endpoint, response):
+    """Return the JSON body of a response, or raise a HTTPError if it has none."""
+    try:
+        return response.json()
+    except ValueError:
+        raise requests.HTTPError(
+            f'{endpoint} returned {response.status_code} {response.reason} '
+            f'without a JSON body: {response.text[:200]!r}',
+            response=response
+        ) from None
+
+
+def _retry_after(response):
+    """Seconds from the Retry-After header, or None."""
+    try:
+        return float(response.headers.get('Retry-After', ''))
+    except ValueError:
+        return None
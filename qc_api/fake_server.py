@@ -0,0 +1,561 @@
+"""Local stand-in for the QuantConnect API, for offline tests and benchmarks.
+
+FakeQuantConnectAPI serves the API on 127.0.0.1 from a background thread
+and checks the authentication headers of every request like the real
+API does:
+
+    with FakeQuantConnectAPI(latency=0.05, nodes=2, backtest_time=3) as api:
+        client = QuantConnectClient(api.user_id, api.api_token, api.url)
+        client.post('authenticate')
+
+It keeps projects, files, compiles, backtests and the object store in
+memory and implements:
+
+- authenticate, lean/versions/read
+- projects/create, projects/read, projects/update, projects/delete
+- files/create, files/read, files/update, files/delete
+- compile/create, compile/read
+- backtests/create, backtests/read, backtests/update, backtests/delete,
+  backtests/list, backtests/read/log, backtests/orders/read
+- object/get, with the zip of the objects served at the returned URL
+
+Compiles and backtests take `compile_time` and `backtest_time` seconds.
+Only `nodes` backtests run at a time; the others wait in a queue, like on
+an organization's backtest nodes. `latency`, `failure_rate` (requests
+answered with a 503 or a 429) and `rate_limit` shape every response, so
+schedulers, retries and rate limiters can be load-tested. `rejections`
+answers the first requests of some endpoints with an HTTP 200
+`{"success": false}`, like the API's transient application errors. Latency and
+failures are drawn from hashes of `seed`, the endpoint and the request
+count, so a run replays the same way.
+
+What a backtest does is up to `run_algorithm(files, parameters)`, which
+returns the error, logs, statistics and object store writes of a
+backtest; by default Python projects with syntax errors fail to build and every backtest
+succeeds with a short log.
+
+Run it standalone with
+    python -m qc_api.fake_server [--port N] [--latency S] [--nodes N] ...
+and point a script at the printed URL.
+
+Endpoints are methods named after the endpoint path, with `/` replaced
+by `_`; each takes the JSON payload and returns the JSON response.
+"""
+import argparse
+import base64
+import hashlib
+import io
+import itertools
+import json
+import threading
+import time
+import zipfile
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def default_algorithm(files, parameters):
+    """
+    Simulate a backtest of the project files with the backtest parameters.
+
+    Returns:
+        Dictionary with the optional keys `error`, `stacktrace`, `logs`
+        (list of lines), `statistics` and `objects` ({key: bytes} saved to
+        the object store when the backtest completes).
+    """
+    return {
+        'logs': [
+            'Launching analysis for fake algorithm',
+            'Algorithm completed in 1.00 seconds.',
+        ],
+        'statistics': {
+            'Total Orders': '0', 'Net Profit': '0%', 'Sharpe Ratio': '0',
+        },
+    }
+
+
+def default_build(files):
+    """Return the build errors of the project files (syntax errors only)."""
+    errors = []
+    for name, content in files.items():
+        if not name.endswith('.py'):
+            continue
+        try:
+            compile(content, name, 'exec')
+        except SyntaxError as e:
+            errors.append(f'{name}({e.lineno}): {e.msg}')
+    return errors
+
+
+class FakeQuantConnectAPI:
+    """A QuantConnect API server with in-memory state."""
+
+    def __init__(self, user_id='1', api_token='token', organization_id='org',
+                 lean_version=17000, latency=0.0, jitter=0.0, failure_rate=0.0,
+                 retry_after=1, rate_limit=None, nodes=2, compile_time=0.5,
+                 backtest_time=2.0, object_time=0.5, run_algorithm=None,
+                 build=None, rejections=None, seed=0):
+        """
+        Args:
+            user_id, api_token: Credentials the requests must be signed with
+            organization_id: Organization of the projects
+            lean_version: Latest LEAN version Id
+            latency: Seconds added to every response
+            jitter: Latency is drawn from latency +/- jitter
+            failure_rate: Fraction of the requests answered with a 503 or
+                a 429
+            retry_after: Retry-After header of the failed responses
+            rate_limit: Optional (calls, seconds) limit; requests over it
+                are answered with a 429
+            nodes: Number of backtests that run at the same time
+            compile_time: Seconds a compile takes
+            backtest_time: Seconds a backtest runs, or a function of the
+                project files that returns them
+            object_time: Seconds until an object/get download is ready
+            run_algorithm: Function of the project files and backtest
+                parameters that returns the outcome of a backtest, see
+                default_algorithm
+            build: Function of the project files that returns their build
+                errors, see default_build
+            rejections: Dictionary mapping an endpoint to the number of
+                its first requests answered with `{"success": false}`
+            seed: Seed of the latency and failure draws
+        """
+        self.user_id = str(user_id)
+        self.api_token = api_token
+        self.organization_id = organization_id
+        self.lean_version = lean_version
+        self.latency, self.jitter = latency, jitter
+        self.failure_rate, self.retry_after = failure_rate, retry_after
+        self.rate_limit = rate_limit
+        self.nodes = nodes
+        self.compile_time = compile_time
+        self.backtest_time = backtest_time
+        self.object_time = object_time
+        self.run_algorithm = run_algorithm or default_algorithm
+        self.build = build or default_build
+        self.rejections = Counter(rejections or {})
+        self.seed = seed
+
+        # Number of requests and of failed (429/503) responses per endpoint.
+        self.requests = Counter()
+        self.failures = Counter()
+        # Most backtests running at the same time.
+        self.peak_running = 0
+        self.projects = {}
+        self.compiles = {}
+        self.backtests = {}
+        self.object_store = {}
+        self._object_jobs = {}
+        self._node_free_at = [0.0] * nodes
+        self._recent = deque()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self, port=0):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Send the headers and the body without waiting for ACKs.
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length) if length else b''
+                try:
+                    payload = json.loads(body or b'{}')
+                except ValueError:
+                    payload = {}
+                status, response, headers = api.handle(
+                    self.path, self.headers, payload
+                )
+                self._send(status, json.dumps(response).encode('utf-8'),
+                           'application/json', headers)
+
+            def do_GET(self):
+                data = api.download(self.path)
+                if data is None:
+                    self._send(404, b'', 'text/plain')
+                else:
+                    self._send(200, data, 'application/zip')
+
+            def _send(self, status, data, content_type, headers=None):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def handle(self, path, headers, payload):
+        """Return the (HTTP status, JSON response, headers) of a request."""
+        endpoint = path.strip('/')
+        with self._lock:
+            self.requests[endpoint] += 1
+            count = self.requests[endpoint]
+            limited = self._is_rate_limited()
+        delay = self.latency
+        if self.jitter:
+            delay += (2 * self._draw(f'{endpoint}:{count}:latency') - 1) * self.jitter
+        if delay > 0:
+            time.sleep(delay)
+
+        if limited or self._draw(f'{endpoint}:{count}') < self.failure_rate:
+            status = 429 if limited or self._draw(f'{endpoint}:{count}:status') < 0.5 else 503
+            with self._lock:
+                self.failures[endpoint] += 1
+            return status, {'success': False, 'errors': ['Too many requests.']}, {
+                'Retry-After': str(self.retry_after)
+            }
+        if not self._is_authenticated(headers):
+            return 401, {'success': False, 'errors': ['Hash doesn\'t match.']}, {}
+        handler = getattr(self, endpoint.replace('/', '_'), None)
+        if handler is None:
+            return 404, {'success': False, 'errors': [f'Unknown endpoint {endpoint}']}, {}
+        with self._lock:
+            if self.rejections[endpoint] > 0:
+                self.rejections[endpoint] -= 1
+                return 200, _error('Please try again.'), {}
+            self._advance(time.monotonic())
+            try:
+                return 200, handler(payload), {}
+            except KeyError as e:
+                return 200, _error(f'Missing or unknown {e.args[0]}'), {}
+
+    def download(self, path):
+        """Return the zip of an object/get job, or None."""
+        job_id = path.strip('/').rpartition('/')[2].removesuffix('.zip')
+        with self._lock:
+            job = self._object_jobs.get(job_id)
+            if job is None or time.monotonic() < job['ready']:
+                return None
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w') as z:
+                for key in job['keys']:
+                    if key in self.object_store:
+                        z.writestr(key, self.object_store[key])
+            return buffer.getvalue()
+
+    def _draw(self, key):
+        digest = hashlib.sha256(f'{self.seed}:{key}'.encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') / 2 ** 64
+
+    def _is_rate_limited(self):
+        if not self.rate_limit:
+            return False
+        calls, period = self.rate_limit
+        now = time.monotonic()
+        while self._recent and self._recent[0] <= now - period:
+            self._recent.popleft()
+        if len(self._recent) >= calls:
+            return True
+        self._recent.append(now)
+        return False
+
+    def _is_authenticated(self, headers):
+        timestamp = headers.get('Timestamp', '')
+        hashed_token = hashlib.sha256(
+            f'{self.api_token}:{timestamp}'.encode('utf-8')
+        ).hexdigest()
+        expected = base64.b64encode(
+            f'{self.user_id}:{hashed_token}'.encode('utf-8')
+        ).decode('ascii')
+        return (
+            headers.get('Authorization') == f'Basic {expected}' and
+            timestamp.isdigit() and abs(time.time() - int(timestamp)) < 7200
+        )
+
+    def _new_id(self):
+        return str(next(self._ids))
+
+    def _advance(self, now):
+        """Bring the compiles and backtests up to date."""
+        for compile_job in self.compiles.values():
+            if compile_job['state'] == 'InQueue' and now >= compile_job['done_at']:
+                compile_job['state'] = 'BuildError' if compile_job['errors'] else 'BuildSuccess'
+        running = 0
+        for backtest in self.backtests.values():
+            if backtest['completed']:
+                continue
+            if now >= backtest['finish_at']:
+                outcome = backtest['outcome']
+                backtest.update({
+                    'completed': True, 'progress': 1,
+                    'status': 'Runtime Error' if outcome.get('error') else 'Completed.',
+                    'error': outcome.get('error'),
+                    'stacktrace': outcome.get('stacktrace'),
+                    'statistics': outcome.get('statistics', {}),
+                })
+                self.object_store.update(outcome.get('objects', {}))
+            elif now >= backtest['start_at']:
+                running += 1
+                backtest['status'] = 'Running.'
+                backtest['progress'] = round(
+                    (now - backtest['start_at'])
+                    / (backtest['finish_at'] - backtest['start_at']), 2
+                )
+        self.peak_running = max(self.peak_running, running)
+
+    def _project(self, payload):
+        return self.projects[int(payload['projectId'])]
+
+    # Endpoints
+
+    def authenticate(self, payload):
+        return {'success': True}
+
+    def lean_versions_read(self, payload):
+        return {
+            'success': True,
+            'versions': [{'id': self.lean_version}, {'id': self.lean_version - 1}]
+        }
+
+    def projects_create(self, payload):
+        project_id = int(self._new_id())
+        language = payload.get('language', 'Py')
+        main = 'main.py' if language == 'Py' else 'Main.cs'
+        self.projects[project_id] = {
+            'projectId': project_id,
+            'organizationId': self.organization_id,
+            'name': payload['name'],
+            'description': payload.get('description', ''),
+            'language': language,
+            'files': {main: ''},
+        }
+        return {'success': True, 'projects': [_project_info(self.projects[project_id])]}
+
+    def projects_read(self, payload):
+        if payload.get('projectId'):
+            projects = [self._project(payload)]
+        else:
+            projects = self.projects.values()
+        return {'success': True, 'projects': [_project_info(p) for p in projects]}
+
+    def projects_update(self, payload):
+        project = self._project(payload)
+        project['name'] = payload.get('name', project['name'])
+        project['description'] = payload.get('description', project['description'])
+        return {'success': True}
+
+    def projects_delete(self, payload):
+        del self.projects[int(payload['projectId'])]
+        return {'success': True}
+
+    def files_create(self, payload):
+        project = self._project(payload)
+        if payload['name'] in project['files']:
+            return _error(f'File {payload["name"]} already exists')
+        project['files'][payload['name']] = payload.get('content', '')
+        return {'success': True}
+
+    def files_read(self, payload):
+        files = self._project(payload)['files']
+        names = [payload['name']] if payload.get('name') else list(files)
+        return {
+            'success': True,
+            'files': [{'name': n, 'content': files[n]} for n in names if n in files]
+        }
+
+    def files_update(self, payload):
+        files = self._project(payload)['files']
+        if payload['name'] not in files:
+            return _error(f'File {payload["name"]} not found')
+        files[payload['name']] = payload['content']
+        return {'success': True}
+
+    def files_delete(self, payload):
+        del self._project(payload)['files'][payload['name']]
+        return {'success': True}
+
+    def compile_create(self, payload):
+        project = self._project(payload)
+        compile_id = f'{self._new_id()}-compile'
+        # Compiles build a snapshot of the files.
+        files = dict(project['files'])
+        self.compiles[compile_id] = {
+            'projectId': project['projectId'],
+            'state': 'InQueue',
+            'files': files,
+            'errors': self.build(files),
+            'done_at': time.monotonic() + self.compile_time,
+        }
+        return {'success': True, 'compileId': compile_id, 'state': 'InQueue'}
+
+    def compile_read(self, payload):
+        compile_job = self.compiles[payload['compileId']]
+        return {
+            'success': True,
+            'compileId': payload['compileId'],
+            'state': compile_job['state'],
+            'logs': compile_job['errors'] if compile_job['state'] == 'BuildError' else [],
+        }
+
+    def backtests_create(self, payload):
+        project = self._project(payload)
+        compile_job = self.compiles.get(payload['compileId'])
+        if not compile_job or compile_job['projectId'] != project['projectId']:
+            return _error('Compile not found')
+        if compile_job['state'] != 'BuildSuccess':
+            return _error(f'Compile is not ready: {compile_job["state"]}')
+        files = compile_job['files']
+        duration = (
+            self.backtest_time(files) if callable(self.backtest_time)
+            else self.backtest_time
+        )
+        # Queue on the node that frees up first.
+        now = time.monotonic()
+        node = min(range(self.nodes), key=self._node_free_at.__getitem__)
+        start_at = max(now, self._node_free_at[node])
+        self._node_free_at[node] = start_at + duration
+        backtest_id = hashlib.md5(self._new_id().encode('utf-8')).hexdigest()
+        self.backtests[backtest_id] = backtest = {
+            'backtestId': backtest_id,
+            'projectId': project['projectId'],
+            'name': payload.get('backtestName', backtest_id),
+            'status': 'In Queue...',
+            'completed': False,
+            'progress': 0,
+            'error': None,
+            'stacktrace': None,
+            'statistics': {},
+            'start_at': start_at,
+            'finish_at': start_at + duration,
+            'outcome': self.run_algorithm(files, payload.get('parameters') or {}),
+        }
+        return {'success': True, 'backtest': _backtest_info(backtest)}
+
+    def backtests_read(self, payload):
+        backtest = self.backtests[payload['backtestId']]
+        return {'success': True, 'backtest': _backtest_info(backtest)}
+
+    def backtests_update(self, payload):
+        backtest = self.backtests[payload['backtestId']]
+        backtest['name'] = payload.get('name', backtest['name'])
+        return {'success': True}
+
+    def backtests_delete(self, payload):
+        del self.backtests[payload['backtestId']]
+        return {'success': True}
+
+    def backtests_list(self, payload):
+        project_id = int(payload['projectId'])
+        return {
+            'success': True,
+            'backtests': [
+                _backtest_info(b) for b in self.backtests.values()
+                if b['projectId'] == project_id
+            ]
+        }
+
+    def backtests_read_log(self, payload):
+        backtest = self.backtests[payload['backtestId']]
+        if not backtest['completed']:
+            return {'success': True, 'logs': [], 'length': 0}
+        query = payload.get('query') or ''
+        logs = [line for line in backtest['outcome'].get('logs', []) if query in line]
+        start, end = payload.get('start', 0), payload.get('end', len(logs))
+        return {'success': True, 'logs': logs[start:end], 'length': len(logs)}
+
+    def backtests_orders_read(self, payload):
+        if payload['backtestId'] not in self.backtests:
+            return _error('Backtest not found')
+        return {'success': True, 'orders': [], 'length': 0}
+
+    def object_get(self, payload):
+        job_id = payload.get('jobId')
+        if not job_id:
+            job_id = self._new_id()
+            self._object_jobs[job_id] = {
+                'keys': list(payload['keys']),
+                'ready': time.monotonic() + self.object_time,
+            }
+        job = self._object_jobs[job_id]
+        ready = time.monotonic() >= job['ready']
+        return {
+            'success': True,
+            'jobId': job_id,
+            'url': f'{self.url}/objects/{job_id}.zip' if ready else None,
+        }
+
+
+def _error(message):
+    return {'success': False, 'errors': [message]}
+
+
+def _project_info(project):
+    return {k: v for k, v in project.items() if k != 'files'}
+
+
+def _backtest_info(backtest):
+    return {
+        k: v for k, v in backtest.items()
+        if k not in ('start_at', 'finish_at', 'outcome')
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Serve a fake QuantConnect API on 127.0.0.1.'
+    )
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--user-id', default='1')
+    parser.add_argument('--api-token', default='token')
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, nargs=2, metavar=('CALLS', 'SECONDS'))
+    parser.add_argument('--nodes', type=int, default=2)
+    parser.add_argument('--compile-time', type=float, default=0.5)
+    parser.add_argument('--backtest-time', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    api = FakeQuantConnectAPI(
+        args.user_id, args.api_token, latency=args.latency, jitter=args.jitter,
+        failure_rate=args.failure_rate, rate_limit=args.rate_limit,
+        nodes=args.nodes, compile_time=args.compile_time,
+        backtest_time=args.backtest_time, seed=args.seed
+    ).start(args.port)
+    print(f'Serving the fake QuantConnect API at {api.url} '
+          f'(user Id {api.user_id}, API token {api.api_token})')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        api.stop()
+        print(dict(api.requests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+"""Polling of long-running QuantConnect API jobs (compiles, backtests, ...).
+
+`poll` calls a fetch function until a predicate says the job is done,
+waiting between calls with exponential backoff and jitter, and gives up
+at a deadline. Each endpoint has its own PollPolicy: compiles finish in
+seconds, backtests in minutes. When the response says how far along the
+job is (e.g. a backtest's `progress`), a `hint` function can estimate the
+remaining time, so the next poll lands close to completion instead of
+following the backoff curve; that is as close to a push notification as
+a polling API gets.
+
+Every poll is recorded in METRICS, which reports the number of calls and
+the time to completion per endpoint.
+"""
+import asyncio
+import inspect
+import random
+import threading
+import time
+
+
+class PollTimeout(Exception):
+    """The job wasn't done before the deadline."""
+
+    def __init__(self, endpoint, timeout, last_result):
+        super().__init__(f"{endpoint} not done after {timeout:.0f}s")
+        self.last_result = last_result
+
+
+class PollPolicy:
+    """How to pace the polls of one endpoint."""
+
+    def __init__(self, initial=1.0, maximum=30.0, multiplier=1.5,
+                 jitter=0.2, timeout=600.0, first_delay=None):
+        """
+        Args:
+            initial: Seconds to wait before the second poll
+            maximum: Longest wait between polls
+            multiplier: Growth of the wait after each poll
+            jitter: Fraction of each wait that is randomized (+/-), so
+                parallel pollers don't synchronize
+            timeout: Seconds after which the poll fails
+            first_delay: Seconds to wait before the first poll; defaults
+                to polling immediately
+        """
+        self.initial = initial
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.timeout = timeout
+        self.first_delay = first_delay or 0
+
+    def delays(self):
+        """Yield the wait before each poll after the first."""
+        delay = self.initial
+        while True:
+            yield delay
+            delay = min(self.maximum, delay * self.multiplier)
+
+    def randomize(self, delay):
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+# Tuned to the typical duration of each job.
+POLICIES = {
+    'compile/read': PollPolicy(initial=1, maximum=5, timeout=600),
+    'backtests/read': PollPolicy(
+        initial=2, maximum=30, timeout=1800, first_delay=2
+    ),
+    'backtests/read/log': PollPolicy(initial=2, maximum=10, timeout=60),
+    'object/get': PollPolicy(initial=2, maximum=15, timeout=600),
+    # Retries of a file update the API rejected with `success: false`.
+    'files/update': PollPolicy(initial=3, maximum=3, jitter=0, timeout=15),
+}
+DEFAULT_POLICY = PollPolicy()
+
+
+def get_policy(endpoint, **overrides):
+    """Return the endpoint's policy, with some attributes replaced."""
+    base = POLICIES.get(endpoint, DEFAULT_POLICY)
+    values = {
+        'initial': base.initial, 'maximum': base.maximum,
+        'multiplier': base.multiplier, 'jitter': base.jitter,
+        'timeout': base.timeout, 'first_delay': base.first_delay,
+    }
+    values.update(overrides)
+    return PollPolicy(**values)
+
+
+def backtest_hint(backtest, elapsed):
+    """
+    Estimate the seconds until a backtest completes from its `progress`
+    after `elapsed` seconds of polling.
+    """
+    if not isinstance(backtest, dict):
+        return None
+    progress = backtest.get('progress') or 0
+    if not 0 < progress < 1:
+        return None
+    return elapsed * (1 - progress) / progress
+
+
+class PollMetrics:
+    """Thread-safe counters of polls per endpoint."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def record(self, endpoint, polls, elapsed, outcome):
+        with self._lock:
+            stats = self._endpoints.setdefault(endpoint, {
+                'jobs': 0, 'polls': 0, 'timeouts': 0, 'durations': []
+            })
+            stats['jobs'] += 1
+            stats['polls'] += polls
+            stats['durations'].append(elapsed)
+            if outcome == 'timeout':
+                stats['timeouts'] += 1
+
+    def summary(self):
+        """Return {endpoint: {jobs, polls, timeouts, mean, p50, p95, max}}."""
+        with self._lock:
+            summary = {}
+            for endpoint, stats in self._endpoints.items():
+                durations = sorted(stats['durations'])
+                summary[endpoint] = {
+                    'jobs': stats['jobs'],
+                    'polls': stats['polls'],
+                    'timeouts': stats['timeouts'],
+                    'mean': sum(durations) / len(durations),
+                    'p50': durations[len(durations) // 2],
+                    'p95': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+                    'max': durations[-1],
+                }
+            return summary
+
+    def report(self):
+        """Format the summary as a table."""
+        lines = [f"{'endpoint':<20} {'jobs':>6} {'polls':>7} {'timeouts':>8} "
+                 f"{'mean':>8} {'p50':>8} {'p95':>8} {'max':>8}"]
+        for endpoint, s in sorted(self.summary().items()):
+            lines.append(
+                f"{endpoint:<20} {s['jobs']:>6} {s['polls']:>7} {s['timeouts']:>8} "
+                f"{s['mean']:>7.1f}s {s['p50']:>7.1f}s {s['p95']:>7.1f}s {s['max']:>7.1f}s"
+            )
+        return '\n'.join(lines)
+
+
+METRICS = PollMetrics()
+
+
+class _Poll:
+    """State shared by the sync and async pollers."""
+
+    def __init__(self, endpoint, policy, hint):
+        self.endpoint = endpoint
+        self.policy = policy or get_policy(endpoint)
+        self.hint = hint
+        self.start = time.monotonic()
+        self.deadline = self.start + self.policy.timeout
+        self.delays = self.policy.delays()
+        self.polls = 0
+
+    def next_delay(self, result):
+        """Seconds to wait before the next poll, or None at the deadline."""
+        now = time.monotonic()
+        if now >= self.deadline:
+            return None
+        delay = next(self.delays)
+        estimate = self.hint(result, now - self.start) if self.hint else None
+        if estimate is not None:
+            # Aim at the estimated completion, within the policy bounds.
+            delay = max(self.policy.initial, min(self.policy.maximum, estimate))
+        return min(self.policy.randomize(delay), self.deadline - now)
+
+    def finish(self, outcome):
+        METRICS.record(
+            self.endpoint, self.polls, time.monotonic() - self.start, outcome
+        )
+
+
+def poll(fetch, done, endpoint, policy=None, hint=None):
+    """
+    Call `fetch()` until `done(result)` is true.
+
+    Args:
+        fetch: Function that reads the job state; it may return None or
+            raise requests-style errors on transient failures, which are
+            retried
+        done: Predicate on the fetched result; true for every terminal
+            state (success or failure)
+        endpoint: API endpoint, used to pick the policy and in METRICS
+        policy: PollPolicy to use instead of the endpoint's
+        hint: Optional function of the last result (or None) and the
+            seconds since the first poll that estimates the seconds until
+            the job is done, or returns None
+
+    Returns:
+        The first result for which `done` is true.
+
+    Raises:
+        PollTimeout: the job wasn't done before the policy's timeout.
+    """
+    state = _Poll(endpoint, policy, hint)
+    time.sleep(state.policy.first_delay)
+    while True:
+        state.polls += 1
+        try:
+            result = fetch()
+        except (OSError, ValueError):
+            # Connection errors and invalid JSON: poll again.
+            result = None
+        if result is not None and done(result):
+            state.finish('done')
+            return result
+        delay = state.next_delay(result)
+        if delay is None:
+            state.finish('timeout')
+            raise PollTimeout(endpoint, state.policy.timeout, result)
+        time.sleep(delay)
+
+
+async def poll_async(fetch, done, endpoint, policy=None, hint=None):
+    """
+    Asynchronous `poll`. `fetch` may be a coroutine function or a blocking
+    function, which then runs in the default executor.
+    """
+    state = _Poll(endpoint, policy, hint)
+    await asyncio.sleep(state.policy.first_delay)
+    while True:
+        state.polls += 1
+        try:
+            if inspect.iscoroutinefunction(fetch):
+                result = await fetch()
+            else:
+                result = await asyncio.to_thread(fetch)
+        except (OSError, ValueError):
+            result = None
+        if result is not None and done(result):
+            state.finish('done')
+            return result
+        delay = state.next_delay(result)
+        if delay is None:
+            state.finish('timeout')
+            raise PollTimeout(endpoint, state.policy.timeout, result)
+        await asyncio.sleep(delay)
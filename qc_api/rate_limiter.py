@@ -0,0 +1,35 @@
+"""Process-wide rate limiting for API calls."""
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket.
+
+    Holds up to `calls` tokens and refills them evenly over `period`
+    seconds, so bursts of `calls` requests are allowed but the long-run
+    rate never exceeds calls/period.
+    """
+
+    def __init__(self, calls, period):
+        self._capacity = calls
+        self._rate = calls / period
+        self._tokens = float(calls)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(
+                    self._capacity,
+                    self._tokens + (now - self._updated) * self._rate
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self._rate
+            time.sleep(wait)
@@ -35,19 +35,21 @@ Flags:
 """
 from __future__ import annotations
 
-import json
 import re
 from argparse import ArgumentParser
 from dataclasses import dataclass
 from os import environ
 from pathlib import Path
 from shutil import copy2, rmtree
-from sys import exit, stderr
-from urllib.request import urlopen
+from sys import exit, path as sys_path, stderr
 from zipfile import ZIP_DEFLATED, ZipFile
 
 import yaml
 
+# The inspector cache shared by the generators is in code-generators.
+sys_path.append(str(Path(__file__).resolve().parents[1] / "code-generators"))
+from _code_generation_helpers import get_type
+
 
 REQUIRED_KEYS = {"name", "description"}
 DESCRIPTION_MIN = 30
@@ -166,6 +168,9 @@ def strip_code_blocks(content: str, lang: str) -> str:
 def fetch_fundamental_lookup(language: str) -> dict[str, list[str]]:
     """Walk Fundamental and its non-leaf sub-types via the QC inspector.
 
+    Types are read through the generators' on-disk inspector cache, so
+    INSPECTOR_OFFLINE=1 works here too.
+
     BFS from `Fundamental`. For each property whose type lives in
     `QuantConnect.Data.Fundamental.*` and whose base is *not* MultiPeriodField,
     queue it for expansion. MultiPeriodField wrappers are listed by name in the
@@ -179,10 +184,6 @@ def fetch_fundamental_lookup(language: str) -> dict[str, list[str]]:
     MultiPeriodField wrappers are suffixed with `*` so the skill can flag which
     properties need a period accessor.
     """
-    inspector_url = (
-        "https://www.quantconnect.com/services/inspector"
-        "?language={lang}&type=T:QuantConnect.Data.Fundamental.{type}"
-    )
     fund_prefix = "QuantConnect.Data.Fundamental."
     # MultiPeriodField subclasses (and closed generics) are leaf wrappers —
     # don't recurse into them; their only members are period accessors.
@@ -199,9 +200,7 @@ def fetch_fundamental_lookup(language: str) -> dict[str, list[str]]:
         if type_name in visited:
             continue
         visited.add(type_name)
-        url = inspector_url.format(lang=language, type=type_name)
-        with urlopen(url) as r:
-            data = json.load(r)
+        data = get_type(f"{fund_prefix}{type_name}", language)
         names: list[str] = []
         for p in data["properties"]:
             prop_name = p["property-name"]
@@ -220,9 +219,7 @@ def fetch_fundamental_lookup(language: str) -> dict[str, list[str]]:
     # `fields`, not `properties`. They're not reachable via tree-walking and
     # appear at the bottom of the rendered lookup.
     for type_name in FUND_ENUM_HELPER_TYPES:
-        url = inspector_url.format(lang=language, type=type_name)
-        with urlopen(url) as r:
-            data = json.load(r)
+        data = get_type(f"{fund_prefix}{type_name}", language)
         out[type_name] = [f["field-name"] for f in data.get("fields", [])]
     return out
 
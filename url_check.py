@@ -15,7 +15,8 @@
 #
 # Scans all .html/.php doc files and documentation-map.json for <a href="..."> links,
 # then validates them:
-#   - HTTP checks: GET each external URL, flag 4xx responses and soft-404 pages.
+#   - HTTP checks: HEAD (or GET when the body matters) each external URL, flag 4xx
+#     responses and soft-404 pages.
 #   - Section anchors: verify that #fragment links map to real files on disk.
 #   - Resource includes: verify <? include(DOCS_RESOURCES."...") targets exist.
 #   - GitHub issues: confirm referenced Lean issues are still open.
@@ -32,16 +33,27 @@
 #   pip install aiohttp
 #   python url_check.py                  # local run, no GitHub issue management
 #   python url_check.py --create-issue   # CI run, creates/updates/closes GitHub issues
+#   python url_check.py --full           # ignore the incremental state and re-check everything
+#
+# Incremental mode: STATE_FILE keeps a content hash plus the extracted hrefs and
+# includes of every doc file, and the HTTP outcome of every URL with the time it
+# was checked. A run only re-parses files whose hash changed and only requests
+# URLs that are new or older than --freshness hours. Local checks (anchors,
+# resources, deprecated docs) always run against the current tree.
 
 import argparse
 import asyncio
+import hashlib
 import json
 import os
 import re
 import subprocess
 import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
+from email.utils import parsedate_to_datetime
 from pathlib import Path
+from urllib.parse import urlsplit
 
 import aiohttp
 
@@ -63,6 +75,15 @@ EDGE_CASE_URLS = {
 }
 
 CONCURRENCY = 50          # simultaneous HTTP requests
+HOST_INITIAL_CONCURRENCY = 4   # per-host limit at start, grown/shrunk with AIMD
+HOST_MAX_CONCURRENCY = 20      # per-host ceiling (also the connector's limit_per_host)
+MAX_RETRIES = 3           # retries after a 429/503 response
+MAX_RETRY_AFTER = 120     # seconds; cap on a server's Retry-After
+STREAM_CHUNK = 16 * 1024  # bytes per read when scanning a streamed body
+STREAM_OVERLAP = 4096     # chars kept between chunks so markers can span them
+STATE_FILE = BASE_PATH / ".url_check_state.json"
+FRESHNESS_HOURS = 24 * 7  # re-check URLs whose last result is older than this
+PARALLEL_EXTRACTION_THRESHOLD = 500   # changed files needed before extraction uses a process pool
 USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36"
 
 # -- Error categories ---------------------------------------------------------
@@ -140,37 +161,72 @@ def _apply_replacements(text: str) -> str:
     return text
 
 
+_LOWER_REPLACEMENTS = list(dict.fromkeys((old.lower(), new.lower()) for old, new in SECTION_REPLACEMENTS))
+
+
 # -- Walk the tree once --------------------------------------------------------
 
-def _collect_files() -> tuple[list[str], dict[str, list[str]]]:
-    """Walk the repo once. Returns (doc_files, file_index).
+def _section_keys(filepath: str) -> list[str]:
+    """Normalized section-anchor keys under which a file is indexed.
+    A key is the docs path of the file's numbered parts, with numbers stripped,
+    lowercased, "/"-separated, and the section last, e.g.
+    "writing algorithms/key concepts/getting started". SECTION_REPLACEMENTS
+    are undone here so a URL only needs "-" mapped to " " to find its key.
+    """
+    rel = os.path.relpath(filepath, BASE_PATH)
+    parts = rel.replace("\\", "/").split("/")
+    numbered = [p for p in parts if p and p[0].isdigit() and " " in p]
+    if not numbered:
+        return []
+    section = Path(numbered[-1]).stem
+    # A section is named after the file itself (unnumbered files must share the stem)
+    if section.lower() != Path(parts[-1]).stem.lower():
+        return []
+    full = "/".join(
+        [p[p.index(" ") + 1:].strip() for p in numbered[:-1]] + [section]
+    ).lower()
+    keys = [full]
+    unreplaced = full
+    for old, new in _LOWER_REPLACEMENTS:
+        unreplaced = unreplaced.replace(new, old)
+    if unreplaced != full:
+        keys.append(unreplaced)
+    return keys
+
+
+def _collect_files() -> tuple[list[str], dict[str, str]]:
+    """Walk the repo once. Returns (doc_files, section_index).
     - doc_files: filtered .html/.php paths for URL/resource extraction
-    - file_index: all files indexed by lowercased stem for section-anchor lookup
+    - section_index: normalized section-anchor key → file path (see _section_keys)
     """
     doc_files: list[str] = []
-    file_index: dict[str, list[str]] = {}
+    section_index: dict[str, str] = {}
 
     for dirpath, _, filenames in os.walk(BASE_PATH):
         for fn in filenames:
             filepath = os.path.join(dirpath, fn)
             if not _should_include(filepath):
                 continue
-            stem = Path(fn).stem.lower()
-            file_index.setdefault(stem, []).append(filepath)
+            for key in _section_keys(filepath):
+                section_index.setdefault(key, filepath)
             if (fn.endswith(".html") or fn.endswith(".php")) and filepath not in IGNORE_FILES:
                 doc_files.append(filepath)
 
-    return sorted(doc_files), file_index
+    return sorted(doc_files), section_index
+
+
+def _save_section_index(path: Path, section_index: dict[str, str]):
+    """Serialize the section index with repo-relative paths for other tools."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({key: os.path.relpath(filepath, BASE_PATH).replace("\\", "/")
+                   for key, filepath in sorted(section_index.items())}, f, indent=1)
 
 
 # -- URL extraction -----------------------------------------------------------
 
-def _get_all_urls(doc_files: list[str]) -> dict[str, list[str]]:
-    """Extract all href URLs from doc files + documentation-map.json."""
+def _get_doc_map_urls() -> dict[str, list[str]]:
+    """Extract all URLs from documentation-map.json."""
     url_files: dict[str, list[str]] = {}
-    modified_files: dict[str, list[str]] = {}   # filepath → new lines (only if changed)
-
-    # 1) documentation-map.json
     map_path = BASE_PATH / "documentation-map.json"
     with open(map_path, encoding="utf-8") as f:
         doc_map = json.load(f)
@@ -178,67 +234,81 @@ def _get_all_urls(doc_files: list[str]) -> dict[str, list[str]]:
     for value in doc_map.values():
         url, _, _, _ = _url_conversion(value, map_label, "")
         url_files.setdefault(url, []).append(map_label)
+    return url_files
 
-    # 2) All doc files
-    for filepath in doc_files:
-        try:
-            with open(filepath, encoding="utf-8", errors="replace") as f:
-                lines = f.readlines()
-        except Exception:
-            continue
 
-        has_relative_link = False
-        new_lines = list(lines)
+# HTML comments are matched (and skipped) as a whole so links inside them are
+# ignored, even when the comment spans lines. Both patterns start with a literal
+# so the regex engine can skip ahead between matches.
+_LINK_PATTERN = re.compile(
+    r"<(?:!--.*?-->|a\b[^>]*?\bhref\s*=\s*(?P<q>[\"'])(?P<href>.*?)(?P=q))",
+    re.DOTALL,
+)
+_INCLUDE_PATTERN = re.compile(r"include\(\s*DOCS_RESOURCES\s*\.\s*[\"']([^\"']*)[\"']")
 
-        for i, line in enumerate(lines):
-            href_idx = line.find("href")
-            if href_idx < 0:
-                continue
-            a_idx = line[:href_idx].find("<a")
-            if a_idx < 0:
-                continue
-            if "<?=" in line[href_idx:]:
-                continue
-            if "<!--" in line[:a_idx]:
-                continue
 
-            # Extract href values
-            reconstructed = line[:a_idx + 3] + line[href_idx:]
-            segments = reconstructed.replace("'", '"').split('a href="')[1:]
-            for seg in segments:
-                raw_url = seg.split('"')[0]
+def _extract_file(filepath: str, rewrite: bool = True) -> tuple[list[str], list[str], str]:
+    """Extract href URLs and DOCS_RESOURCES includes from one doc file, reading it once.
+    Relative #fragment links are rewritten to absolute links in the file itself.
+    Returns (urls, resources, sha256 of the final file content).
+    """
+    try:
+        with open(filepath, "rb") as f:
+            data = f.read()
+    except OSError:
+        return [], [], ""
+    content = data.decode("utf-8", errors="replace")
 
-                if "{" in raw_url or "}" in raw_url or "$" in raw_url:
-                    continue
+    urls: list[str] = []
+    resources: list[str] = []
+    fragments: dict[str, str] = {}
 
-                if not raw_url or raw_url.isspace():
-                    url_files.setdefault("", []).append(filepath)
-                    continue
+    for sub_dir in _INCLUDE_PATTERN.findall(content):
+        sub_dir = sub_dir.lstrip("/")
+        if sub_dir and not sub_dir.isspace() and "{" not in sub_dir and "}" not in sub_dir:
+            resources.append(sub_dir)
 
-                url, lean_io_url, is_relative, converted_line = _url_conversion(
-                    raw_url, filepath, new_lines[i]
-                )
-                if is_relative:
-                    new_lines[i] = converted_line
-                    has_relative_link = True
+    for m in _LINK_PATTERN.finditer(content):
+        raw_url = m.group("href")
+        if raw_url is None:
+            continue  # HTML comment
+
+        if "<?" in raw_url or "{" in raw_url or "}" in raw_url or "$" in raw_url:
+            continue
 
-                if "sources" in url:
-                    continue
+        if not raw_url or raw_url.isspace():
+            urls.append("")
+            continue
 
-                url_files.setdefault(url, []).append(filepath)
+        url, lean_io_url, is_relative, _ = _url_conversion(raw_url, filepath, "")
+        if is_relative:
+            fragments[m.group(0)] = m.group(0).replace(raw_url, url.replace(ROOT, "/"))
 
-                if lean_io_url:
-                    url_files.setdefault(lean_io_url, []).append(filepath)
+        if "sources" in url:
+            continue
 
-        if has_relative_link:
-            modified_files[filepath] = new_lines
+        urls.append(url)
+
+        if lean_io_url:
+            urls.append(lean_io_url)
 
     # Write back files with converted relative links
-    for filepath, new_lines in modified_files.items():
-        with open(filepath, "w", encoding="utf-8") as f:
-            f.writelines(new_lines)
+    if fragments and rewrite:
+        for old, new in fragments.items():
+            content = content.replace(old, new)
+        data = content.encode("utf-8")
+        with open(filepath, "wb") as f:
+            f.write(data)
 
-    return url_files
+    return urls, resources, hashlib.sha256(data).hexdigest()
+
+
+def _extract_files(filepaths: list[str], rewrite: bool = True) -> list[tuple[list[str], list[str], str]]:
+    """Run _extract_file over many files, in a process pool when there are enough of them."""
+    if len(filepaths) < PARALLEL_EXTRACTION_THRESHOLD:
+        return [_extract_file(filepath, rewrite) for filepath in filepaths]
+    with ProcessPoolExecutor() as executor:
+        return list(executor.map(_extract_file, filepaths, [rewrite] * len(filepaths), chunksize=64))
 
 
 def _url_conversion(url: str, filepath: str, line: str) -> tuple[str, str, bool, str]:
@@ -286,29 +356,84 @@ def _get_strategy_php_urls() -> dict[str, list[str]]:
     return {str(STRATEGY_PHP): urls} if urls else {}
 
 
-def _get_resource_redirects(doc_files: list[str]) -> dict[str, list[str]]:
-    """Find all <? include(DOCS_RESOURCES."...") references."""
+def _file_hash(filepath: str) -> str:
+    with open(filepath, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def _scan_doc_files(
+    doc_files: list[str],
+    file_state: dict[str, dict],
+) -> tuple[dict[str, list[str]], dict[str, list[str]], dict[str, dict]]:
+    """Extract hrefs and resource includes from the doc files.
+    Files whose content hash matches `file_state` reuse the stored extraction.
+    Returns (url_files, resource_files, new_file_state).
+    """
+    url_files: dict[str, list[str]] = {}
     resource_files: dict[str, list[str]] = {}
+    new_state: dict[str, dict] = {}
+    changed: list[str] = []
 
     for filepath in doc_files:
+        key = os.path.relpath(filepath, BASE_PATH).replace("\\", "/")
         try:
-            with open(filepath, encoding="utf-8", errors="replace") as f:
-                content = f.read()
-        except Exception:
+            digest = _file_hash(filepath)
+        except OSError:
             continue
+        entry = file_state.get(key)
+        if entry is None or entry["sha256"] != digest:
+            changed.append(filepath)
+        else:
+            new_state[key] = entry
 
-            parts = content.split('<? include(DOCS_RESOURCES."')
-            for part in parts[1:]:
-                sub_dir = part.split('"')[0]
-                if sub_dir.startswith("/"):
-                    sub_dir = sub_dir[1:]
-                if not sub_dir or sub_dir.isspace() or "{" in sub_dir or "}" in sub_dir:
-                    continue
-                # skip if line is commented out
-                line_start = part.rsplit("\n", 1)[-1] if "\n" in content.split('<? include(DOCS_RESOURCES."')[0] else ""
-                resource_files.setdefault(sub_dir, []).append(filepath)
+    for filepath, (urls, resources, digest) in zip(changed, _extract_files(changed)):
+        key = os.path.relpath(filepath, BASE_PATH).replace("\\", "/")
+        new_state[key] = {"sha256": digest, "urls": urls, "resources": resources}
+
+    for filepath in doc_files:
+        entry = new_state.get(os.path.relpath(filepath, BASE_PATH).replace("\\", "/"))
+        if entry is None:
+            continue
+        for url in entry["urls"]:
+            url_files.setdefault(url, []).append(filepath)
+        for sub_dir in entry["resources"]:
+            resource_files.setdefault(sub_dir, []).append(filepath)
 
-    return resource_files
+    print(f"Parsed {len(changed)} changed file(s), reused {len(doc_files) - len(changed)} from the state file.")
+    return url_files, resource_files, new_state
+
+
+def _get_url_files(
+    doc_files: list[str],
+    file_state: dict[str, dict],
+) -> tuple[dict[str, list[str]], dict[str, list[str]], dict[str, dict]]:
+    """Collect every URL to check: documentation-map.json, the doc files and the strategy map.
+    Returns (url_files, resource_files, new_file_state).
+    """
+    url_files = _get_doc_map_urls()
+    doc_urls, resource_files, new_state = _scan_doc_files(doc_files, file_state)
+    for url, files in doc_urls.items():
+        url_files.setdefault(url, []).extend(files)
+    url_files.update(_get_strategy_php_urls())
+    return url_files, resource_files, new_state
+
+
+def _load_state(path: Path) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        state = {}
+    state.setdefault("files", {})
+    state.setdefault("urls", {})
+    return state
+
+
+def _save_state(path: Path, state: dict):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
 
 
 # -- HTTP checking ------------------------------------------------------------
@@ -318,7 +443,7 @@ async def _check_200_response(
     url: str,
     files: list[str],
     is_github_issue: bool,
-    results: dict[str, list[str]],
+    errors: list[tuple[str, str]],
 ):
     """Handle additional checks when a URL returns 200 OK."""
     if is_github_issue:
@@ -326,41 +451,54 @@ async def _check_200_response(
         try:
             state = json.loads(body).get("state")
             if state != "open":
-                results["github_issue_closed"].append(
-                    _fmt(f"GitHub issue is not open (state: {state})", url, files))
+                errors.append(("github_issue_closed", f"GitHub issue is not open (state: {state})"))
         except json.JSONDecodeError:
             pass
 
     # Check for soft-404 (redirected to /404 page)
     if str(resp.url).rstrip("/").endswith("/404"):
-        results["soft_404"].append(_fmt("Soft 404 (page not found)", url, files))
+        errors.append(("soft_404", "Soft 404 (page not found)"))
 
     # lean.io resource-only links: check GitHub folder
-    if "lean.io" in url and "/docs/v2" in url and "api-reference" not in url:
-        if "#" not in url and all("Resources" in f.replace("\\", "/") for f in files):
-            body = await resp.text()
-            if not _check_github_folder_in_html(body):
-                results["invalid_docs_page"].append(
-                    _fmt("Not a valid docs page", url, files))
+    if _needs_docs_page_check(url, files):
+        if not await _stream_until(resp, _check_github_folder_in_html):
+            errors.append(("invalid_docs_page", "Not a valid docs page"))
+
+
+def _needs_docs_page_check(url: str, files: list[str]) -> bool:
+    """lean.io docs links referenced only from Resources must point to a page with content."""
+    return ("lean.io" in url and "/docs/v2" in url and "api-reference" not in url
+            and "#" not in url and all("Resources" in f.replace("\\", "/") for f in files))
+
+
+async def _stream_until(resp: aiohttp.ClientResponse, predicate) -> bool:
+    """Read the body chunk by chunk until `predicate` matches the text seen so far.
+    Only the last STREAM_OVERLAP chars are carried over, so the rest of the body
+    is never downloaded once the marker is found.
+    """
+    window = ""
+    async for chunk in resp.content.iter_chunked(STREAM_CHUNK):
+        window = window[-STREAM_OVERLAP:] + chunk.decode("utf-8", errors="replace")
+        if predicate(window):
+            return True
+    return False
 
 
 def _fmt(msg: str, url: str, files: list[str]) -> str:
     return f"{msg}:\n\t{url}\n\t[\n\t\t{chr(10).join(files)}\n\t]"
 
 
-async def _check_url(
-    session: aiohttp.ClientSession,
-    semaphore: asyncio.Semaphore,
+def _check_url_locally(
     url: str,
     files: list[str],
-    file_index: dict[str, list[str]],
+    section_index: dict[str, str],
     results: dict[str, list[str]],
 ):
-    """Check a single URL for errors."""
+    """Run the checks that need no HTTP request for a single URL."""
     if not url or not url.startswith("http"):
         return
 
-    # -- Deprecated docs check (no HTTP needed) --
+    # -- Deprecated docs check --
     if f"{ROOT}docs/" in url and "/docs/v1/" not in url and "/docs/v2/" not in url:
         results["deprecated_docs"].append(_fmt("Deprecated docs URL", url, files))
 
@@ -369,34 +507,144 @@ async def _check_url(
         if any(bad in url for bad in LEAN_IO_ERROR_URLS):
             results["leanio_nonexistence"].append(_fmt("Lean.io non-existence", url, files))
 
-    # -- Section anchor validation (local, no HTTP needed) --
-    if "/docs/v2" in url and "api-reference" not in url and url not in EDGE_CASE_URLS:
+    # -- Section anchor validation --
+    # (lean.io links referenced only from Resources are checked via HTTP instead, and
+    # class-reference anchors are generated API members, not doc sections)
+    if "/docs/v2" in url and "api-reference" not in url and "class-reference" not in url and url not in EDGE_CASE_URLS:
         if "#" in url:
-            _check_section_anchor(url, files, file_index, results)
-        elif "lean.io" in url and all("Resources" in f.replace("\\", "/") for f in files):
-            pass  # Will be checked via HTTP below
+            _check_section_anchor(url, files, section_index, results)
+
+
+class _HostLimiter:
+    """Adaptive concurrency limit for a single host (AIMD).
+    Every successful response grows the limit by 1/limit (about +1 per round of
+    requests); a 429/503 halves it and pauses the host for its Retry-After.
+    """
+
+    def __init__(self):
+        self.limit = float(HOST_INITIAL_CONCURRENCY)
+        self.active = 0
+        self.resume_at = 0.0
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            while True:
+                delay = self.resume_at - time.monotonic()
+                if delay > 0:
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), delay)
+                    except asyncio.TimeoutError:
+                        pass
+                elif self.active < int(self.limit):
+                    break
+                else:
+                    await self._cond.wait()
+            self.active += 1
+
+    async def release(self):
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    def increase(self):
+        self.limit = min(float(HOST_MAX_CONCURRENCY), self.limit + 1 / self.limit)
+
+    def back_off(self, delay: float):
+        # Responses already in flight when the host paused count as one signal
+        now = time.monotonic()
+        if now >= self.resume_at:
+            self.limit = max(1.0, self.limit / 2)
+        self.resume_at = max(self.resume_at, now + delay)
+
+
+_host_limiters: dict[str, _HostLimiter] = {}
+_head_rejecting_hosts: set[str] = set()   # hosts that answered HEAD with an error but GET fine
+
+def _get_host_limiter(url: str) -> _HostLimiter:
+    host = urlsplit(url).hostname or ""
+    if host not in _host_limiters:
+        _host_limiters[host] = _HostLimiter()
+    return _host_limiters[host]
+
+
+def _retry_after(resp: aiohttp.ClientResponse, attempt: int) -> float:
+    """Seconds to wait before retrying, from Retry-After or exponential backoff."""
+    value = resp.headers.get("Retry-After", "")
+    try:
+        delay = float(value)
+    except ValueError:
+        try:
+            delay = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            delay = 2 ** attempt
+    return min(max(delay, 0.0), MAX_RETRY_AFTER)
+
+
+async def _check_url(
+    session: aiohttp.ClientSession,
+    semaphore: asyncio.Semaphore,
+    url: str,
+    files: list[str],
+) -> list[tuple[str, str]]:
+    """Request a single URL. Returns the (category, message) errors found.
+    Requests are limited per host by a _HostLimiter and globally by `semaphore`.
+
+    Only the status and the final (redirected) URL matter for most links, so
+    they are probed with HEAD. GET is used when the body is inspected (GitHub
+    issue state, lean.io docs-page check), for hosts seen rejecting HEAD, and
+    to confirm any HEAD error before it is reported.
+    """
+    errors: list[tuple[str, str]] = []
+    if not url or not url.startswith("http"):
+        return errors
 
     # -- GitHub issue API check --
     is_github_issue = "api.github.com/repos/QuantConnect/Lean/issues" in url
 
-    # -- HTTP request --
-    async with semaphore:
+    host = urlsplit(url).hostname or ""
+    needs_body = is_github_issue or _needs_docs_page_check(url, files)
+    method = "GET" if needs_body or host in _head_rejecting_hosts else "HEAD"
+    head_failed = False
+
+    limiter = _get_host_limiter(url)
+    retries = 0
+    while True:
+        await limiter.acquire()
         try:
-            async with session.get(url, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=60)) as resp:
-                match resp.status:
-                    case 400:
-                        results["400"].append(_fmt("400 Bad Request", url, files))
-                    case 401:
-                        results["401"].append(_fmt("401 Unauthorized", url, files))
-                    case 403:
-                        results["403"].append(_fmt("403 Forbidden", url, files))
-                    case 404:
-                        results["404"].append(_fmt("404 Not found", url, files))
-                    case 200:
-                        await _check_200_response(resp, url, files, is_github_issue, results)
+            async with semaphore:
+                async with session.request(method, url, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=60)) as resp:
+                    if resp.status in (429, 503) and retries < MAX_RETRIES:
+                        retries += 1
+                        limiter.back_off(_retry_after(resp, retries))
+                        continue
+                    limiter.increase()
+                    if method == "HEAD" and resp.status >= 400:
+                        method, head_failed = "GET", True
+                        continue
+                    if head_failed and resp.status < 400:
+                        _head_rejecting_hosts.add(host)
+                    match resp.status:
+                        case 400:
+                            errors.append(("400", "400 Bad Request"))
+                        case 401:
+                            errors.append(("401", "401 Unauthorized"))
+                        case 403:
+                            errors.append(("403", "403 Forbidden"))
+                        case 404:
+                            errors.append(("404", "404 Not found"))
+                        case 200:
+                            await _check_200_response(resp, url, files, is_github_issue, errors)
 
         except Exception:
-            results["failed_request"].append(_fmt("Failed to request", url, files))
+            if method == "HEAD":
+                method, head_failed = "GET", True
+                continue
+            errors.append(("failed_request", "Failed to request"))
+        finally:
+            await limiter.release()
+        break
+    return errors
 
 
 _market_hours_symbols: dict[str, set[str]] = {}
@@ -427,53 +675,18 @@ def _is_market_hours_symbol(url: str, anchor: str) -> bool:
     return anchor in symbols
 
 
-def _check_section_anchor(url: str, files: list[str], file_index: dict[str, list[str]], results: dict[str, list[str]]):
+def _check_section_anchor(url: str, files: list[str], section_index: dict[str, str], results: dict[str, list[str]]):
     """Validate that a #section anchor corresponds to a real file in the repo."""
     after_v2 = url.split("docs/v2/", 1)[1]
-    expected_no_lower = after_v2.replace("/", os.sep).replace("-", " ").replace("#", os.sep)
-    expected = _apply_replacements(expected_no_lower).lower()
-    expected_raw = expected_no_lower.lower()
+    if after_v2.replace("-", " ").replace("#", "/").lower() in section_index:
+        return
 
+    # Market-hours pages use JS data files for symbol anchors (e.g. #DE30EUR)
     section = url.split("#", 1)[1]
-    section_name_raw = section.replace("-", " ")
-    section_name = _apply_replacements(section_name_raw)
-
-    # Look up files matching the section name (try with replacements first, then raw)
-    candidates = file_index.get(section_name.lower(), [])
-    if not candidates:
-        candidates = file_index.get(section_name_raw.lower(), [])
-
-    if not candidates:
-        # Market-hours pages use JS data files for symbol anchors (e.g. #DE30EUR)
-        if "/market-hours#" in url:
-            if _is_market_hours_symbol(url, section):
-                return
-        results["missing_section"].append(_fmt(f'No Section "{section_name}" was found', url, files))
+    if "/market-hours#" in url and _is_market_hours_symbol(url, section):
         return
-
-    # Verify the path matches
-    found = False
-    for candidate in candidates:
-        rel = os.path.relpath(candidate, BASE_PATH).replace("\\", os.sep)
-        # Extract numbered parts
-        parts = rel.replace("\\", "/").split("/")
-        numbered = [p for p in parts if p and p[0].isdigit() and " " in p]
-        if not numbered:
-            continue
-        non_numbered_path = os.sep.join(
-            p[p.index(" ") + 1:].strip() for p in numbered[:-1]
-        )
-        section_part = Path(numbered[-1]).stem
-        full = f"{non_numbered_path}{os.sep}{section_part}".lower()
-        if full == expected or full == expected_raw:
-            found = True
-            break
-
-    if not found:
-        # Market-hours pages use JS data files for symbol anchors (e.g. #DE30EUR)
-        if "/market-hours#" in url and _is_market_hours_symbol(url, section):
-            return
-        results["missing_section"].append(_fmt(f'No Section "{section_name}" was found', url, files))
+    section_name = _apply_replacements(section.replace("-", " "))
+    results["missing_section"].append(_fmt(f'No Section "{section_name}" was found', url, files))
 
 
 def _check_github_folder_in_html(html: str) -> bool:
@@ -508,47 +721,94 @@ def _check_resources(resource_files: dict[str, list[str]], results: dict[str, li
 
 # -- Main ---------------------------------------------------------------------
 
+def _open_session() -> aiohttp.ClientSession:
+    """Create the HTTP session (replaced by url_check_benchmark.py to replay recordings)."""
+    # The connector keeps a keep-alive pool per host; size it to the per-host ceiling
+    connector = aiohttp.TCPConnector(
+        limit=CONCURRENCY,
+        limit_per_host=HOST_MAX_CONCURRENCY,
+        keepalive_timeout=30,
+        ttl_dns_cache=300,
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        headers={"User-Agent": USER_AGENT},
+    )
+
+
 async def main():
     parser = argparse.ArgumentParser(description="Check documentation for broken links.")
     parser.add_argument("--create-issue", action="store_true",
                         help="Create/update/close a GitHub issue via `gh` CLI when errors are found.")
+    parser.add_argument("--full", action="store_true",
+                        help="Re-parse every file and re-check every URL, ignoring the state file.")
+    parser.add_argument("--freshness", type=float, default=FRESHNESS_HOURS,
+                        help=f"Hours a URL result stays valid in incremental mode (default: {FRESHNESS_HOURS}).")
+    parser.add_argument("--state", type=Path, default=STATE_FILE,
+                        help=f"Incremental state file (default: {STATE_FILE.name}).")
+    parser.add_argument("--write-section-index", type=Path, metavar="PATH",
+                        help="Also write the section-anchor index as JSON for reuse by other tools.")
     args = parser.parse_args()
 
     start = time.perf_counter()
+    state = {"files": {}, "urls": {}} if args.full else _load_state(args.state)
 
     print("Extracting URLs from documentation files...")
-    doc_files, file_index = _collect_files()
-    url_files = _get_all_urls(doc_files)
-    strategy_urls = _get_strategy_php_urls()
-    url_files.update(strategy_urls)
+    doc_files, section_index = _collect_files()
+    if args.write_section_index:
+        _save_section_index(args.write_section_index, section_index)
+    url_files, resource_files, state["files"] = _get_url_files(doc_files, state["files"])
 
-    resource_files = _get_resource_redirects(doc_files)
+    results: dict[str, list[str]] = {cat: [] for cat in SEVERITY}
+    for url, files in url_files.items():
+        _check_url_locally(url, files, section_index, results)
+
+    # Reuse fresh HTTP results; only request new or stale URLs
+    now = time.time()
+    max_age = args.freshness * 3600
+    url_state: dict[str, dict] = {}
+    to_check: dict[str, list[str]] = {}
+    for url, files in url_files.items():
+        entry = state["urls"].get(url)
+        if entry is not None and now - entry["checked"] < max_age:
+            url_state[url] = entry
+            for category, msg in entry["errors"]:
+                results[category].append(_fmt(msg, url, files))
+        else:
+            to_check[url] = files
 
-    count = len(url_files)
-    print(f"Start Testing {count} URLs...")
+    count = len(to_check)
+    print(f"Start Testing {count} URLs ({len(url_files) - count} fresh results reused)...")
 
-    results: dict[str, list[str]] = {cat: [] for cat in SEVERITY}
     semaphore = asyncio.Semaphore(CONCURRENCY)
 
-    connector = aiohttp.TCPConnector(limit=CONCURRENCY, limit_per_host=20)
-    async with aiohttp.ClientSession(
-        connector=connector,
-        headers={"User-Agent": USER_AGENT},
-    ) as session:
+    async def check(url: str, files: list[str]) -> tuple[str, list[tuple[str, str]]]:
+        return url, await _check_url(session, semaphore, url, files)
+
+    async with _open_session() as session:
         tasks = []
-        for url, files in url_files.items():
-            tasks.append(_check_url(session, semaphore, url, files, file_index, results))
+        for url, files in to_check.items():
+            tasks.append(check(url, files))
 
         # Run all checks concurrently with progress bar
         done = 0
         for coro in asyncio.as_completed(tasks):
-            await coro
+            url, errors = await coro
+            files = to_check[url]
+            for category, msg in errors:
+                results[category].append(_fmt(msg, url, files))
+            # Failed requests are usually transient, so retry them next run
+            if all(category != "failed_request" for category, _ in errors):
+                url_state[url] = {"checked": time.time(), "errors": errors}
             done += 1
             if done % CONCURRENCY == 0 or done == count:
                 filled = int(CONCURRENCY * done / count)
                 bar = "#" * filled + "-" * (CONCURRENCY - filled)
                 print(f"\r  [{bar}] {done}/{count} ({done/count:.1%})", end="", flush=True)
 
+    state["urls"] = url_state
+    _save_state(args.state, state)
+
     # Check resource redirects
     print(f"\nNow check {len(resource_files)} RESOURCE redirection.")
     _check_resources(resource_files, results)
@@ -0,0 +1,291 @@
+# QUANTCONNECT.COM - Democratizing Finance, Empowering Individuals.
+# Lean Algorithmic Trading Engine v2.0. Copyright 2014 QuantConnect Corporation.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+# Benchmarks for url_check.py.
+#
+# Usage:
+#   python url_check_benchmark.py extraction [--repeat N]   # href/include extraction on the real tree
+#   python url_check_benchmark.py record [--offline]        # record every URL's response into ARCHIVE
+#   python url_check_benchmark.py replay [--latency MS] [--error-rate R]
+#
+# Record/replay: `record` requests every URL once and stores the status, redirect
+# target, Retry-After and (for URLs whose body is inspected) the body in a gzipped
+# JSON archive. `--offline` writes a synthetic archive (every URL answers 200)
+# without touching the network. `replay` serves the archive from a local aiohttp
+# server and runs url_check.main() against it, with injected latency and 429/503
+# responses, so throughput, per-host concurrency and soft-404 handling can be
+# measured deterministically without a network.
+
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import unquote, urlsplit
+
+import aiohttp
+from aiohttp import web
+from yarl import URL
+
+import url_check
+
+ARCHIVE = url_check.BASE_PATH / ".url_check_replay.json.gz"
+REPLAY_PREFIX = "/replay/"
+MAX_BODY = 512 * 1024     # bytes of body kept per recorded response
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_extraction(repeat: int):
+    """Time hashing and extraction over every doc file, serially and in a process pool.
+    Files are not rewritten."""
+    doc_files, _ = url_check._collect_files()
+    count = len(doc_files)
+    print(f"{count} doc files")
+
+    runs = {
+        "hash only": lambda: [url_check._file_hash(f) for f in doc_files],
+        "extract (serial)": lambda: [url_check._extract_file(f, rewrite=False) for f in doc_files],
+        "extract (process pool)": lambda: url_check._extract_files(doc_files, rewrite=False),
+    }
+    for name, fn in runs.items():
+        elapsed = _time(fn, repeat)
+        print(f"  {name:<24} {elapsed:7.3f}s  {count / elapsed:10.0f} files/s")
+
+
+# -- Record -------------------------------------------------------------------
+
+def _strip_fragment(url: str) -> str:
+    return url.split("#", 1)[0]
+
+
+async def _record_url(session: aiohttp.ClientSession, semaphore: asyncio.Semaphore,
+                      url: str, files: list[str], archive: dict[str, dict]):
+    keep_body = ("api.github.com/repos/QuantConnect/Lean/issues" in url
+                 or url_check._needs_docs_page_check(url, files))
+    async with semaphore:
+        try:
+            async with session.get(url, allow_redirects=True, timeout=aiohttp.ClientTimeout(total=60)) as resp:
+                body = await resp.content.read(MAX_BODY) if keep_body else b""
+                final = _strip_fragment(str(resp.url))
+                entry = {
+                    "status": resp.status,
+                    "retry_after": resp.headers.get("Retry-After"),
+                    "content_type": resp.headers.get("Content-Type"),
+                    "body": body.decode("utf-8", errors="replace"),
+                }
+        except Exception as e:
+            archive[_strip_fragment(url)] = {"error": type(e).__name__}
+            return
+    key = _strip_fragment(url)
+    if final != key:
+        archive[key] = {"location": final}
+    archive[final] = entry
+
+
+async def record(offline: bool, archive_path: Path):
+    doc_files, _ = url_check._collect_files()
+    url_files, _, _ = url_check._get_url_files(doc_files, {})
+    url_files = {url: files for url, files in url_files.items() if url.startswith("http")}
+    archive: dict[str, dict] = {}
+
+    if offline:
+        github_page = ('<a class="anchor-link" href="https://github.com/QuantConnect/Documentation/'
+                       'tree/master/01 Introduction.html"></a>')
+        for url, files in url_files.items():
+            body = ""
+            if "api.github.com/repos/QuantConnect/Lean/issues" in url:
+                body = json.dumps({"state": "open"})
+            elif url_check._needs_docs_page_check(url, files):
+                body = github_page
+            archive[_strip_fragment(url)] = {"status": 200, "body": body}
+    else:
+        semaphore = asyncio.Semaphore(url_check.CONCURRENCY)
+        async with url_check._open_session() as session:
+            await asyncio.gather(*[_record_url(session, semaphore, url, files, archive)
+                                   for url, files in url_files.items()])
+
+    with gzip.open(archive_path, "wt", encoding="utf-8") as f:
+        json.dump(archive, f)
+    print(f"Recorded {len(archive)} responses for {len(url_files)} URLs into {archive_path}")
+
+
+# -- Replay -------------------------------------------------------------------
+
+def _replay_key(url: str) -> str:
+    """The original URL as the server sees it once the client has normalized its path."""
+    return unquote(URL(f"http://127.0.0.1{REPLAY_PREFIX}{url}").raw_path[len(REPLAY_PREFIX):])
+
+
+class _ReplayServer:
+    """Serves recorded responses at http://127.0.0.1:PORT/replay/<original URL>.
+
+    Each request is delayed by `latency` seconds (+/- `jitter`). URLs drawn by
+    `error_rate` answer their first request with 429 (or 503) and a Retry-After
+    of `retry_after` seconds. The draws depend only on the URL and `seed`.
+    """
+
+    def __init__(self, archive: dict[str, dict], latency: float, jitter: float,
+                 error_rate: float, retry_after: float, seed: int):
+        self.archive = {_replay_key(url): entry for url, entry in archive.items()}
+        self.latency, self.jitter = latency, jitter
+        self.error_rate, self.retry_after, self.seed = error_rate, retry_after, seed
+        self.seen: Counter = Counter()
+        self.methods: Counter = Counter()
+        self.in_flight: Counter = Counter()
+        self.peak: Counter = Counter()
+        self.bytes_sent = 0
+        self.unknown: set[str] = set()
+
+    def _draw(self, url: str) -> float:
+        digest = hashlib.sha256(f"{self.seed}:{url}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        url = unquote(request.raw_path[len(REPLAY_PREFIX):])
+        if url not in self.archive:
+            url = _replay_key(url)
+        host = urlsplit(url).hostname or ""
+        self.methods[request.method] += 1
+        self.in_flight[host] += 1
+        self.peak[host] = max(self.peak[host], self.in_flight[host])
+        try:
+            if self.latency or self.jitter:
+                rng = random.Random(self._draw(url) + self.seen[url])
+                await asyncio.sleep(max(0.0, self.latency + rng.uniform(-self.jitter, self.jitter)))
+            self.seen[url] += 1
+
+            if self.seen[url] == 1 and self._draw(url) < self.error_rate:
+                status = 429 if self._draw(url + "#status") < 0.5 else 503
+                return web.Response(status=status, headers={"Retry-After": str(self.retry_after)})
+
+            entry = self.archive.get(url)
+            if entry is None:
+                self.unknown.add(url)
+                return web.Response(status=502)
+            if "location" in entry:
+                raise web.HTTPFound(REPLAY_PREFIX + entry["location"])
+            if "error" in entry:
+                # Drop the connection so the client sees a failed request
+                request.transport.close()
+                return web.Response(status=500)
+
+            headers = {}
+            if entry.get("retry_after"):
+                headers["Retry-After"] = entry["retry_after"]
+            body = entry.get("body", "").encode("utf-8")
+            if request.method != "HEAD":
+                self.bytes_sent += len(body)
+            return web.Response(status=entry["status"], body=body, headers=headers,
+                                content_type=(entry.get("content_type") or "text/html").split(";")[0])
+        finally:
+            self.in_flight[host] -= 1
+
+
+class _ReplaySession:
+    """Session stand-in that sends every request to the replay server."""
+
+    def __init__(self, base: str):
+        self._base = base
+        # One real host (127.0.0.1) carries every original host, so lift the per-host cap
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=url_check.CONCURRENCY, limit_per_host=0),
+            headers={"User-Agent": url_check.USER_AGENT},
+        )
+
+    def request(self, method: str, url: str, **kwargs):
+        return self._session.request(method, f"{self._base}{REPLAY_PREFIX}{url}", **kwargs)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self._session.close()
+
+
+async def replay(args):
+    with gzip.open(args.archive, "rt", encoding="utf-8") as f:
+        archive = json.load(f)
+    server = _ReplayServer(archive, args.latency / 1000, args.jitter / 1000,
+                           args.error_rate, args.retry_after, args.seed)
+
+    app = web.Application()
+    app.router.add_route("*", REPLAY_PREFIX + "{tail:.*}", server.handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    url_check._open_session = lambda: _ReplaySession(f"http://127.0.0.1:{port}")
+    with tempfile.TemporaryDirectory() as tmp:
+        sys.argv = ["url_check.py", "--full", "--state", str(Path(tmp) / "state.json")]
+        start = time.perf_counter()
+        try:
+            await url_check.main()
+        except SystemExit:
+            pass
+        elapsed = time.perf_counter() - start
+    await runner.cleanup()
+
+    requests = sum(server.methods.values())
+    print(f"\n{'-'*60}")
+    print(f"Replay: {requests} requests in {elapsed:.2f}s ({requests / elapsed:.0f} req/s)")
+    print(f"  methods: {dict(server.methods)}, body bytes sent: {server.bytes_sent}")
+    print(f"  unknown URLs (not in archive): {len(server.unknown)}")
+    print("  peak concurrency per host: " + ", ".join(
+        f"{host}={peak}" for host, peak in server.peak.most_common(5)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks for url_check.py.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    extraction = sub.add_parser("extraction", help="Time href/include extraction on the real tree.")
+    extraction.add_argument("--repeat", type=int, default=3)
+    record_parser = sub.add_parser("record", help="Record every URL's response into an archive.")
+    record_parser.add_argument("--archive", type=Path, default=ARCHIVE)
+    record_parser.add_argument("--offline", action="store_true",
+                               help="Write a synthetic archive (all 200) without network access.")
+    replay_parser = sub.add_parser("replay", help="Run url_check against a local replay server.")
+    replay_parser.add_argument("--archive", type=Path, default=ARCHIVE)
+    replay_parser.add_argument("--latency", type=float, default=50, help="Mean response latency in ms.")
+    replay_parser.add_argument("--jitter", type=float, default=0, help="Latency jitter in ms.")
+    replay_parser.add_argument("--error-rate", type=float, default=0,
+                               help="Fraction of URLs whose first request gets a 429/503.")
+    replay_parser.add_argument("--retry-after", type=float, default=1, help="Retry-After of injected errors (s).")
+    replay_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "extraction":
+        benchmark_extraction(args.repeat)
+    elif args.command == "record":
+        asyncio.run(record(args.offline, args.archive))
+    elif args.command == "replay":
+        asyncio.run(replay(args))
+
+
+if __name__ == "__main__":
+    main()
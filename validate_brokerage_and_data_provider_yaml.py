@@ -2,16 +2,13 @@
 # It then tries to deploy an algorithm with each one.
 # Deployments that omit some `required` properties are tested to ensure they fail.
 # Deployments will all `required` properties are tested to ensure they return {'success': True}.
-from base64 import b64encode
-from hashlib import sha256
-from time import time, sleep
 import requests
 import os
+from qc_api import poll, get_policy, PollTimeout, QuantConnectClient
 
 # Inputs:
 USER_ID = os.getenv('QUANTCONNECT_USER_ID')
 API_TOKEN = os.getenv('QUANTCONNECT_API_TOKEN')
-BASE_URL = 'https://www.quantconnect.com/api/v2/'
 YAML_URL = 'https://raw.githubusercontent.com/QuantConnect/Documentation/refs/heads/master/QuantConnect-Platform-2.0.0.yaml'
 DEFAULT_BROKERAGE = {
     'id': 'QuantConnectBrokerage'
@@ -35,27 +32,12 @@ VALUE_OVERRIDE_BY_PROPERTY = {
 
     'ib-weekly-restart-utc-time': '12:00:00',
 }
-
-def get_headers():
-    # Get timestamp
-    timestamp = f'{int(time())}'
-    time_stamped_token = f'{API_TOKEN}:{timestamp}'.encode('utf-8')
-    # Get hased API token
-    hashed_token = sha256(time_stamped_token).hexdigest()
-    authentication = f'{USER_ID}:{hashed_token}'.encode('utf-8')
-    authentication = b64encode(authentication).decode('ascii')
-    # Create headers dictionary.
-    return {
-        'Authorization': f'Basic {authentication}',
-        'Timestamp': timestamp
-    }
+CLIENT = QuantConnectClient(USER_ID, API_TOKEN)
 
 def post(endpoint, payload):
     if endpoint == '/live/create':
         print(payload)
-    return requests.post(
-        f'{BASE_URL}{endpoint}', headers=get_headers(), json=payload
-    ).json()
+    return CLIENT.post(endpoint, payload)
 
 def prepare_live_payload():
     # Create a project.
@@ -75,16 +57,17 @@ def prepare_live_payload():
     return project_id, compile_id, node_id
 
 def wait_for_compile_to_complete(project_id, compile_id):
-    attempts = 0
-    while attempts < 10:
-        attempts += 1
-        response = post(
-            '/compile/read', {'projectId': project_id, 'compileId': compile_id}
+    try:
+        poll(
+            lambda: post(
+                '/compile/read', {'projectId': project_id, 'compileId': compile_id}
+            ),
+            lambda response: response['state'] != 'InQueue',
+            'compile/read',
+            policy=get_policy('compile/read', timeout=60)
         )
-        if response['state'] != 'InQueue':
-            return # Done.
-        sleep(2)
-    assert False, "Compile job stuck in queue."
+    except PollTimeout:
+        assert False, "Compile job stuck in queue."
 
 def create_live_algorithm(
         project_id, compile_id, node_id, brokerage, data_providers):